@@ -17,7 +17,11 @@ from typing import Optional, List
 
 from fastapi import FastAPI, Header
 
-app = FastAPI()
+from .json_responses import DefaultJSONResponse
+from .parameter_limits import ParameterLimitsMiddleware
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
+app.add_middleware(ParameterLimitsMiddleware)  # bounds repeated X-Token headers, see parameter_limits.py
 
 
 @app.get("/items/")
@@ -24,7 +24,22 @@ from typing import List, Optional
 from fastapi import FastAPI
 from pydantic import BaseModel, EmailStr
 
-app = FastAPI()
+from .compiled_serializers import CompiledSerializerRoute
+from .conditional_requests import ConditionalRoute, cache_control
+from .json_responses import DefaultJSONResponse
+from .kv_store import open_store
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
+
+
+# response_model serialization compiled once per route instead of walking the model on every request
+# (see compiled_serializers.py), plus ETags, If-None-Match and Cache-Control for the GET routes
+# (see conditional_requests.py)
+class Route(ConditionalRoute, CompiledSerializerRoute):
+    pass
+
+
+app.router.route_class = Route
 
 
 class Item(BaseModel):
@@ -35,7 +50,8 @@ class Item(BaseModel):
     tags: List[str] = []
 
 
-items = {
+# A dict, or with KV_STORE_DIR set a KVStore that keeps the items on disk between restarts (see kv_store.py)
+items = open_store("response_model_items", {
     "foo": {"name": "Foo", "price": 50.2},
     "bar": {"name": "Bar", "description": "The bartenders", "price": 62, "tax": 20.2},
     "baz": {"name": "Baz", "description": None, "price": 50.2, "tax": 10.5, "tags": []},
@@ -45,7 +61,7 @@ items = {
         "price": 50.2,
         "tax": 10.5,
     },
-}
+})
 
 
 # Your response model could have default values but you might want to omit them from the result if they were
@@ -54,6 +70,7 @@ items = {
 # Use the response_model_exclude_unset parameter
 # and those default values won't be included in the response, only the values actually set.
 @app.get("/items/{item_id}", response_model=Item, response_model_exclude_unset=True)
+@cache_control("max-age=60")  # clients can reuse it for a minute, after that they revalidate it with the ETag
 async def read_item(item_id: str):
     """
     FastAPI uses Pydantic model's .dict() with its exclude_unset parameter to achieve this.
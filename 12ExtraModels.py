@@ -19,9 +19,15 @@ As the case with the user "entity" with a state including password, password_has
 from typing import Optional, Union, Dict
 
 from fastapi import FastAPI
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
+from typing_extensions import Literal
 
-app = FastAPI()
+from .discriminated_unions import DiscriminatedUnionRoute
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
+# keeps the discriminator of Item (below) in FastAPI's copy of the response model, see discriminated_unions.py
+app.router.route_class = DiscriminatedUnionRoute
 
 
 # class UserIn(BaseModel):
@@ -137,14 +143,35 @@ class BaseItem(BaseModel):
 
 
 class CarItem(BaseItem):
-    type = "car"
+    type: Literal["car"] = "car"
 
 
 class PlaneItem(BaseItem):
-    type = "plane"
+    type: Literal["plane"] = "plane"
     size: int
 
 
+"""
+Discriminated unions
+With a plain Union[PlaneItem, CarItem], Pydantic tries PlaneItem, and only if that fails CarItem: every response is
+validated up to once per member, and the first one that accepts the data wins, even if it is the wrong one. A car
+with a size would pass as a PlaneItem if "type" was a plain str.
+
+The "type" field already says which model it is. With the types declared as Literal values and
+Field(discriminator="type"), Pydantic builds a {"plane": PlaneItem, "car": CarItem} mapping once, when the model
+is created, and validates each response with only the model its "type" picks (a missing or unknown type is an
+error). The OpenAPI schema gets the discriminator too.
+
+FastAPI (0.95) drops a discriminator given with Annotated[Union[...], Field(discriminator=...)] as a response_model,
+so the union goes in a model with a custom root (__root__), it is sent as the bare item, without the wrapper.
+It also loses the discriminator when it copies the response model for validation, DiscriminatedUnionRoute keeps it.
+"""
+
+
+class Item(BaseModel):
+    __root__: Union[PlaneItem, CarItem] = Field(..., discriminator="type")
+
+
 items = {
     "item1": {"description": "All my friends drive a low rider", "type": "car"},
     "item2": {
@@ -156,8 +183,9 @@ items = {
 
 
 # response_model=List[Item]) The same way, you can declare responses of lists of objects
-# the more specific PlaneItem comes before CarItem
-@app.get("/items/{item_id}", response_model=Union[PlaneItem, CarItem])
+# With a plain Union[PlaneItem, CarItem], the more specific PlaneItem has to come before CarItem, with the
+# discriminated Item the order doesn't matter
+@app.get("/items/{item_id}", response_model=Item)
 async def read_item(item_id: str):
     return items[item_id]
 
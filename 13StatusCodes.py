@@ -8,7 +8,9 @@ Document it as such in the OpenAPI schema (and so, in the user interfaces):
 
 from fastapi import FastAPI, status
 
-app = FastAPI()
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
 
 @app.post("/items/", status_code=status.HTTP_201_CREATED)
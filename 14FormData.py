@@ -6,7 +6,9 @@ With Form you can declare the same metadata and validation as with Body (and Que
 """
 from fastapi import FastAPI, Form
 
-app = FastAPI()
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
 
 @app.post("/login/")
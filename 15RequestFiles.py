@@ -1,17 +1,217 @@
 """
 You can define files to be uploaded by the client using File.
 """
-from typing import List
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+import uuid
+from typing import Any, BinaryIO, Dict, List, Optional
 
-from fastapi import FastAPI, File, UploadFile
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, File, Header, HTTPException, Query, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, StreamingResponse
+from multipart.multipart import MultipartParser, parse_options_header
+from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
 
-app = FastAPI()
+from .json_responses import DefaultJSONResponse
+from .upload_processing import UploadPipeline, remove_files, save_uploads
 
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
-@app.post("/files/")
-async def create_file(file: bytes = File(...)):
-    return {"file_size": len(file)}
+"""
+Streaming uploads
+
+With file: bytes = File(...) the whole upload is read into memory before the path operation runs, just to call len()
+on it. A few big uploads at the same time and the process runs out of memory.
+
+Instead, the path operation below takes the Request itself and reads the body with request.stream(), chunk by chunk,
+as it arrives from the client. Each chunk goes through the multipart parser, is added to a sha256 and written to a
+file in UPLOAD_DIR (in a threadpool, so the event loop is not blocked by the disk), and then it is dropped.
+So memory stays at a few chunks per request, no matter how big the file is.
+
+The files only live as long as the async with block of the receiver: they are deleted when it ends (move them
+somewhere else inside it, with os.replace(stored.path, ...), to keep them), and right away if the body is invalid,
+incomplete or the client disconnects.
+
+MAX_UPLOAD_SIZE limits the size of one request body (413 if it is bigger).
+"""
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "fast_api_tutorial_uploads"))
+MAX_UPLOAD_SIZE = int(os.environ.get("MAX_UPLOAD_SIZE", 2 * 1024 ** 3))  # bytes per request
+
+# Without a File() parameter FastAPI doesn't know the body, so we describe it for the docs ourselves
+multipart_files_body = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}},
+                }
+            }
+        },
+    }
+}
+
+
+class StoredFile(BaseModel):
+    field_name: str
+    filename: Optional[str] = None
+    path: str
+    size: int
+    sha256: str
+
+
+class _FilePart:
+    def __init__(self, field_name: str, filename: str, file: BinaryIO):
+        self.stored = StoredFile(field_name=field_name, filename=filename, path=file.name, size=0, sha256="")
+        self.file = file
+        self.hash = hashlib.sha256()
+
+    def write(self, data: bytes) -> None:
+        self.hash.update(data)
+        self.file.write(data)
+        self.stored.size += len(data)
+
+    def close(self) -> StoredFile:
+        self.file.close()
+        self.stored.sha256 = self.hash.hexdigest()
+        return self.stored
+
+
+class StreamingMultipartReceiver:
+    """
+    Reads a multipart/form-data request body as a stream and writes every file part to disk:
+
+        async with StreamingMultipartReceiver(request) as stored:  # the files are deleted at the end of the block
+            ...
+
+    The parser callbacks only record what happened (a part started, some bytes of it arrived, it ended), the actual
+    file work is done after each chunk, in the same way Starlette's own form parser does it.
+    Form fields without a filename are skipped.
+    """
+
+    def __init__(self, request: Request, max_size: Optional[int] = None, upload_dir: Optional[str] = None):
+        self.request = request
+        self.max_size = MAX_UPLOAD_SIZE if max_size is None else max_size
+        self.upload_dir = UPLOAD_DIR if upload_dir is None else upload_dir
+        self._events: list = []
+        self._header_field = b""
+        self._header_value = b""
+        self._content_disposition = b""
+        self.stored: List[StoredFile] = []
+
+    async def __aenter__(self) -> List[StoredFile]:
+        self.stored = await self.receive()
+        return self.stored
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await run_in_threadpool(self.delete)
+
+    def delete(self) -> None:
+        for stored in self.stored:
+            try:
+                os.unlink(stored.path)
+            except FileNotFoundError:  # moved away by the path operation
+                pass
+
+    def on_part_begin(self) -> None:
+        self._content_disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_field.lower() == b"content-disposition":
+            self._content_disposition = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._content_disposition)
+        if b"filename" in options:  # names that aren't UTF-8 are kept, with the bad bytes replaced, rather than a 500
+            self._events.append(("begin", options.get(b"name", b"").decode(errors="replace"),
+                                 options[b"filename"].decode(errors="replace")))
+        else:
+            self._events.append(("field", None, None))
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        self._events.append(("data", data[start:end], None))
+
+    def on_part_end(self) -> None:
+        self._events.append(("end", None, None))
+
+    def _open(self, field_name: str, filename: str) -> _FilePart:
+        os.makedirs(self.upload_dir, exist_ok=True)
+        file = tempfile.NamedTemporaryFile(dir=self.upload_dir, prefix="upload-", delete=False)
+        return _FilePart(field_name, filename, file)
+
+    async def receive(self) -> List[StoredFile]:
+        content_length = self.request.headers.get("content-length")
+        if content_length is not None:
+            if not content_length.isdigit():
+                raise HTTPException(status_code=400, detail="Invalid Content-Length header")
+            if int(content_length) > self.max_size:
+                raise HTTPException(status_code=413, detail="Request body too large")
+        _, params = parse_options_header(self.request.headers.get("content-type", ""))
+        if b"boundary" not in params:
+            raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+
+        parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        })
+        stored: List[StoredFile] = []
+        opened: List[_FilePart] = []
+        current: Optional[_FilePart] = None
+        received = 0
+        try:
+            async for chunk in self.request.stream():
+                received += len(chunk)
+                if received > self.max_size:
+                    raise HTTPException(status_code=413, detail="Request body too large")
+                parser.write(chunk)
+                for event, value, filename in self._events:
+                    if event == "begin":
+                        current = await run_in_threadpool(self._open, value, filename)
+                        opened.append(current)
+                    elif event == "data" and current is not None:
+                        await run_in_threadpool(current.write, value)
+                    elif event == "end" and current is not None:
+                        stored.append(await run_in_threadpool(current.close))
+                        current = None
+                    elif event == "field":
+                        current = None
+                self._events.clear()
+            parser.finalize()
+            if current is not None:  # the body ended in the middle of a file
+                raise HTTPException(status_code=400, detail="Incomplete multipart body")
+        except BaseException:
+            for part in opened:
+                part.file.close()
+                os.unlink(part.file.name)
+            raise
+        return stored
+
+
+@app.post("/files/", openapi_extra=multipart_files_body)
+async def create_file(request: Request):
+    async with StreamingMultipartReceiver(request) as stored:
+        if not stored:
+            raise HTTPException(status_code=422, detail="No file in the request")
+        return {"file_size": stored[0].size, "sha256": stored[0].sha256}
 
 
 @app.post("/uploadfile/")
@@ -51,15 +251,237 @@ contents = myfile.file.read()
     return {"filename": file.filename}
 
 
+"""
+Resumable uploads
+
+A single-shot UploadFile has to start from zero when the connection drops. For big files the client can instead:
+
+1. POST /uploadfile/sessions/ with the filename, the total size and a chunk size. The server creates the file in
+   UPLOAD_DIR with its final size already allocated and returns an upload_id.
+2. PUT /uploadfile/sessions/{upload_id}?offset=... with the raw bytes of one chunk and its sha256 in the
+   X-Chunk-SHA256 header. Chunks can be sent in any order and in parallel: each one is written at its own offset
+   with os.pwrite(), so there is no shared file position to fight over.
+   A chunk whose checksum doesn't match is rejected (and not marked as received), the client just sends it again.
+   A chunk that was already received is not written again: the same chunk again (same checksum) is accepted as it
+   is, different bytes get a 409, as does a chunk sent again while it is still being written. So once verified, a
+   chunk of the file can't be changed by a later request.
+3. GET /uploadfile/sessions/{upload_id} tells which chunks are still missing, so an interrupted upload only resends
+   those.
+4. POST /uploadfile/sessions/{upload_id}/finalize checks that every chunk arrived and closes the file.
+
+A session nobody sent anything to for UPLOAD_SESSION_TTL seconds is abandoned: a background task looks for those
+every UPLOAD_SESSION_SWEEP_INTERVAL seconds (and creating a session does too) and removes them with their file, so
+abandoned uploads don't keep their file descriptor and disk space forever, even on a server nobody sends anything
+to. When the app stops all the sessions are removed with their files, as they only live in memory.
+
+Sessions live in memory here, a real deployment would keep them in a shared store.
+"""
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+UPLOAD_SESSION_TTL = float(os.environ.get("UPLOAD_SESSION_TTL", 24 * 60 * 60))  # seconds without activity
+UPLOAD_SESSION_SWEEP_INTERVAL = float(os.environ.get("UPLOAD_SESSION_SWEEP_INTERVAL", 60))  # seconds
+
+
+class UploadSessionIn(BaseModel):
+    filename: str
+    size: int = Field(..., ge=0, le=MAX_UPLOAD_SIZE)
+    chunk_size: int = Field(8 * 1024 * 1024, gt=0, le=MAX_CHUNK_SIZE)
+
+
+class UploadSessionOut(BaseModel):
+    upload_id: str
+    filename: str
+    size: int
+    chunk_size: int
+    chunks: int
+    missing_chunks: List[int]
+
+
+class UploadSession:
+    def __init__(self, upload_id: str, filename: str, size: int, chunk_size: int, path: str):
+        self.upload_id = upload_id
+        self.filename = filename
+        self.size = size
+        self.chunk_size = chunk_size
+        self.path = path
+        self.chunks = max(1, -(-size // chunk_size))
+        self.received: Dict[int, str] = {}  # index: sha256 of the verified chunk
+        self.writing: set = set()  # indices of the chunks being written
+        self.last_activity = time.monotonic()
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        if size:
+            # reserve the blocks up front, so parallel chunks don't fragment the file or hit "disk full" halfway
+            if hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(self.fd, 0, size)
+            else:
+                os.ftruncate(self.fd, size)
+
+    def chunk_length(self, index: int) -> int:
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    def missing_chunks(self) -> List[int]:
+        return [index for index in range(self.chunks) if index not in self.received]
+
+    def close(self, delete: bool = False) -> None:
+        os.close(self.fd)
+        if delete:
+            os.unlink(self.path)
+
+    def out(self) -> UploadSessionOut:
+        return UploadSessionOut(
+            upload_id=self.upload_id, filename=self.filename, size=self.size, chunk_size=self.chunk_size,
+            chunks=self.chunks, missing_chunks=self.missing_chunks(),
+        )
+
+
+upload_sessions: Dict[str, UploadSession] = {}
+
+
+def get_upload_session(upload_id: str) -> UploadSession:
+    if upload_id not in upload_sessions:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    session = upload_sessions[upload_id]
+    session.last_activity = time.monotonic()
+    return session
+
+
+def expire_upload_sessions(now: Optional[float] = None) -> None:
+    now = time.monotonic() if now is None else now
+    for upload_id, session in list(upload_sessions.items()):
+        if not session.writing and now - session.last_activity > UPLOAD_SESSION_TTL:
+            del upload_sessions[upload_id]
+            session.close(delete=True)
+
+
+async def expire_upload_sessions_periodically() -> None:
+    while True:
+        await asyncio.sleep(UPLOAD_SESSION_SWEEP_INTERVAL)
+        expire_upload_sessions()
+
+
+@app.on_event("startup")
+async def start_upload_session_expiry():
+    app.state.upload_session_expiry = asyncio.create_task(expire_upload_sessions_periodically())
+
+
+@app.on_event("shutdown")
+def close_upload_sessions():
+    expiry = getattr(app.state, "upload_session_expiry", None)
+    if expiry is not None:
+        expiry.cancel()
+    for session in upload_sessions.values():
+        session.close(delete=True)  # the sessions are gone with the process, their partial files would be orphans
+    upload_sessions.clear()
+
+
+def _hash_and_pwrite(chunk_hash, fd: int, data: bytes, offset: int) -> None:
+    # both release the GIL for big buffers, so parallel chunks are hashed and written in parallel
+    chunk_hash.update(data)
+    os.pwrite(fd, data, offset)
+
+
+@app.post("/uploadfile/sessions/", response_model=UploadSessionOut, status_code=201)
+async def create_upload_session(session_in: UploadSessionIn):
+    expire_upload_sessions()
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    upload_id = uuid.uuid4().hex
+    path = os.path.join(UPLOAD_DIR, f"resumable-{upload_id}")
+    session = await run_in_threadpool(
+        UploadSession, upload_id, session_in.filename, session_in.size, session_in.chunk_size, path
+    )
+    upload_sessions[upload_id] = session
+    return session.out()
+
+
+@app.get("/uploadfile/sessions/{upload_id}", response_model=UploadSessionOut)
+async def read_upload_session(upload_id: str):
+    return get_upload_session(upload_id).out()
+
+
+@app.put("/uploadfile/sessions/{upload_id}", status_code=204, openapi_extra={
+    "requestBody": {"required": True, "content": {"application/octet-stream": {"schema": {"type": "string",
+                                                                                          "format": "binary"}}}}
+})
+async def upload_chunk(
+        upload_id: str, request: Request, offset: int = Query(..., ge=0), x_chunk_sha256: str = Header(...)
+):
+    session = get_upload_session(upload_id)
+    index, misaligned = divmod(offset, session.chunk_size)
+    if misaligned or index >= session.chunks:
+        raise HTTPException(status_code=400, detail="Offset must be the start of a chunk")
+    expected_length = session.chunk_length(index)
+    if index in session.received:
+        # already verified: its bytes in the file are final, only the same chunk again is fine
+        if session.received[index] != x_chunk_sha256.lower():
+            raise HTTPException(status_code=409, detail=f"Chunk {index} was already received with another checksum")
+        return
+    if index in session.writing:
+        raise HTTPException(status_code=409, detail=f"Chunk {index} is already being written")
+
+    # the bytes go to the chunk's own part of the file before they are verified, but that part only counts (and
+    # is only protected from being written again) once the checksum matches
+    session.writing.add(index)
+    try:
+        chunk_hash = hashlib.sha256()
+        written = 0
+        async for data in request.stream():
+            if written + len(data) > expected_length:
+                raise HTTPException(status_code=400, detail=f"Chunk {index} must be {expected_length} bytes")
+            await run_in_threadpool(_hash_and_pwrite, chunk_hash, session.fd, data, offset + written)
+            written += len(data)
+        if written != expected_length:
+            raise HTTPException(status_code=400, detail=f"Chunk {index} must be {expected_length} bytes")
+        if chunk_hash.hexdigest() != x_chunk_sha256.lower():
+            raise HTTPException(status_code=422, detail=f"Checksum mismatch for chunk {index}")
+        session.received[index] = chunk_hash.hexdigest()
+    finally:
+        session.writing.discard(index)
+        session.last_activity = time.monotonic()
+
+
+@app.post("/uploadfile/sessions/{upload_id}/finalize")
+async def finalize_upload_session(upload_id: str):
+    session = get_upload_session(upload_id)
+    missing = session.missing_chunks()
+    # a chunk still being written isn't received yet: so no write is in progress past this check
+    if missing:
+        raise HTTPException(status_code=409, detail={"missing_chunks": missing})
+    del upload_sessions[upload_id]  # and none can start from here on (a received chunk isn't written again)
+    await run_in_threadpool(os.fsync, session.fd)
+    session.close()
+    return {"filename": session.filename, "path": session.path, "size": session.size}
+
+
 # Multiple file uploads
-@app.post("/files/")
-async def create_files(files: List[bytes] = File(...)):
-    return {"file_sizes": [len(file) for file in files]}
+@app.post("/files/", openapi_extra=multipart_files_body)
+async def create_files(request: Request):
+    async with StreamingMultipartReceiver(request) as stored:
+        return {"file_sizes": [file.size for file in stored]}
+
+
+# Every uploaded file goes through upload_pipeline (size, sha256 and a fake virus scan) in a process pool, see
+# upload_processing.py. The response is streamed as JSON lines, one per file, in the order the files finish.
+upload_pipeline = UploadPipeline()
+
+
+@app.on_event("shutdown")
+def shutdown_upload_pipeline():
+    upload_pipeline.shutdown()
 
 
 @app.post("/uploadfiles/")
 async def create_upload_files(files: List[UploadFile] = File(...)):
-    return {"filenames": [file.filename for file in files]}
+    paths = await run_in_threadpool(save_uploads, files)
+
+    async def results():
+        try:
+            async for result in upload_pipeline.process(paths):
+                yield json.dumps(result) + "\n"
+        finally:  # the body failed halfway: the background task isn't run then
+            await run_in_threadpool(remove_files, paths)
+
+    # the background task also runs when the client is gone before the body is sent, and results() never starts
+    return StreamingResponse(results(), media_type="application/x-ndjson",
+                             background=BackgroundTask(remove_files, paths))
 
 
 @app.get("/")
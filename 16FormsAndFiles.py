@@ -5,17 +5,38 @@ You can define files and form fields at the same time using File and Form.
 Use File and Form together when you need to receive data and files in the same request.
 """
 
+import os
+
 from fastapi import FastAPI, File, Form, UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from .json_responses import DefaultJSONResponse
+from .upload_processing import UploadPipeline, save_upload
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
+
+# fileb is checked in a worker process (see upload_processing.py), so a slow check doesn't block other requests
+upload_pipeline = UploadPipeline(steps=("sha256", "scan"))
+
 
-app = FastAPI()
+@app.on_event("shutdown")
+def shutdown_upload_pipeline():
+    upload_pipeline.shutdown()
 
 
 @app.post("/files/")
 async def create_file(
         file: bytes = File(...), fileb: UploadFile = File(...), token: str = Form(...)
 ):
+    path = await run_in_threadpool(save_upload, fileb)
+    try:
+        fileb_result = [result async for result in upload_pipeline.process([(fileb.filename, path)])][0]
+    finally:
+        os.unlink(path)
     return {
         "file_size": len(file),
         "token": token,
         "fileb_content_type": fileb.content_type,
+        "fileb_sha256": fileb_result.get("sha256"),
+        "fileb_infected": fileb_result.get("infected"),
     }
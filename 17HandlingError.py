@@ -28,7 +28,9 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette import status
 from starlette.responses import PlainTextResponse
 
-app = FastAPI()
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
 items = {"foo": "The Foo Wrestlers"}
 
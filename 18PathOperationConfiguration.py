@@ -7,7 +7,9 @@ from typing import Optional, Set
 from fastapi import FastAPI, status
 from pydantic import BaseModel
 
-app = FastAPI()
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
 
 class Item(BaseModel):
@@ -12,10 +12,15 @@ from datetime import datetime
 from typing import Optional
 
 from fastapi import FastAPI
-from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 
-fake_db = {}
+from .fast_encoders import model_encoder
+from .json_responses import DefaultJSONResponse
+from .kv_store import open_store
+
+# A dict, or with KV_STORE_DIR set a KVStore (see kv_store.py): a database that only takes JSON compatible data, and
+# keeps it between restarts
+fake_db = open_store("json_compatible_items")
 
 
 class Item(BaseModel):
@@ -24,7 +29,11 @@ class Item(BaseModel):
     description: Optional[str] = None
 
 
-app = FastAPI()
+app = FastAPI(default_response_class=DefaultJSONResponse)
+
+# Gives the same dict as jsonable_encoder(item), but the work of looking at the Item fields is done once, here,
+# instead of on every call (see fast_encoders.py)
+encode_item = model_encoder(Item)
 
 
 # receives the JSON compatible string == datetime
@@ -33,6 +42,6 @@ def update_item(id: str, item: Item):
     # here it's already converted with pydantic to python datetime
     print(item.timestamp)
     # here we converting it again to json
-    json_compatible_item_data = jsonable_encoder(item)
+    json_compatible_item_data = encode_item(item)
     print(json_compatible_item_data)
     fake_db[id] = json_compatible_item_data
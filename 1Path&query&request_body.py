@@ -4,9 +4,11 @@ from typing import Optional
 from fastapi import FastAPI
 
 # uvicorn main:app --reload to start the server
-from serializers import Item
+from .serializers import Item
 
-app = FastAPI()  # FastAPI is a class that inherits directly from Starlette.
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)  # FastAPI is a class that inherits directly from Starlette.
 
 """Path" here refers to the last part of the URL starting from the first /
 A "path" is also commonly called an "endpoint" or a "route".
@@ -1,13 +1,20 @@
 """
 Update replacing with PUT
 """
+import os
 from typing import List, Optional
 
-from fastapi import FastAPI
-from fastapi.encoders import jsonable_encoder
+from fastapi import FastAPI, Header, HTTPException, Response
 from pydantic import BaseModel
 
-app = FastAPI()
+from .conditional_requests import ConditionalRoute, cache_control, not_modified
+from .fast_encoders import model_encoder
+from .item_store import VersionConflict, etag, item_store_from_url, parse_if_match
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
+# ETags, If-None-Match and Cache-Control for the GET routes, see conditional_requests.py
+app.router.route_class = ConditionalRoute
 
 
 class Item(BaseModel):
@@ -24,16 +31,40 @@ items = {
     "baz": {"name": "Baz", "description": None, "price": 50.2, "tax": 10.5, "tags": []},
 }
 
+# The items live in an ItemStore (see item_store.py): every item has a version, sent as the ETag header. Send it back
+# in If-Match with a PUT or PATCH and the update is refused with 412 if somebody else changed the item in between.
+# ITEM_STORE=sqlite:///items.db shares the items between all the uvicorn workers, the default keeps them in memory.
+# The store is blocking, so the path operations below are normal def functions, run in the threadpool.
+item_store = item_store_from_url(os.environ.get("ITEM_STORE", "memory"), initial=items)
+
 
+# The version is already the ETag, so a client that has the current version (If-None-Match) gets an empty 304 before
+# anything is validated or serialized. no-cache: clients may keep the item, but must check it is still current.
 @app.get("/items/{item_id}", response_model=Item)
-async def read_item(item_id: str):
-    return items[item_id]
+@cache_control("no-cache")
+def read_item(item_id: str, response: Response, if_none_match: Optional[str] = Header(None)):
+    stored = item_store.get(item_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    data, version = stored
+    if not_modified(if_none_match, etag(version)):
+        return Response(status_code=304, headers={"ETag": etag(version)})
+    response.headers["ETag"] = etag(version)
+    return data
+
+
+# The same result as jsonable_encoder(item), with an encoder built once for the Item class, see fast_encoders.py
+encode_item = model_encoder(Item)
 
 
 @app.put("/items/{item_id}", response_model=Item)
-async def update_item(item_id: str, item: Item):
-    update_item_encoded = jsonable_encoder(item)
-    items[item_id] = update_item_encoded
+def update_item(item_id: str, item: Item, response: Response, if_match: Optional[str] = Header(None)):
+    update_item_encoded = encode_item(item)
+    try:
+        version = item_store.put(item_id, update_item_encoded, expected_version=parse_if_match(if_match))
+    except VersionConflict:
+        raise HTTPException(status_code=412, detail="Item was modified, fetch it again")
+    response.headers["ETag"] = etag(version)
     return update_item_encoded
 
 
@@ -52,12 +83,29 @@ Then you can use this to generate a dict with only the data that was set (sent i
 """
 
 
+# The tutorial way to do it:
+#
+#     stored_item_data = items[item_id]
+#     stored_item_model = Item(**stored_item_data)
+#     update_data = item.dict(exclude_unset=True)
+#     updated_item = stored_item_model.copy(update=update_data)  # create a copy of the existing model using .copy(),
+#     # and pass the update parameter with a dict containing the data to update
+#     items[item_id] = jsonable_encoder(updated_item)
+#     return updated_item
+#
+# The stored data is already JSON compatible, so instead of building a model from it and encoding it all again, only
+# the fields that were sent (item.__fields_set__, the same ones as item.dict(exclude_unset=True)) are encoded and
+# merged into the stored dict, by the store, under the item's lock. The response is the same: response_model=Item
+# fills in the defaults.
 @app.patch("/items/{item_id}", response_model=Item)
-async def update_item(item_id: str, item: Item):
-    stored_item_data = items[item_id]
-    stored_item_model = Item(**stored_item_data)
-    update_data = item.dict(exclude_unset=True)
-    updated_item = stored_item_model.copy(update=update_data)  # create a copy of the existing model using .copy(),
-    # and pass the update parameter with a dict containing the data to update
-    items[item_id] = jsonable_encoder(updated_item)
-    return updated_item
+def update_item(item_id: str, item: Item, response: Response, if_match: Optional[str] = Header(None)):
+    try:
+        updated_item_data, version = item_store.update(
+            item_id, encode_item(item, item.__fields_set__), expected_version=parse_if_match(if_match)
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Item not found")
+    except VersionConflict:
+        raise HTTPException(status_code=412, detail="Item was modified, fetch it again")
+    response.headers["ETag"] = etag(version)
+    return updated_item_data
@@ -37,7 +37,9 @@ from typing import Optional
 
 from fastapi import Depends, FastAPI
 
-app = FastAPI()
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
 
 # It is just a function that can take all the same parameters that a path operation function can take:
@@ -16,7 +16,13 @@ from typing import Optional
 
 from fastapi import Cookie, Depends, FastAPI
 
-app = FastAPI()
+from .dependency_plans import PlannedRoute
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
+# the dependency tree of every route is turned into a plan once, and timed, see dependency_plans.py
+# (dependency_report(app) shows where the time goes)
+app.router.route_class = PlannedRoute
 
 
 # First dependency "dependable. THis will be run first
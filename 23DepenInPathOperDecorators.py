@@ -15,14 +15,21 @@ And they can return values or not, the values won't be used.
 
 from fastapi import Depends, FastAPI, Header, HTTPException
 
-app = FastAPI()
+from .dependency_plans import PlannedRoute, independent
+from .json_responses import DefaultJSONResponse
 
+app = FastAPI(default_response_class=DefaultJSONResponse)
+app.router.route_class = PlannedRoute
 
+
+# @independent: verify_token and verify_key are awaited concurrently, see dependency_plans.py
+@independent
 async def verify_token(x_token: str = Header(...)):
     if x_token != "fake-super-secret-token":
         raise HTTPException(status_code=400, detail="X-Token header invalid")
 
 
+@independent
 async def verify_key(x_key: str = Header(...)):
     if x_key != "fake-super-secret-key":
         raise HTTPException(status_code=400, detail="X-Key header invalid")
@@ -13,19 +13,30 @@ Later, when reading about how to structure bigger applications (Bigger Applicati
 
 from fastapi import Depends, FastAPI, Header, HTTPException
 
+from .dependency_plans import PlannedRoute, independent
+from .json_responses import DefaultJSONResponse
 
+
+# @independent: verify_token and verify_key are awaited concurrently, see dependency_plans.py
+@independent
 async def verify_token(x_token: str = Header(...)):
     if x_token != "fake-super-secret-token":
         raise HTTPException(status_code=400, detail="X-Token header invalid")
 
 
+@independent
 async def verify_key(x_key: str = Header(...)):
     if x_key != "fake-super-secret-key":
         raise HTTPException(status_code=400, detail="X-Key header invalid")
     return x_key
 
 
-app = FastAPI(dependencies=[Depends(verify_token), Depends(verify_key)])
+app = FastAPI(
+    dependencies=[Depends(verify_token), Depends(verify_key)],
+    default_response_class=DefaultJSONResponse,
+)
+# the global dependencies are part of the dependencies of every route, planned with them
+app.router.route_class = PlannedRoute
 
 
 @app.get("/items/")
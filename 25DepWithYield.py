@@ -14,6 +14,8 @@ To do this, use yield instead of return, and write the extra steps after.
 """
 from fastapi import Depends, File
 
+from .resource_pool import ResourcePool
+
 
 class DBSession:
     def __init__(self):
@@ -112,3 +114,25 @@ class MySuperContextManager:
 async def get_db():
     with MySuperContextManager() as db:
         yield db
+
+
+"""
+# Pooled resources
+Both get_db above create a DBSession for every request, and the request waits for it (with a real database: the
+connection, TLS, the authentication, ...). A pool keeps sessions open and hands them out again, so the setup leaves
+the request path: the min_size sessions are created ahead of time, up to max_size when many requests need one at the
+same time, and a request that can't get one within acquire_timeout gets a PoolTimeout instead of waiting forever.
+Sessions are replaced after max_lifetime seconds, and a check (a "SELECT 1", ...) can make sure an idle one still
+works before it is handed out. See resource_pool.py
+
+Create the sessions when the app starts with app.add_event_handler("startup", db_pool.start) and
+app.add_event_handler("shutdown", db_pool.close) (else the first request creates them).
+"""
+db_pool = ResourcePool(DBSession, close=lambda db: db.close(), min_size=2, max_size=10,
+                       max_lifetime=30 * 60, acquire_timeout=5)
+
+
+async def get_pooled_db():
+    # The session goes back to the pool after the response, instead of being closed
+    async with db_pool.resource() as db:
+        yield db
@@ -4,7 +4,9 @@ from fastapi import Depends, FastAPI
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 
-app = FastAPI()
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 """
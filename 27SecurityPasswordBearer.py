@@ -32,6 +32,8 @@ from fastapi import Depends, FastAPI, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
 
+from .json_responses import DefaultJSONResponse
+
 fake_users_db = {
     "johndoe": {
         "username": "johndoe",
@@ -49,7 +51,7 @@ fake_users_db = {
     },
 }
 
-app = FastAPI()
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
 
 def fake_hash_password(password: str):
@@ -29,8 +29,12 @@ You can then modify further the response before returning it.
 import time
 
 from fastapi import FastAPI, Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-app = FastAPI()
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
 
 @app.middleware("http")
@@ -43,3 +47,50 @@ async def add_process_time_header(request: Request, call_next):
     process_time = time.time() - start_time
     response.headers["X-Process-Time"] = str(process_time)
     return response
+
+
+"""
+Pure ASGI middleware
+
+@app.middleware("http") is built on Starlette's BaseHTTPMiddleware.
+It runs call_next in a separate task and pipes the whole response body through a memory stream, so every request
+pays for an extra task and an extra copy of the body.
+
+The same thing can be written as a plain ASGI class. It receives the app it wraps, and for every request it is called
+with scope, receive and send. To change the response we wrap send and edit the "http.response.start" message (the one
+that carries the status code and the headers) before passing it on.
+Nothing else is touched, so streaming responses keep streaming.
+
+You add it with app.add_middleware(ProcessTimeMiddleware).
+"""
+
+
+class ProcessTimeMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":  # lifespan and websocket messages are passed through untouched
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+
+        async def send_with_process_time(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Process-Time", str(time.perf_counter() - start_time))
+            await send(message)
+
+        await self.app(scope, receive, send_with_process_time)
+
+
+asgi_app = FastAPI(default_response_class=DefaultJSONResponse)
+asgi_app.add_middleware(ProcessTimeMiddleware)
+
+
+# the same hello world route on both apps, see benchmarks/bench_middleware.py
+@app.get("/")
+@asgi_app.get("/")
+async def read_root():
+    return {"message": "Hello World"}
@@ -3,7 +3,13 @@ from typing import Optional, List
 
 from fastapi import FastAPI, Query
 
-app = FastAPI()
+from .fast_params import FastParamsRoute
+from .json_responses import DefaultJSONResponse
+from .parameter_limits import ParameterLimitsMiddleware
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
+app.router.route_class = FastParamsRoute  # scalar parameters checked by compiled code, see fast_params.py
+app.add_middleware(ParameterLimitsMiddleware)  # bounds repeated q= parameters, see parameter_limits.py
 
 
 # async def read_items(q: Optional[str] = None):
@@ -5,12 +5,355 @@ Use StaticFiles¶
 Import StaticFiles.
 "Mount" a StaticFiles() instance in a specific path.
 """
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+from collections import OrderedDict
+from email.utils import formatdate
+from typing import Dict, List, Optional, Tuple
+
+import anyio
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse
+from starlette.types import Receive, Scope, Send
+
+from ..json_responses import DefaultJSONResponse
+
+logger = logging.getLogger(__name__)
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
+
+STATIC_DIR = os.environ.get("STATIC_DIR", "static")
+
+# The plain way to do it, every request stats and opens the file:
+# app.mount("/static", StaticFiles(directory="static"), name="static")
+
+"""
+Serving static files from a manifest
+
+ManifestStaticFiles below is a drop-in replacement for StaticFiles (GET and HEAD only, no html mode) that:
+
+- walks the directory once, when it is created, and keeps a manifest of every file: size, media type,
+  Last-Modified and a strong ETag (a hash of the content). Requests don't stat anything, files added, changed or
+  deleted later are picked up by poll() a few seconds later (see the hot asset cache below).
+- answers If-None-Match with 304 Not Modified, without touching the file (with the weak comparison, so W/"..."
+  validators sent back by caches match too).
+- serves a pre-built "app.js.br" or "app.js.gz" next to "app.js" when the client accepts that encoding
+  (build them with e.g. `brotli -k` / `gzip -k`). Nothing is compressed at request time.
+- supports single byte ranges (Range: bytes=...), for video and resumable downloads.
+- uses the ASGI "zero copy send" extension when the server offers it, so the kernel sends the file (sendfile)
+  without copying it through Python. Otherwise the file is read and sent in chunks.
+"""
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))  # in order of preference
+CHUNK_SIZE = 64 * 1024
+
+
+class StaticAsset:
+    def __init__(self, path: str, media_type: str, encoding: Optional[str] = None):
+        stat_result = os.stat(path)
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(block)
+        self.path = path
+        self.size = stat_result.st_size
+        self.media_type = media_type
+        self.encoding = encoding
+        self.etag = f'"{digest.hexdigest()}"'
+        self.last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+        self.variants: Dict[str, "StaticAsset"] = {}  # content-coding -> pre-compressed sibling
+        self.vary = False  # True when the file has pre-compressed variants
+        self.signature: tuple = ()  # sizes and mtimes of the file and its variants, see scan_directory()
+
+    def headers(self) -> List[Tuple[bytes, bytes]]:
+        headers = [
+            (b"content-type", self.media_type.encode()),
+            (b"etag", self.etag.encode()),
+            (b"last-modified", self.last_modified.encode()),
+            (b"accept-ranges", b"bytes"),
+        ]
+        if self.encoding:
+            headers.append((b"content-encoding", self.encoding.encode()))
+        if self.vary:
+            headers.append((b"vary", b"Accept-Encoding"))
+        return headers
+
+
+def scan_directory(directory: str) -> Dict[str, Tuple[str, tuple]]:
+    """Maps every servable file to its path and a signature that changes when the file or a variant changes."""
+    found: Dict[str, Tuple[str, tuple]] = {}
+    directory = os.path.realpath(directory)
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, directory).replace(os.sep, "/")
+            if any(name.endswith(suffix) and os.path.isfile(path[:-len(suffix)]) for _, suffix in ENCODINGS):
+                continue  # a pre-compressed variant, attached to its original
+            signature = []
+            for variant_path in [path] + [path + suffix for _, suffix in ENCODINGS]:
+                try:
+                    stat_result = os.stat(variant_path)
+                    signature.append((stat_result.st_size, stat_result.st_mtime_ns))
+                except FileNotFoundError:
+                    signature.append(None)
+            found[name] = (path, tuple(signature))
+    return found
+
+
+def load_asset(path: str, signature: tuple = ()) -> StaticAsset:
+    media_type = mimetypes.guess_type(path)[0] or "text/plain"
+    if media_type.startswith("text/") or media_type == "application/javascript":
+        media_type += "; charset=utf-8"
+    asset = StaticAsset(path, media_type)
+    for encoding, suffix in ENCODINGS:
+        if os.path.isfile(path + suffix):
+            asset.variants[encoding] = StaticAsset(path + suffix, media_type, encoding)
+    asset.vary = bool(asset.variants)
+    for variant in asset.variants.values():
+        variant.vary = True
+    asset.signature = signature
+    return asset
+
+
+def build_manifest(directory: str) -> Dict[str, StaticAsset]:
+    return {name: load_asset(path, signature) for name, (path, signature) in scan_directory(directory).items()}
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        name, _, value = params.partition("=")
+        try:
+            quality = float(value) if name.strip().lower() == "q" else 1.0
+        except ValueError:
+            quality = 1.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Returns (start, end) inclusive for a single "bytes=" range, None to send the whole file, (-1, -1) for 416."""
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None  # other units and multiple ranges are allowed to be ignored
+    first, _, last = ranges.strip().partition("-")
+    try:
+        if first:
+            start, end = int(first), int(last) if last else size - 1
+            if last and end < start:
+                return None  # an invalid range ("bytes=5-2"), ignored like the other invalid ones
+        else:
+            start, end = size - int(last), size - 1
+    except ValueError:
+        return None
+    start, end = max(start, 0), min(end, size - 1)
+    if start > end:
+        return -1, -1
+    return start, end
+
+
+"""
+Hot asset cache
+
+Most hits usually go to a few dozen small files. HotAssetCache keeps their bytes in memory together with the
+ready-made response headers, so a hit is a dict lookup and two send() calls, no file system at all.
+Only files up to max_file_size are cached, and when the total goes over max_bytes the least recently used files are
+dropped.
+
+Files can change on disk while the app runs, so ManifestStaticFiles.poll() re-scans the directory every few seconds
+(comparing sizes and modification times) and reloads the changed files' manifest entries, dropping them from the
+cache.
+"""
+
+
+class HotAssetCache:
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_file_size: int = 256 * 1024):
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.entries: "OrderedDict[str, Tuple[str, List[Tuple[bytes, bytes]], bytes]]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, asset: StaticAsset) -> Optional[Tuple[List[Tuple[bytes, bytes]], bytes]]:
+        entry = self.entries.get(asset.path)
+        if entry is None or entry[0] != asset.etag:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(asset.path)
+        self.hits += 1
+        return entry[1], entry[2]
+
+    def put(self, asset: StaticAsset, body: bytes) -> Tuple[List[Tuple[bytes, bytes]], bytes]:
+        headers = asset.headers() + [(b"content-length", str(len(body)).encode())]
+        if len(body) <= self.max_file_size:
+            self.invalidate(asset.path)
+            self.entries[asset.path] = (asset.etag, headers, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, _, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+        return headers, body
+
+    def invalidate(self, path: str) -> None:
+        entry = self.entries.pop(path, None)
+        if entry is not None:
+            self.size -= len(entry[2])
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+class ManifestStaticFiles:
+    def __init__(self, directory: str, cache: Optional[HotAssetCache] = None):
+        if not os.path.isdir(directory):
+            raise RuntimeError(f"Directory '{directory}' does not exist")
+        self.directory = directory
+        self.manifest = build_manifest(directory)
+        self.cache = cache
+
+    def scan_changes(self) -> Dict[str, Optional[StaticAsset]]:
+        """
+        Blocking. Returns the reloaded assets of new or changed files, and None for deleted ones.
+        A file that can't be loaded (deleted while it is read, not readable, ...) keeps its old entry until a later
+        scan loads it.
+        """
+        found = scan_directory(self.directory)
+        changes: Dict[str, Optional[StaticAsset]] = {name: None for name in self.manifest if name not in found}
+        for name, (path, signature) in found.items():
+            current = self.manifest.get(name)
+            if current is None or current.signature != signature:
+                try:
+                    changes[name] = load_asset(path, signature)
+                except OSError as error:
+                    logger.warning("Can't load the static file %s: %s", path, error)
+        return changes
+
+    def apply_changes(self, changes: Dict[str, Optional[StaticAsset]]) -> None:
+        for name, asset in changes.items():
+            old = self.manifest.pop(name, None)
+            if old is not None and self.cache is not None:
+                for cached in [old] + list(old.variants.values()):
+                    self.cache.invalidate(cached.path)
+            if asset is not None:
+                self.manifest[name] = asset
+
+    async def poll(self, interval: float = 2.0) -> None:
+        while True:
+            await anyio.sleep(interval)
+            # scanning and hashing happens in a thread, the manifest and the cache are only changed here, in the
+            # event loop, so requests never see them half updated
+            try:
+                changes = await anyio.to_thread.run_sync(self.scan_changes)
+            except OSError:  # the whole directory, e.g. removed: the next scan tries again
+                logger.exception("Can't scan the static files directory %s", self.directory)
+                continue
+            self.apply_changes(changes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        assert scope["type"] == "http"
+        if scope["method"] not in ("GET", "HEAD"):
+            await PlainTextResponse("Method Not Allowed", status_code=405)(scope, receive, send)
+            return
+        asset = self.manifest.get(scope["path"].lstrip("/"))
+        if asset is None:
+            await PlainTextResponse("Not Found", status_code=404)(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        if asset.variants:
+            accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+            for encoding, _ in ENCODINGS:
+                if encoding in accepted and encoding in asset.variants:
+                    asset = asset.variants[encoding]
+                    break
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None and (
+                if_none_match.strip() == "*"
+                or asset.etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+        ):
+            headers = [header for header in asset.headers() if header[0] in (b"etag", b"last-modified", b"vary")]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        status, start, end = 200, 0, asset.size - 1
+        extra_headers = []
+        range_header = request_headers.get("range")
+        if range_header is not None and request_headers.get("if-range", asset.etag) == asset.etag:
+            requested = parse_range(range_header, asset.size)
+            if requested == (-1, -1):
+                headers = [(b"content-range", f"bytes */{asset.size}".encode()), (b"content-length", b"0")]
+                await send({"type": "http.response.start", "status": 416, "headers": headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            if requested is not None:
+                status, (start, end) = 206, requested
+                extra_headers.append((b"content-range", f"bytes {start}-{end}/{asset.size}".encode()))
+
+        if status == 200 and scope["method"] == "GET" and self.cache is not None \
+                and asset.size <= self.cache.max_file_size:
+            cached = self.cache.get(asset)
+            if cached is None:
+                cached = self.cache.put(asset, await anyio.to_thread.run_sync(read_file, asset.path))
+            headers, body = cached
+            await send({"type": "http.response.start", "status": 200, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        length = end - start + 1
+        headers = asset.headers() + extra_headers + [(b"content-length", str(length).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        if scope["method"] == "HEAD" or length == 0:
+            await send({"type": "http.response.body", "body": b""})
+        elif "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(asset.path, "rb") as file:
+                await send({"type": "http.response.zerocopysend", "file": file, "offset": start, "count": length})
+        else:
+            async with await anyio.open_file(asset.path, mode="rb") as file:
+                await file.seek(start)
+                remaining = length
+                while remaining:
+                    chunk = await file.read(min(CHUNK_SIZE, remaining))
+                    remaining = remaining - len(chunk) if chunk else 0  # the file got shorter since startup
+                    await send({"type": "http.response.body", "body": chunk, "more_body": bool(remaining)})
+
+
+static_files = ManifestStaticFiles(directory=STATIC_DIR, cache=HotAssetCache())
+
+
+@app.on_event("startup")
+async def start_static_files_polling():
+    app.state.static_files_polling = asyncio.create_task(static_files.poll())
+
+
+@app.on_event("shutdown")
+async def stop_static_files_polling():
+    app.state.static_files_polling.cancel()
 
-app = FastAPI()
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", static_files, name="static")
 
 """
 What is "Mounting"¶
@@ -3,14 +3,20 @@ from typing import Optional
 from fastapi import FastAPI, Header, HTTPException
 from pydantic import BaseModel
 
+from ...conditional_requests import ConditionalRoute, cache_control
+from ...kv_store import open_store
+
 fake_secret_token = "coneofsilence"
 
-fake_db = {
+# A dict, or with KV_STORE_DIR set a KVStore that keeps the items on disk between restarts (see kv_store.py)
+fake_db = open_store("testing_items", {
     "foo": {"id": "foo", "title": "Foo", "description": "There goes my hero"},
     "bar": {"id": "bar", "title": "Bar", "description": "The bartenders"},
-}
+})
 
 app = FastAPI()
+# ETags, If-None-Match and Cache-Control for the GET routes, see conditional_requests.py
+app.router.route_class = ConditionalRoute
 
 
 class Item(BaseModel):
@@ -20,6 +26,7 @@ class Item(BaseModel):
 
 
 @app.get("/items/{item_id}", response_model=Item)
+@cache_control("private, no-cache")  # private: the item is only for clients with the token, not for shared caches
 async def read_main(item_id: str, x_token: str = Header(...)):
     if x_token != fake_secret_token:
         raise HTTPException(status_code=400, detail="Invalid X-Token header")
@@ -34,5 +41,5 @@ async def create_item(item: Item, x_token: str = Header(...)):
         raise HTTPException(status_code=400, detail="Invalid X-Token header")
     if item.id in fake_db:
         raise HTTPException(status_code=400, detail="Item already exists")
-    fake_db[item.id] = item
+    fake_db[item.id] = item.dict()  # only JSON compatible data in the store
     return item
\ No newline at end of file
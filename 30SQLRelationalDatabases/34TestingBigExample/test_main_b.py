@@ -11,11 +11,14 @@ For cookies, a dict in the cookies parameter.
 Note that the TestClient receives data that can be converted to JSON, not Pydantic models.
 If you have a Pydantic model in your test and you want to send its data to the application during testing, you can use
 the jsonable_encoder described in JSON Compatible Encoder.
-to run type in console: pytest
+to run type in console, at the root of the repository: pytest
+(main_b is imported as a part of the tutorial package, for its relative imports, see conftest.py there)
 """
+import importlib
+
 from fastapi.testclient import TestClient
 
-from main_b import app
+app = importlib.import_module("fast_api_tutorial.30SQLRelationalDatabases.34TestingBigExample.main_b").app
 
 client = TestClient(app)
 
@@ -1,26 +1,49 @@
 from typing import List
 
-from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi import Depends, FastAPI, HTTPException
 from sqlalchemy.orm import Session
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from . import crud, models, schemas
 from .database import SessionLocal, engine
+from ..compiled_serializers import CompiledSerializerRoute
+from ..compression import CompressionMiddleware, compression
+from ..json_responses import DefaultJSONResponse
 
-models.Base.metadata.create_all(bind=engine)
+app = FastAPI(default_response_class=DefaultJSONResponse)
+app.router.route_class = CompiledSerializerRoute  # see compiled_serializers.py
 
-app = FastAPI()
+
+# The tables are created when the app starts, not when the module is imported: importing the app (a worker starting,
+# a test, a script that only needs the routes) doesn't connect to the database
+@app.on_event("startup")
+def create_tables():
+    models.Base.metadata.create_all(bind=engine)
 
 
 # Alternative DB session with middleware
-@app.middleware("http")
-async def db_session_middleware(request: Request, call_next):
-    response = Response("Internal server error", status_code=500)
-    try:
-        request.state.db = SessionLocal()
-        response = await call_next(request)
-    finally:
-        request.state.db.close()
-    return response
+# Written as a pure ASGI class instead of @app.middleware("http") (see 29Middleware.py): no extra task and no copy of
+# the response body per request. request.state is backed by scope["state"], so request.state.db works the same way.
+class DBSessionMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        db = SessionLocal()
+        scope.setdefault("state", {})["db"] = db
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            db.close()
+
+
+app.add_middleware(DBSessionMiddleware)
+# zstd / brotli / gzip for the responses of 1 KiB and more (see compression.py), the list endpoints are the big ones
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
 
 
 """
@@ -54,7 +77,10 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return crud.create_user(db=db, user=user)
 
 
+# gzip level 4 is about twice as fast as the default 6 on this kind of JSON, for less than 1% bigger responses
+# (python -m benchmarks.bench_compression)
 @app.get("/users/", response_model=List[schemas.User])
+@compression(gzip=4)
 def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     users = crud.get_users(db, skip=skip, limit=limit)
     return users
@@ -76,6 +102,7 @@ def create_item_for_user(
 
 
 @app.get("/items/", response_model=List[schemas.Item])
+@compression(gzip=4)
 def read_items(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     items = crud.get_items(db, skip=skip, limit=limit)
     return items
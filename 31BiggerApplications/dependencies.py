@@ -1,15 +1,26 @@
 """
 We see that we are going to need some dependencies used in several places of the application.
 So we put them in their own dependencies module (app/dependencies.py).
+
+Checking a token usually means asking an auth service or the database, and every request to the app (get_query_token
+is global) and to /items (get_token_header) does it again. A valid token stays valid for a while, so the checks are
+cached for the whole application with a TTL, per token: dependency_cache.invalidate(get_token_header, token) forgets
+a revoked token right away. An invalid token raises, and that is never cached. See dependency_cache.py
 """
 from fastapi import Header, HTTPException
 
+from ..dependency_cache import DependencyCache
+
+dependency_cache = DependencyCache(maxsize=10_000)
+
 
+@dependency_cache.cached(ttl=60, key=lambda x_token: x_token)
 async def get_token_header(x_token: str = Header(...)):
     if x_token != "fake-super-secret-token":
         raise HTTPException(status_code=400, detail="X-Token header invalid")
 
 
+@dependency_cache.cached(ttl=60, key=lambda token: token)
 async def get_query_token(token: str):
     if token != "jessica":
         raise HTTPException(status_code=400, detail="No Jessica token provided")
@@ -1,23 +1,54 @@
+import os
+
 from fastapi import Depends, FastAPI
 
-from .dependencies import get_query_token, get_token_header
-from .internal import admin
-from .routers import items, users
+from .dependencies import dependency_cache, get_query_token, get_token_header
+from ..compiled_router import use_compiled_router
+from ..json_responses import DefaultJSONResponse
+from ..lazy_routers import LazyRouters
+from ..openapi_cache import serve_cached_openapi
 
 #  declare global dependencies that will be combined with the dependencies for each APIRouter:
-app = FastAPI(dependencies=[Depends(get_query_token)])
+app = FastAPI(dependencies=[Depends(get_query_token)], default_response_class=DefaultJSONResponse)
+# The requests find their route in a tree of the paths instead of trying every route's regex: with hundreds of routers
+# matching stays as fast for the last route and for 404s as for the first one. See compiled_router.py
+use_compiled_router(app)
 
 # With app.include_router() we can add each APIRouter to the main FastAPI application.
 # It will include all the routes from that router as part of it.
-app.include_router(users.router)
-app.include_router(items.router)
-app.include_router(
-    admin.router,
+# Here they are included by module path: a router module is only imported on the first request to it, or in the
+# background once the app started, so a new worker answers its first request without importing them all. Their paths
+# and OpenAPI operations are kept in the manifest file, see lazy_routers.py
+lazy_routers = LazyRouters(
+    app,
+    package=__package__,
+    manifest=os.environ.get("LAZY_ROUTERS_MANIFEST", os.path.join(os.path.dirname(__file__), "lazy_routers.json")),
+)
+lazy_routers.include(".routers.users")
+lazy_routers.include(".routers.items")
+lazy_routers.include(
+    ".internal.admin",
     prefix="/admin",
     tags=["admin"],
     dependencies=[Depends(get_token_header)],
     responses={418: {"description": "I'm a teapot"}},
 )
+# The OpenAPI document is built once on startup (from the manifest, the routers don't have to be imported for it), or
+# read from the OPENAPI_FILE written at build time, and served precompressed with an ETag. See openapi_cache.py
+openapi_document = serve_cached_openapi(app, os.environ.get("OPENAPI_FILE"))
+
+
+# The application-wide dependency cache (see dependencies.py): its metrics, and a way to drop the cached tokens, e.g.
+# after revoking one. Behind the X-Token check like the rest of the admin operations.
+@app.get("/admin/dependency-cache", tags=["admin"], dependencies=[Depends(get_token_header)])
+async def read_dependency_cache():
+    return dependency_cache.stats()
+
+
+@app.delete("/admin/dependency-cache", tags=["admin"], dependencies=[Depends(get_token_header)])
+async def clear_dependency_cache():
+    dependency_cache.invalidate()
+    return dependency_cache.stats()
 
 
 # We can also add path operations directly to the FastAPI app.
@@ -23,6 +23,7 @@ operations. Even if the dependencies are not added individually to each one of t
 from fastapi import APIRouter, Depends, HTTPException
 
 from ..dependencies import get_token_header
+from ...kv_store import open_store
 
 """
 We know all the path operations in this module have the same:
@@ -39,12 +40,13 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-fake_items_db = {"plumbus": {"name": "Plumbus"}, "gun": {"name": "Portal Gun"}}
+# A dict, or with KV_STORE_DIR set a KVStore that keeps the items on disk between restarts (see kv_store.py)
+fake_items_db = open_store("bigger_applications_items", {"plumbus": {"name": "Plumbus"}, "gun": {"name": "Portal Gun"}})
 
 
 @router.get("/")
 async def read_items():
-    return fake_items_db
+    return dict(fake_items_db)
 
 
 @router.get("/{item_id}")
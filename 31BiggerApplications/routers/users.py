@@ -0,0 +1,13 @@
+"""
+The users router of main.py, the submodule at app/routers/users.py described in 31BiggerApplications.py.
+
+main.py includes it next to routers/items.py, the app can't be imported (nor its dependency cache used) without it.
+"""
+from fastapi import APIRouter
+
+router = APIRouter()
+
+
+@router.get("/users/", tags=["users"])
+async def read_users():
+    return [{"username": "Rick"}, {"username": "Morty"}]
@@ -16,7 +16,9 @@ For example, let's say you receive a file that must go through a slow process, y
 
 from fastapi import BackgroundTasks, FastAPI
 
-app = FastAPI()
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
 
 def write_notification(email: str, message=""):
@@ -53,7 +55,7 @@ from typing import Optional
 
 from fastapi import BackgroundTasks, Depends, FastAPI
 
-app = FastAPI()
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
 
 def write_log(message: str):
@@ -3,8 +3,13 @@ Metadata and Docs URLs
 You can customize several metadata configurations in your FastAPI application.
 """
 
+import os
+
 from fastapi import FastAPI
 
+from .json_responses import DefaultJSONResponse
+from .openapi_cache import serve_cached_openapi
+
 # app = FastAPI(
 #     title="My Super Project",
 #     description="This is a very fancy project, with auto docs for the API and everything",
@@ -31,10 +36,18 @@ tags_metadata = [
 ]
 # By default, the OpenAPI schema is served at /openapi.json.
 # But you can configure it with the parameter openapi_url.
-app = FastAPI(openapi_tags=tags_metadata, openapi_url="/api/v1/openapi.json")
+app = FastAPI(
+    openapi_tags=tags_metadata,
+    openapi_url="/api/v1/openapi.json",
+    default_response_class=DefaultJSONResponse,
+)
 # If you want to disable the OpenAPI schema completely you can set openapi_url=None, that will also disable the
 # documentation user interfaces that use it.
 
+# The document at /api/v1/openapi.json is built once on startup (or read from the OPENAPI_FILE written at build time
+# with --write-openapi) and served precompressed, with an ETag. See openapi_cache.py
+openapi_document = serve_cached_openapi(app, os.environ.get("OPENAPI_FILE"))
+
 """
 You can configure the two documentation user interfaces included:
 
@@ -10,7 +10,9 @@ Use the TestClient object the same way as you do with requests.
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
-app = FastAPI()
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
 
 @app.get("/")
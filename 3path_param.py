@@ -10,7 +10,11 @@ from typing import Optional
 
 from fastapi import FastAPI, Path, Query
 
-app = FastAPI()
+from .fast_params import FastParamsRoute
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
+app.router.route_class = FastParamsRoute  # scalar parameters checked by compiled code, see fast_params.py
 
 
 @app.get("/items/{item_id}")
@@ -11,7 +11,9 @@ from pydantic import BaseModel
 
 from serializers import Item, User
 
-app = FastAPI()
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
 
 @app.put("/items/{item_id}")
@@ -3,10 +3,12 @@ from typing import Optional
 from fastapi import Body, FastAPI
 from pydantic import BaseModel, Field
 
+from .json_responses import DefaultJSONResponse
+
 """
 Notice that Field is imported directly from pydantic, not from fastapi as are all the rest (Query, Path, Body, etc).
 """
-app = FastAPI()
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
 
 class Item(BaseModel):
@@ -8,7 +8,9 @@ from typing import Optional, List, Set, Dict
 from fastapi import FastAPI
 from pydantic import BaseModel, HttpUrl
 
-app = FastAPI()
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
 
 # https://pydantic-docs.helpmanual.io/usage/types/
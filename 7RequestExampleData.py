@@ -8,7 +8,9 @@ from typing import Optional
 from fastapi import FastAPI, Body
 from pydantic import BaseModel, Field
 
-app = FastAPI()
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
 
 class Item(BaseModel):
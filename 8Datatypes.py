@@ -48,7 +48,9 @@ from uuid import UUID
 
 from fastapi import Body, FastAPI
 
-app = FastAPI()
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
 
 @app.put("/items/{item_id}")
@@ -14,7 +14,9 @@ from typing import Optional
 
 from fastapi import Cookie, FastAPI, Response
 
-app = FastAPI()
+from .json_responses import DefaultJSONResponse
+
+app = FastAPI(default_response_class=DefaultJSONResponse)
 
 
 # not working :
@@ -1,12 +1,16 @@
 """
 Файл который использует пайчарм чтобы запускать сервак
-"""
-import uvicorn
 
+Runs an app of the tutorial with the multi-process launcher (see launcher.py):
+
+    python -m fast_api_tutorial                          # 20UpdatesPUT:app, one worker per CPU core
+    python -m fast_api_tutorial 11ResponseModel:app --workers 4 --port 8080
+    python -m fast_api_tutorial 20UpdatesPUT:app --reload  # development, the single process with the reloader
+"""
+try:
+    from .launcher import main
+except ImportError:  # run as a script
+    from launcher import main
 
-uvicorn.run(
-    'fast_api_tutorial.20UpdatesPUT:app',
-    # host=settings.server_host,
-    # port=settings.server_port,
-    reload=True,
-)
+if __name__ == "__main__":
+    main()
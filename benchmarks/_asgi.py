@@ -0,0 +1,107 @@
+"""
+Small helpers shared by the benchmark scripts.
+
+The tutorial modules start with a digit (29Middleware.py, 15RequestFiles.py, ...), so they can't be imported with a
+normal import statement. load() registers the repository as the fast_api_tutorial package (the name __main__.py uses)
+and imports them with importlib, so their relative imports work too.
+
+The apps are driven in-process straight through the ASGI interface, so the numbers show the cost of the framework
+and of our code, not of the network or of an HTTP client.
+Run a script from the repository root, e.g.:
+
+    python -m benchmarks.bench_middleware
+"""
+import asyncio
+import importlib
+import importlib.util
+import os
+import statistics
+import sys
+import time
+from typing import Iterable, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "fast_api_tutorial"
+
+
+def load(module_name: str):
+    if PACKAGE not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            PACKAGE, os.path.join(ROOT, "__init__.py"), submodule_search_locations=[ROOT]
+        )
+        package = importlib.util.module_from_spec(spec)
+        sys.modules[PACKAGE] = package
+        spec.loader.exec_module(package)
+    return importlib.import_module(f"{PACKAGE}.{module_name}")
+
+
+def make_scope(method: str, path: str, headers: Iterable[Tuple[str, str]] = (), query_string: bytes = b"") -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query_string,
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+
+
+async def call(app, method: str, path: str, headers: Iterable[Tuple[str, str]] = (), body: bytes = b"",
+               query_string: bytes = b""):
+    """Send one request to an ASGI app and return (status, headers, body)."""
+    scope = make_scope(method, path, headers, query_string)
+    request_messages = [{"type": "http.request", "body": body, "more_body": False}]
+    response = {"status": None, "headers": [], "body": []}
+
+    async def receive():
+        if request_messages:
+            return request_messages.pop()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = message.get("headers", [])
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return response["status"], response["headers"], b"".join(response["body"])
+
+
+async def measure(app, requests: int, method: str = "GET", path: str = "/", headers: Iterable[Tuple[str, str]] = (),
+                  body: bytes = b"", query_string: bytes = b"", warmup: int = 500) -> dict:
+    headers = list(headers)
+    for _ in range(warmup):
+        await call(app, method, path, headers, body, query_string)
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        await call(app, method, path, headers, body, query_string)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "rps": requests / elapsed,
+        "p50_us": statistics.median(latencies) * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99) - 1] * 1e6,
+    }
+
+
+def run(app, requests: int = 5000, **kwargs) -> dict:
+    return asyncio.run(measure(app, requests, **kwargs))
+
+
+def report(name: str, stats: dict, extra: Optional[str] = None) -> None:
+    line = f"{name:<40} {stats['rps']:>10.0f} req/s   p50 {stats['p50_us']:>8.1f} us   p99 {stats['p99_us']:>8.1f} us"
+    if extra:
+        line += f"   {extra}"
+    print(line)
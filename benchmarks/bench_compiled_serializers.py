@@ -0,0 +1,52 @@
+"""
+The response_model endpoints of 11ResponseModel.py with FastAPI's generic serialization vs CompiledSerializerRoute,
+and a response_model=List[schemas.Item] endpoint returning 10k items.
+
+    python -m benchmarks.bench_compiled_serializers
+"""
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+
+from benchmarks._asgi import load, report, run
+
+compiled_serializers = load("compiled_serializers")
+response_model = load("11ResponseModel")
+schemas = load("30SQLRelationalDatabases.schemas")
+
+items = [
+    schemas.Item(id=index, owner_id=index % 100, title=f"Item {index}", description="An item with a description")
+    for index in range(10_000)
+]
+
+
+def make_app(route_class):
+    """The GET routes of 11ResponseModel.py, registered again with the given route class."""
+    app = FastAPI()
+    app.router.route_class = route_class
+    for route in response_model.app.routes:
+        if isinstance(route, APIRoute) and "GET" in route.methods:
+            app.add_api_route(
+                route.path,
+                route.endpoint,
+                methods=["GET"],
+                response_model=route.response_model,
+                response_model_include=route.response_model_include,
+                response_model_exclude=route.response_model_exclude,
+                response_model_exclude_unset=route.response_model_exclude_unset,
+            )
+
+    @app.get("/list-items/", response_model=List[schemas.Item])
+    def read_items():
+        return items
+
+    return app
+
+
+if __name__ == "__main__":
+    for name, route_class in (("generic", APIRoute), ("compiled", compiled_serializers.CompiledSerializerRoute)):
+        app = make_app(route_class)
+        for path in ("/items/bar", "/items/bar/name", "/items/bar/public"):
+            report(f"{name} {path}", run(app, 5000, path=path))
+        report(f"{name} /list-items/ (10k)", run(app, 10, path="/list-items/", warmup=2))
@@ -0,0 +1,76 @@
+"""
+CPU cost vs bytes saved of compression.py for a read_users-like response of 30SQLRelationalDatabases/main.py (users
+with their nested items, ~250 KB of JSON): every encoding and level, then the whole middleware in an app, with the
+body compressed on the event loop and in the threadpool.
+
+    python -m benchmarks.bench_compression
+"""
+import json
+import time
+
+from fastapi import FastAPI, Response
+
+from benchmarks._asgi import load, report, run
+
+compression = load("compression")
+
+LEVELS = {"gzip": (1, 4, 6, 9), "br": (1, 4, 6, 9, 11), "zstd": (1, 3, 6, 10, 19)}
+
+
+def users(count: int = 300, items: int = 8) -> list:
+    return [
+        {
+            "email": f"user{user_id}@example.com",
+            "id": user_id,
+            "is_active": user_id % 7 != 0,
+            "items": [
+                {"title": f"Item {user_id}-{n}", "description": f"The item number {n} of user {user_id}",
+                 "id": user_id * items + n, "owner_id": user_id}
+                for n in range(items)
+            ],
+        }
+        for user_id in range(count)
+    ]
+
+
+def compress_cost(encoding: str, level: int, body: bytes, budget: float = 0.5) -> tuple:
+    best, spent = float("inf"), 0.0
+    while spent < budget:  # the best of as many runs as fit in the budget (a single one for the slowest levels)
+        started = time.perf_counter()
+        compressed = compression.COMPRESSORS[encoding](level).compress(body, final=True)
+        elapsed = time.perf_counter() - started
+        best, spent = min(best, elapsed), spent + elapsed
+    return best, len(compressed)
+
+
+def users_app(**options) -> FastAPI:
+    app = FastAPI()
+    body = json.dumps(users()).encode()
+
+    # already rendered, so the numbers only show the cost of compressing it
+    @app.get("/users/")
+    async def read_users():
+        return Response(body, media_type="application/json")
+
+    app.add_middleware(compression.CompressionMiddleware, **options)
+    return app
+
+
+if __name__ == "__main__":
+    body = json.dumps(users()).encode()
+    print(f"body {len(body) / 1024:.0f} KiB")
+    for encoding, levels in LEVELS.items():
+        if encoding not in compression.COMPRESSORS:
+            print(f"{encoding:<5} not installed")
+            continue
+        for level in levels:
+            elapsed, size = compress_cost(encoding, level, body)
+            print(f"{encoding:<5} level {level:>2}   {elapsed * 1e3:7.2f} ms   {size / 1024:7.1f} KiB   "
+                  f"{100 * (1 - size / len(body)):5.1f}% saved   {len(body) / elapsed / 1024 ** 2:7.1f} MiB/s")
+
+    for name, options in (("event loop", {}), ("threadpool", {"threadpool_size": 64 * 1024})):
+        app = users_app(**options)
+        report(f"identity ({name})", run(app, 2000, warmup=200, path="/users/"))
+        for encoding in compression.COMPRESSORS:
+            stats = run(app, 2000, warmup=200, path="/users/", headers=[("accept-encoding", encoding)])
+            report(f"{encoding} ({name})", stats)
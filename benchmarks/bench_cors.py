@@ -0,0 +1,32 @@
+"""
+Preflight (OPTIONS) throughput of 29CORS.py: the stock CORSMiddleware vs PrecomputedCORSMiddleware.
+
+    python -m benchmarks.bench_cors
+"""
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from benchmarks._asgi import load, report, run
+
+cors = load("29CORS")
+
+stock_app = FastAPI()
+stock_app.get("/")(cors.main)
+stock_app.add_middleware(
+    CORSMiddleware,
+    allow_origins=cors.origins,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+PREFLIGHT = [
+    ("Origin", cors.origins[-1]),
+    ("Access-Control-Request-Method", "POST"),
+    ("Access-Control-Request-Headers", "content-type, x-token"),
+]
+
+if __name__ == "__main__":
+    for name, app in (("CORSMiddleware", stock_app), ("PrecomputedCORSMiddleware", cors.app)):
+        report(f"{name} preflight", run(app, 20000, method="OPTIONS", headers=PREFLIGHT))
+        report(f"{name} simple GET", run(app, 5000, headers=[("Origin", cors.origins[-1])]))
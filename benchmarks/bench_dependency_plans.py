@@ -0,0 +1,71 @@
+"""
+FastAPI's dependency resolution vs dependency_plans.PlannedRoute:
+
+- a 10-deep chain of async dependencies (dep9 needs dep8, ..., dep0 needs the q query parameter), the shape of
+  query_or_cookie_extractor -> query_extractor in 22SubDependencies.py or dependency_c -> b -> a in
+  25DepWithYield.py, just deeper: the cost of resolving the tree itself,
+- 10 async dependencies marked @independent that each wait 1 ms for I/O (a cache, another service, ...): with
+  the plan they wait together.
+
+    python -m benchmarks.bench_dependency_plans
+"""
+import asyncio
+
+from fastapi import Depends, FastAPI
+from fastapi.routing import APIRoute
+
+from benchmarks._asgi import load, report, run
+
+dependency_plans = load("dependency_plans")
+
+DEPTH = 10
+
+
+def chain(depth: int):
+    async def dep0(q: int = 0):
+        return q
+
+    dependency = dep0
+    for level in range(1, depth):
+        async def dep(value: int = Depends(dependency)):
+            return value + 1
+
+        dep.__name__ = f"dep{level}"
+        dependency = dep
+    return dependency
+
+
+def io_dependency(n: int):
+    @dependency_plans.independent
+    async def fetch():
+        await asyncio.sleep(0.001)
+        return n
+
+    fetch.__name__ = f"fetch{n}"
+    return fetch
+
+
+def make_app(route_class) -> FastAPI:
+    app = FastAPI()
+    app.router.route_class = route_class
+    deepest = chain(DEPTH)
+    fetches = [Depends(io_dependency(n)) for n in range(DEPTH)]
+
+    @app.get("/chain")
+    async def read_chain(value: int = Depends(deepest)):
+        return {"value": value}
+
+    @app.get("/fan-out", dependencies=fetches)
+    async def read_fan_out():
+        return {"ok": True}
+
+    return app
+
+
+if __name__ == "__main__":
+    for name, route_class in (("FastAPI", APIRoute), ("PlannedRoute", dependency_plans.PlannedRoute)):
+        app = make_app(route_class)
+        report(f"{name} 10-deep chain", run(app, 5000, path="/chain", query_string=b"q=1"))
+        report(f"{name} 10 x 1 ms I/O", run(app, 200, warmup=20, path="/fan-out"))
+        if route_class is dependency_plans.PlannedRoute:
+            print(dependency_plans.dependency_report(app))
@@ -0,0 +1,64 @@
+"""
+Union response models with 10 variants, like Union[PlaneItem, CarItem] of 12ExtraModels.py with more kinds of items:
+a plain Union (tried member by member) vs a discriminated one (the model picked by "type" in one lookup), for the
+first and the last variant.
+
+    python -m benchmarks.bench_discriminated_union
+"""
+from typing import Union
+
+from fastapi import FastAPI
+from pydantic import BaseModel, Field, create_model
+from typing_extensions import Literal
+
+from benchmarks._asgi import load, report, run
+
+discriminated_unions = load("discriminated_unions")
+json_responses = load("json_responses")
+
+VARIANTS = 10
+
+
+class BaseItem(BaseModel):
+    description: str
+    type: str
+    price: float
+    tags: list = []
+
+
+variants = [
+    create_model(f"Item{n}", __base__=BaseItem, type=(Literal[f"kind{n}"], f"kind{n}"), **{f"extra{n}": (int, ...)})
+    for n in range(VARIANTS)
+]
+AnyItem = Union[tuple(variants)]
+
+
+class DiscriminatedItem(BaseModel):
+    __root__: AnyItem = Field(..., discriminator="type")
+
+
+def item(n: int) -> dict:
+    return {"description": "An item", "type": f"kind{n}", "price": 10.5, "tags": ["a", "b"], f"extra{n}": n}
+
+
+def union_app(response_model) -> FastAPI:
+    app = FastAPI(default_response_class=json_responses.DefaultJSONResponse)
+    app.router.route_class = discriminated_unions.DiscriminatedUnionRoute
+    first, last = item(0), item(VARIANTS - 1)
+
+    @app.get("/items/first", response_model=response_model)
+    async def read_first():
+        return first
+
+    @app.get("/items/last", response_model=response_model)
+    async def read_last():
+        return last
+
+    return app
+
+
+if __name__ == "__main__":
+    for name, response_model in (("Union", AnyItem), ("discriminated", DiscriminatedItem)):
+        app = union_app(response_model)
+        for path in ("/items/first", "/items/last"):
+            report(f"{name} {path}", run(app, 5000, path=path))
@@ -0,0 +1,46 @@
+"""
+jsonable_encoder vs fast_encoders.model_encoder on the Item models of 19JSONCompatibleEncoder.py and 20UpdatesPUT.py,
+and the PATCH update of 20UpdatesPUT.py: model round-trip vs merging into the stored dict.
+
+    python -m benchmarks.bench_fast_encoders
+"""
+import datetime
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks._asgi import load
+
+fast_encoders = load("fast_encoders")
+json_compatible = load("19JSONCompatibleEncoder")
+updates = load("20UpdatesPUT")
+
+Item = updates.Item
+stored = {"name": "Bar", "description": "The bartenders", "price": 62, "tax": 20.2}
+patch = Item(description="New description", tags=["a", "b"])
+
+
+def patch_with_model_round_trip():
+    stored_item_model = Item(**stored)
+    updated_item = stored_item_model.copy(update=patch.dict(exclude_unset=True))
+    return jsonable_encoder(updated_item)
+
+
+def patch_by_merging():
+    return {**stored, **updates.encode_item(patch, patch.__fields_set__)}
+
+
+def ops_per_second(func, number=20000) -> float:
+    return number / min(timeit.repeat(func, number=number, repeat=5))
+
+
+if __name__ == "__main__":
+    timestamped = json_compatible.Item(title="Foo", timestamp=datetime.datetime.now(), description="bar")
+    item = Item(name="Foo", description="bar", price=1.5, tags=["a", "b", "c"])
+    for name, obj in (("19 Item (datetime)", timestamped), ("20 Item (list)", item)):
+        encode = fast_encoders.model_encoder(type(obj))
+        assert encode(obj) == jsonable_encoder(obj)
+        print(f"{name:<22} jsonable_encoder {ops_per_second(lambda: jsonable_encoder(obj)):>10.0f} ops/s   "
+              f"model_encoder {ops_per_second(lambda: encode(obj)):>10.0f} ops/s")
+    print(f"{'PATCH':<22} model round-trip {ops_per_second(patch_with_model_round_trip):>10.0f} ops/s   "
+          f"dict merge     {ops_per_second(patch_by_merging):>10.0f} ops/s")
@@ -0,0 +1,65 @@
+"""
+The endpoints of 2query_params.py and 3path_param.py with FastAPI's generic parameter validation vs FastParamsRoute.
+
+The requests carry valid parameters (the path FastParamsRoute compiles), plus one with an invalid value, which gives
+up on the compiled checks and gets FastAPI's 422. Then the validation alone: the compiled function vs FastAPI's
+request_params_to_args, for the same parameters.
+
+    python -m benchmarks.bench_fast_params
+"""
+import timeit
+
+from fastapi import FastAPI
+from fastapi.dependencies.utils import request_params_to_args
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.routing import Match
+
+from benchmarks._asgi import load, make_scope, report, run
+
+fast_params = load("fast_params")
+query_params = load("2query_params")
+path_params = load("3path_param")
+
+REQUESTS = (
+    (query_params, "/items/", b"q=foobar"),
+    (query_params, "/items/", b""),
+    (query_params, "/deprecated-items/", b"item-query=fixedquery"),
+    (path_params, "/items/5", b"item-query=foo"),
+    (path_params, "/number-validation-items/5", b"q=x&size=3.5"),
+    (path_params, "/number-validation-items/5000", b"q=x&size=3.5"),  # 422, item_id le=1000
+)
+
+
+def make_app(module, route_class) -> FastAPI:
+    """The routes of the tutorial module, registered again with the given route class."""
+    app = FastAPI(default_response_class=module.app.router.default_response_class)
+    app.router.route_class = route_class
+    for route in module.app.routes:
+        if isinstance(route, APIRoute):
+            app.add_api_route(route.path, route.endpoint, methods=list(route.methods))
+    return app
+
+
+if __name__ == "__main__":
+    for name, route_class in (("generic", APIRoute), ("compiled", fast_params.FastParamsRoute)):
+        apps = {module: make_app(module, route_class) for module in (query_params, path_params)}
+        for module, path, query_string in REQUESTS:
+            label = f"{name} {path}?{query_string.decode()}"
+            report(label, run(apps[module], 10_000, path=path, query_string=query_string))
+
+    for module, path, query_string in REQUESTS[:-1]:
+        scope = make_scope("GET", path, query_string=query_string)
+        route, child_scope = next((route, child_scope) for route in module.app.routes
+                                  for match, child_scope in [route.matches(scope)] if match == Match.FULL)
+        request = Request({**scope, **child_scope})
+        validate = fast_params.compile_validator(route.dependant)
+        dependant = route.dependant
+
+        def generic():
+            request_params_to_args(dependant.path_params, request.path_params)
+            request_params_to_args(dependant.query_params, request.query_params)
+
+        for name, function in (("generic", generic), ("compiled", lambda: validate(request))):
+            per_call = timeit.timeit(function, number=100_000) * 10
+            print(f"validation {name} {path}?{query_string.decode():<40} {per_call:>6.2f} us")
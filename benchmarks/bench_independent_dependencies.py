@@ -0,0 +1,67 @@
+"""
+Global dependencies run one after the other (FastAPI) vs awaited concurrently (@independent with PlannedRoute).
+
+The app is 24GlobalDependencies.py with I/O in the checks: verify_token asks a token service and verify_key a key
+store, each answering in LATENCY seconds. Sequentially a request waits for the sum of the latencies, with the plan
+for the slowest one. The failing requests check that the error stays the one sequential resolution gives.
+
+    python -m benchmarks.bench_independent_dependencies
+"""
+import asyncio
+import inspect
+import json
+
+from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi.routing import APIRoute
+
+from benchmarks._asgi import call, load, report, run
+
+dependency_plans = load("dependency_plans")
+
+LATENCY = 0.002
+CHECKS = 4  # verify_token, verify_key and two more of the same kind (a rate limit, a feature flag, ...)
+HEADERS = [("X-Token", "fake-super-secret-token"), ("X-Key", "fake-super-secret-key")]
+
+
+def check(name: str, header: str, expected: str):
+    parameter = header.lower().replace("-", "_")  # x_token, x_key, like in 24GlobalDependencies.py
+
+    @dependency_plans.independent
+    async def verify(**values: str):
+        await asyncio.sleep(LATENCY)  # the round trip to the service
+        if values[parameter] != expected:
+            raise HTTPException(status_code=400, detail=f"{header} header invalid")
+
+    verify.__name__ = name
+    verify.__signature__ = inspect.Signature(
+        [inspect.Parameter(parameter, inspect.Parameter.KEYWORD_ONLY, default=Header(...), annotation=str)]
+    )
+    return verify
+
+
+def make_app(route_class) -> FastAPI:
+    checks = [check("verify_token", "X-Token", "fake-super-secret-token"),
+              check("verify_key", "X-Key", "fake-super-secret-key")]
+    checks += [check(f"verify_{n}", "X-Key", "fake-super-secret-key") for n in range(CHECKS - 2)]
+    app = FastAPI(dependencies=[Depends(verify) for verify in checks])
+    app.router.route_class = route_class
+
+    @app.get("/items/")
+    async def read_items():
+        return [{"item": "Portal Gun"}, {"item": "Plumbus"}]
+
+    return app
+
+
+def error(app, headers) -> str:
+    status, _, body = asyncio.run(call(app, "GET", "/items/", headers))
+    return f"{status} {json.loads(body)['detail']!r:.40}"
+
+
+if __name__ == "__main__":
+    for name, route_class in (("sequential (FastAPI)", APIRoute), ("concurrent (PlannedRoute)",
+                                                                   dependency_plans.PlannedRoute)):
+        app = make_app(route_class)
+        report(f"{name} {CHECKS} x {LATENCY * 1000:.0f} ms", run(app, 300, warmup=20, path="/items/", headers=HEADERS))
+        print(f"  both invalid:  {error(app, [('X-Token', 'wrong'), ('X-Key', 'wrong')])}")
+        print(f"  key missing:   {error(app, [('X-Token', 'wrong')])}")
@@ -0,0 +1,52 @@
+"""
+Contention on the item stores of item_store.py: 8 threads doing read-modify-write cycles (GET, change, PUT with
+If-Match, retry on conflict) on 4 hot keys, like clients of 20UpdatesPUT.py, for the memory and the SQLite store.
+Every successful write must show up exactly once: the final counters add up to the number of writes.
+
+    python -m benchmarks.bench_item_store
+"""
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks._asgi import load
+
+item_store = load("item_store")
+
+THREADS = 8
+KEYS = ["foo", "bar", "baz", "qux"]
+WRITES_PER_THREAD = 2000
+
+
+def worker(store, index: int, conflicts: list) -> None:
+    for n in range(WRITES_PER_THREAD):
+        key = KEYS[(index + n) % len(KEYS)]
+        while True:
+            data, version = store.get(key)
+            try:
+                store.put(key, {**data, "count": data["count"] + 1}, expected_version=version)
+                break
+            except item_store.VersionConflict:
+                conflicts[index] += 1
+
+
+def bench(name: str, store) -> None:
+    conflicts = [0] * THREADS
+    threads = [threading.Thread(target=worker, args=(store, index, conflicts)) for index in range(THREADS)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    writes = THREADS * WRITES_PER_THREAD
+    assert sum(store.get(key)[0]["count"] for key in KEYS) == writes, "lost update"
+    print(f"{name:<8} {writes / elapsed:>10.0f} writes/s   {sum(conflicts):>7} conflicts (retried)")
+
+
+if __name__ == "__main__":
+    initial = {key: {"name": key, "count": 0} for key in KEYS}
+    bench("memory", item_store.MemoryItemStore(initial))
+    with tempfile.TemporaryDirectory() as directory:
+        bench("sqlite", item_store.SQLiteItemStore(os.path.join(directory, "items.db"), initial))
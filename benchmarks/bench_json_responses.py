@@ -0,0 +1,50 @@
+"""
+Encoding a List[schemas.Item] of 10k elements (30SQLRelationalDatabases/schemas.py) with each response class of
+json_responses.py: the render step alone, and a whole request to a response_model=List[schemas.Item] endpoint.
+The render step is also measured for items without a description (a null in every item), the case where the fast
+encoders check the content for NaN and infinities, and for JSONResponse itself as the baseline.
+
+    python -m benchmarks.bench_json_responses
+"""
+import timeit
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from benchmarks._asgi import load, report, run
+
+json_responses = load("json_responses")
+schemas = load("30SQLRelationalDatabases.schemas")
+
+items = [
+    schemas.Item(id=index, owner_id=index % 100, title=f"Item {index}", description="An item with a description")
+    for index in range(10_000)
+]
+content = jsonable_encoder(items)
+content_with_nulls = [{**item, "description": None} for item in content]
+
+
+def make_app(response_class):
+    app = FastAPI(default_response_class=response_class)
+
+    @app.get("/items/", response_model=List[schemas.Item])
+    def read_items():
+        return items
+
+    return app
+
+
+if __name__ == "__main__":
+    seconds = min(timeit.repeat(lambda: JSONResponse(content_with_nulls), number=20, repeat=5)) / 20
+    print(f"{'JSONResponse':<10} render {seconds * 1e3:8.2f} ms  (a null in every item)")
+    for backend, response_class in json_responses.JSON_RESPONSE_CLASSES.items():
+        if backend != "json" and getattr(json_responses, backend) is None:
+            print(f"{backend}: not installed")
+            continue
+        seconds = min(timeit.repeat(lambda: response_class(content), number=20, repeat=5)) / 20
+        print(f"{backend:<10} render {seconds * 1e3:8.2f} ms")
+        seconds = min(timeit.repeat(lambda: response_class(content_with_nulls), number=20, repeat=5)) / 20
+        print(f"{backend:<10} render {seconds * 1e3:8.2f} ms  (a null in every item)")
+        report(f"{backend} GET /items/ (10k)", run(make_app(response_class), 10, path="/items/", warmup=2))
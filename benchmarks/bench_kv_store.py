@@ -0,0 +1,60 @@
+"""
+kv_store.KVStore with 1M keys: put and get throughput, and how long opening the store again takes, replaying the
+whole log (after a crash, no hint) and from the hint written by close().
+
+    python -m benchmarks.bench_kv_store
+"""
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks._asgi import load
+
+kv_store = load("kv_store")
+
+KEYS = 1_000_000
+
+
+def timed(func) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def put_all(store) -> None:
+    for n in range(KEYS):
+        store[f"item-{n}"] = {"id": n, "title": f"Item {n}", "price": 10.5}
+
+
+def get_random(store, keys) -> None:
+    for key in keys:
+        store[key]
+
+
+if __name__ == "__main__":
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "items")
+    try:
+        keys = [f"item-{random.randrange(KEYS)}" for _ in range(KEYS)]
+        store = kv_store.KVStore(path)
+        elapsed = timed(lambda: put_all(store))
+        print(f"put          {KEYS / elapsed:>10.0f} ops/s   log {os.path.getsize(store._log_path) / 1024 ** 2:.0f} MiB")
+        elapsed = timed(lambda: get_random(store, keys))
+        print(f"get (random) {KEYS / elapsed:>10.0f} ops/s")
+        plain = dict(store.items())
+        elapsed = timed(lambda: get_random(plain, keys))
+        print(f"get (dict)   {KEYS / elapsed:>10.0f} ops/s")
+
+        # a crash: the process is gone without writing a hint (and the last periodic one is lost too)
+        store._map.close()
+        os.close(store._fd)
+        if os.path.exists(store._hint_path):
+            os.unlink(store._hint_path)
+        elapsed = timed(lambda: kv_store.KVStore(path).close())
+        print(f"recovery, full log replay {elapsed:6.2f} s")
+        elapsed = timed(lambda: kv_store.KVStore(path).close())
+        print(f"recovery, from the hint   {elapsed:6.2f} s")
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,128 @@
+"""
+Time to first request of a new worker: routers imported eagerly vs lazy_routers.LazyRouters.
+
+A generated app like 31BiggerApplications/main.py, with ROUTERS router modules (each with its Pydantic models and
+a few path operations). Every measurement is a new Python process, like a new worker: import the app, run the
+startup, answer one request. Lazy is measured twice: the first start writes the manifest, the next ones use it.
+
+    python -m benchmarks.bench_lazy_routers
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks._asgi import ROOT
+
+ROUTERS = 300
+
+ROUTER = '''
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+router = APIRouter()
+
+
+class Item{n}(BaseModel):
+    name: str
+    price: float
+    tags: List[str] = []
+    description: Optional[str] = None
+
+
+class ItemUpdate{n}(BaseModel):
+    price: Optional[float] = None
+    tags: Optional[List[str]] = None
+
+
+@router.get("/", response_model=List[Item{n}])
+async def list_items():
+    return []
+
+
+@router.get("/{{item_id}}", response_model=Item{n})
+async def read_item(item_id: int):
+    raise HTTPException(status_code=404)
+
+
+@router.post("/", response_model=Item{n})
+async def create_item(item: Item{n}):
+    return item
+
+
+@router.patch("/{{item_id}}", response_model=Item{n})
+async def update_item(item_id: int, item: ItemUpdate{n}):
+    raise HTTPException(status_code=404)
+'''
+
+APP = '''
+import sys
+from fastapi import FastAPI
+
+sys.path.insert(0, {root!r})
+from benchmarks._asgi import load
+
+app = FastAPI()
+if {lazy}:
+    lazy_routers = load("lazy_routers").LazyRouters(app, package="benchapp", manifest={manifest!r})
+    for n in range({routers}):
+        lazy_routers.include(f".routers.r{{n}}", prefix=f"/r{{n}}", tags=[f"r{{n}}"])
+else:
+    import importlib
+    for n in range({routers}):
+        module = importlib.import_module(f"benchapp.routers.r{{n}}")
+        app.include_router(module.router, prefix=f"/r{{n}}", tags=[f"r{{n}}"])
+'''
+
+FIRST_REQUEST = '''
+import asyncio, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {directory!r})
+sys.path.insert(0, {root!r})
+from benchmarks._asgi import call
+from benchapp.{module} import app
+
+
+async def main():
+    async with app.router.lifespan_context(app):
+        status, _, _ = await call(app, "GET", "/r{last}/")
+        assert status == 200, status
+        print(f"{{(time.perf_counter() - started) * 1000:.0f}}")
+
+asyncio.run(main())
+'''
+
+
+def generate(directory: str) -> None:
+    package = os.path.join(directory, "benchapp")
+    os.makedirs(os.path.join(package, "routers"))
+    for path in (os.path.join(package, "__init__.py"), os.path.join(package, "routers", "__init__.py")):
+        open(path, "w").close()
+    for n in range(ROUTERS):
+        with open(os.path.join(package, "routers", f"r{n}.py"), "w") as file:
+            file.write(ROUTER.format(n=n))
+    manifest = os.path.join(directory, "lazy_routers.json")
+    for module, lazy in (("eager", False), ("lazy", True)):
+        with open(os.path.join(package, f"{module}.py"), "w") as file:
+            file.write(APP.format(root=ROOT, lazy=lazy, manifest=manifest, routers=ROUTERS))
+
+
+def first_request(directory: str, module: str) -> tuple:
+    """(ms from process start to the response, ms in the app's own code: import, startup and request)"""
+    script = FIRST_REQUEST.format(directory=directory, root=ROOT, module=module, last=ROUTERS - 1)
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    return (time.perf_counter() - started) * 1000, float(output)
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        generate(directory)
+        for label, module in (("eager", "eager"), ("lazy, writes the manifest", "lazy"),
+                              ("lazy, with the manifest", "lazy"), ("lazy, with the manifest", "lazy")):
+            total, in_app = first_request(directory, module)
+            print(f"{label:<30} {ROUTERS} routers: first response {total:>7.0f} ms after the process started "
+                  f"({in_app:.0f} ms importing the app, starting it up and answering)")
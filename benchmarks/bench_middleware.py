@@ -0,0 +1,19 @@
+"""
+@app.middleware("http") (BaseHTTPMiddleware) vs a pure ASGI middleware class, both adding X-Process-Time to the same
+hello world route of 29Middleware.py.
+
+    python -m benchmarks.bench_middleware
+"""
+from fastapi import FastAPI
+
+from benchmarks._asgi import load, report, run
+
+middleware = load("29Middleware")
+
+bare_app = FastAPI()
+bare_app.get("/")(middleware.read_root)
+
+if __name__ == "__main__":
+    report("no middleware", run(bare_app))
+    report("@app.middleware('http')", run(middleware.app))
+    report("pure ASGI ProcessTimeMiddleware", run(middleware.asgi_app))
@@ -0,0 +1,86 @@
+"""
+Startup and first /docs latency: FastAPI's /openapi.json vs openapi_cache.serve_cached_openapi.
+
+An app with RESOURCES resources of 4 path operations each, with their own Pydantic models (1200 operations), like a
+big 31BiggerApplications. /docs is what a developer opens: the Swagger UI page, then the browser fetches
+/openapi.json. Measured on a new app every time (FastAPI keeps the schema on the app once built):
+
+- FastAPI: nothing on startup, the schema is built on the first /openapi.json and serialized on every request,
+- cached: built, serialized and compressed on startup,
+- cached, from file: read from the files written at build time (--write-openapi).
+
+    python -m benchmarks.bench_openapi
+"""
+import asyncio
+import os
+import tempfile
+import time
+from typing import List, Optional
+
+from fastapi import APIRouter, FastAPI
+from pydantic import create_model
+
+from benchmarks._asgi import call, load
+
+openapi_cache = load("openapi_cache")
+
+RESOURCES = 300
+
+
+def make_app() -> FastAPI:
+    app = FastAPI(title="Big app")
+    for n in range(RESOURCES):
+        item = create_model(f"Item{n}", name=(str, ...), price=(float, ...), tags=(List[str], []),
+                            description=(Optional[str], None))
+        update = create_model(f"ItemUpdate{n}", price=(Optional[float], None), tags=(Optional[List[str]], None))
+        router = APIRouter(prefix=f"/resource{n}", tags=[f"resource{n}"])
+
+        @router.get("/", response_model=List[item])
+        async def list_items():
+            return []
+
+        @router.get("/{item_id}", response_model=item)
+        async def read_item(item_id: int):
+            return None
+
+        @router.post("/", response_model=item)
+        async def create_item(body: item):
+            return body
+
+        @router.patch("/{item_id}", response_model=item)
+        async def update_item(item_id: int, body: update):
+            return None
+
+        app.include_router(router)
+    return app
+
+
+async def first_docs(app: FastAPI, cached: Optional[str]) -> tuple:
+    """(startup ms, /docs + /openapi.json ms, next /openapi.json ms, bytes sent)"""
+    if cached is not None:
+        openapi_cache.serve_cached_openapi(app, cached or None)
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        startup = time.perf_counter() - started
+        headers = [("Accept-Encoding", "gzip, deflate, br, zstd")]
+        started = time.perf_counter()
+        await call(app, "GET", "/docs", headers)
+        status, _, body = await call(app, "GET", "/openapi.json", headers)
+        first = time.perf_counter() - started
+        assert status == 200
+        started = time.perf_counter()
+        await call(app, "GET", "/openapi.json", headers)
+        second = time.perf_counter() - started
+    return startup * 1000, first * 1000, second * 1000, len(body)
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "openapi.json")
+        started = time.perf_counter()
+        openapi_cache.OpenAPIDocument(make_app()).write(path)
+        print(f"--write-openapi (build step): {(time.perf_counter() - started) * 1000:.0f} ms")
+        for label, cached in (("FastAPI", None), ("cached on startup", ""), ("cached, from file", path)):
+            startup, first, second, size = asyncio.run(first_docs(make_app(), cached))
+            print(f"{label:<20} startup {startup:>7.1f} ms   first /docs {first:>7.1f} ms   next /openapi.json "
+                  f"{second:>6.2f} ms   {size / 1024:>6.0f} KiB sent")
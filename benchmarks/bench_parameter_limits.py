@@ -0,0 +1,98 @@
+"""
+Requests with more and more repeated parameters, to /list-items/ of 2query_params.py (q=...&q=...) and
+/items-with-multiple-x-token/ of 10header.py (X-Token: ... repeated), without limits vs with ParameterLimitsMiddleware
+and its default limits.
+
+The requests are random (a seeded fuzzer): values of random length, percent-encoded bytes, empty pairs, other
+parameters mixed in. For each count the worst time of a few such requests is reported: without limits it grows with
+the size of the request, with the middleware it stays flat once the limit is passed (the request is refused after
+a bounded scan).
+
+    python -m benchmarks.bench_parameter_limits
+"""
+import asyncio
+import random
+import string
+import time
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+
+from benchmarks._asgi import call, load, make_scope
+
+parameter_limits = load("parameter_limits")
+query_params = load("2query_params")
+header = load("10header")
+
+COUNTS = (10, 100, 1_000, 10_000, 100_000)
+SAMPLES = 5
+CHARACTERS = string.ascii_letters + string.digits + "-_.~"
+
+
+def make_app(module, limited: bool) -> FastAPI:
+    """The routes of the tutorial module, with or without the middleware."""
+    app = FastAPI(default_response_class=module.app.router.default_response_class)
+    if limited:
+        app.add_middleware(parameter_limits.ParameterLimitsMiddleware)
+    for route in module.app.routes:
+        if isinstance(route, APIRoute):
+            app.add_api_route(route.path, route.endpoint, methods=list(route.methods))
+    return app
+
+
+def value(rng: random.Random) -> str:
+    text = "".join(rng.choice(CHARACTERS) for _ in range(rng.randint(0, 20)))
+    if rng.random() < 0.2:
+        text += "%" + rng.choice(["20", "26", "3D", "C3%A9", "ZZ"])  # encoded space, &, =, é, and an invalid escape
+    return text
+
+
+def fuzz_query(rng: random.Random, count: int) -> bytes:
+    pairs = []
+    for _ in range(count):
+        roll = rng.random()
+        pairs.append("" if roll < 0.05 else f"other={value(rng)}" if roll < 0.1 else f"q={value(rng)}")
+    return "&".join(pairs).encode()
+
+
+def fuzz_headers(rng: random.Random, count: int) -> list:
+    return [("x-token", value(rng)) for _ in range(count)]
+
+
+async def worst(app, scopes: list) -> tuple:
+    """The slowest of the requests, in ms, and its status. The scopes are built beforehand, so building the 100k
+    headers of a request isn't counted as the app's time."""
+    slowest, status = 0.0, None
+    for scope in scopes:
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        started = time.perf_counter()
+        await app(dict(scope), receive, send)
+        elapsed = time.perf_counter() - started
+        if elapsed >= slowest:
+            slowest, status = elapsed, messages[0]["status"]
+    return slowest * 1000, status
+
+
+if __name__ == "__main__":
+    rng = random.Random(49)
+    targets = (("q=", query_params, "/list-items/", lambda count: (fuzz_query(rng, count), [])),
+               ("X-Token:", header, "/items-with-multiple-x-token/", lambda count: (b"", fuzz_headers(rng, count))))
+    for label, module, path, fuzz in targets:
+        apps = {"no limits": make_app(module, limited=False), "limited": make_app(module, limited=True)}
+        for count in COUNTS:
+            scopes = [make_scope("GET", path, headers, query_string) for query_string, headers in
+                      (fuzz(count) for _ in range(SAMPLES))]
+            line = f"{count:>7} x {label:<9}"
+            for name, app in apps.items():
+                for _ in range(100):  # warm up
+                    asyncio.run(call(app, "GET", path))
+                milliseconds, status = asyncio.run(worst(app, scopes))
+                line += f"   {name} {milliseconds:>9.2f} ms ({status})"
+            print(line)
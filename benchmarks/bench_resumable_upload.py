@@ -0,0 +1,51 @@
+"""
+Throughput of the resumable upload protocol of 15RequestFiles.py with 1, 2, 4 and 8 chunks in flight.
+
+    python -m benchmarks.bench_resumable_upload
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from benchmarks._asgi import call, load
+
+request_files = load("15RequestFiles")
+
+SIZE = 256 * 1024 * 1024
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+async def upload(app, streams: int, chunk: bytes, chunk_sha256: str) -> float:
+    body = json.dumps({"filename": "big.bin", "size": SIZE, "chunk_size": CHUNK_SIZE}).encode()
+    _, _, created = await call(app, "POST", "/uploadfile/sessions/", [("content-type", "application/json")], body)
+    session = json.loads(created)
+    offsets = asyncio.Queue()
+    for index in range(session["chunks"]):
+        offsets.put_nowait(index * CHUNK_SIZE)
+
+    async def stream():
+        while not offsets.empty():
+            offset = offsets.get_nowait()
+            status, _, _ = await call(app, "PUT", f"/uploadfile/sessions/{session['upload_id']}",
+                                      [("x-chunk-sha256", chunk_sha256)], chunk, f"offset={offset}".encode())
+            assert status == 204, status
+
+    started = time.perf_counter()
+    await asyncio.gather(*(stream() for _ in range(streams)))
+    status, _, result = await call(app, "POST", f"/uploadfile/sessions/{session['upload_id']}/finalize")
+    elapsed = time.perf_counter() - started
+    assert status == 200, result
+    os.unlink(json.loads(result)["path"])
+    return elapsed
+
+
+if __name__ == "__main__":
+    request_files.UPLOAD_DIR = tempfile.mkdtemp()
+    chunk = os.urandom(CHUNK_SIZE)
+    chunk_sha256 = hashlib.sha256(chunk).hexdigest()
+    for streams in (1, 2, 4, 8):
+        elapsed = asyncio.run(upload(request_files.app, streams, chunk, chunk_sha256))
+        print(f"{streams} stream(s): {SIZE / elapsed / 1024 ** 2:8.1f} MiB/s")
@@ -0,0 +1,46 @@
+"""
+Starlette's route matching (every regex in turn) vs compiled_router.CompiledAPIRouter, on an app with 1000 routes.
+
+The routes look like the ones of 31BiggerApplications/main.py, many times over: /resource{n}/ and
+/resource{n}/{item_id:int} for 500 resources, declared as APIRouters with a prefix. The requests go to the first,
+a middle and the last route, and to a path that doesn't exist (404). The endpoints return a pre-rendered Response,
+so the difference is the matching.
+
+    python -m benchmarks.bench_router
+"""
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import Response
+
+from benchmarks._asgi import load, report, run
+
+compiled_router = load("compiled_router")
+
+RESOURCES = 500  # 2 routes each
+RESPONSE = Response(b"{}", media_type="application/json")
+
+
+def make_app(compiled: bool) -> FastAPI:
+    app = FastAPI()
+    if compiled:
+        compiled_router.use_compiled_router(app)
+
+    def endpoint():
+        return RESPONSE
+
+    for n in range(RESOURCES):
+        router = APIRouter(prefix=f"/resource{n}", tags=[f"resource{n}"])
+        router.add_api_route("/", endpoint)
+        router.add_api_route("/{item_id:int}", endpoint)
+        app.include_router(router)
+    return app
+
+
+if __name__ == "__main__":
+    middle = RESOURCES // 2
+    paths = (("first", "/resource0/"), ("middle", f"/resource{middle}/42"),
+             ("last", f"/resource{RESOURCES - 1}/42"), ("404", "/nothing/here"))
+    for name, compiled in (("Starlette", False), ("CompiledAPIRouter", True)):
+        app = make_app(compiled)
+        assert len(app.routes) >= 2 * RESOURCES
+        for label, path in paths:
+            report(f"{name} {label}", run(app, 3000, path=path))
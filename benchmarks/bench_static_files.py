@@ -0,0 +1,72 @@
+"""
+StaticFiles vs ManifestStaticFiles (30SQLRelationalDatabases/34StaticFiles.py) without and with the hot asset cache,
+for a small and a large asset, a revalidation (If-None-Match -> 304) and a pre-compressed variant.
+Then a skewed workload over 200 small files with a cache that only fits part of them, reporting the hit ratio.
+
+    python -m benchmarks.bench_static_files
+"""
+import asyncio
+import gzip
+import os
+import random
+import shutil
+import tempfile
+
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+
+from benchmarks._asgi import call, load, report, run
+
+directory = tempfile.mkdtemp()
+os.environ["STATIC_DIR"] = directory  # read by 34StaticFiles when it is loaded below
+with open(os.path.join(directory, "small.css"), "wb") as file:
+    file.write(b"body { color: #333; }\n" * 50)
+with open(os.path.join(directory, "large.js"), "wb") as file:
+    file.write(b"console.log('a fairly large bundle');\n" * 100_000)
+with open(os.path.join(directory, "large.js"), "rb") as source, gzip.open(
+        os.path.join(directory, "large.js.gz"), "wb") as target:
+    shutil.copyfileobj(source, target)
+
+static_files = load("30SQLRelationalDatabases.34StaticFiles")
+
+stock_app = FastAPI()
+stock_app.mount("/static", StaticFiles(directory=directory), name="static")
+
+uncached_app = FastAPI()
+uncached_app.mount("/static", static_files.ManifestStaticFiles(directory=directory), name="static")
+
+
+def etag_of(app, path):
+    _, headers, _ = asyncio.run(call(app, "GET", path))
+    return dict(headers)[b"etag"].decode()
+
+
+async def skewed_workload(requests: int, files: int) -> dict:
+    workload_directory = tempfile.mkdtemp()
+    for index in range(files):
+        with open(os.path.join(workload_directory, f"asset-{index}.css"), "wb") as file:
+            file.write(os.urandom(8 * 1024))
+    cache = static_files.HotAssetCache(max_bytes=files // 4 * 8 * 1024)  # room for a quarter of the files
+    static = static_files.ManifestStaticFiles(directory=workload_directory, cache=cache)
+    weights = [1 / (rank + 1) for rank in range(files)]  # Zipf-like: a few files get most of the traffic
+    for index in random.Random(0).choices(range(files), weights, k=requests):
+        await call(static, "GET", f"/asset-{index}.css")
+    shutil.rmtree(workload_directory)
+    return cache.stats()
+
+
+if __name__ == "__main__":
+    apps = (
+        ("StaticFiles", stock_app),
+        ("ManifestStaticFiles", uncached_app),
+        ("ManifestStaticFiles+cache", static_files.app),
+    )
+    for name, app in apps:
+        report(f"{name} small", run(app, 5000, path="/static/small.css"))
+        report(f"{name} large", run(app, 300, path="/static/large.js", warmup=20))
+        etag = etag_of(app, "/static/small.css")
+        report(f"{name} small 304", run(app, 5000, path="/static/small.css", headers=[("If-None-Match", etag)]))
+    report("ManifestStaticFiles large gzip", run(static_files.app, 300, path="/static/large.js", warmup=20,
+                                                 headers=[("Accept-Encoding", "gzip, br;q=0")]))
+    print("skewed workload:", asyncio.run(skewed_workload(20000, 200)))
+    shutil.rmtree(directory)
@@ -0,0 +1,49 @@
+"""
+Processing 100 uploaded files (size, sha256, fake virus scan): one after another vs UploadPipeline with 1..N worker
+processes.
+
+    python -m benchmarks.bench_upload_processing
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks._asgi import load
+
+upload_processing = load("upload_processing")
+
+FILES = 100
+FILE_SIZE = 4 * 1024 * 1024
+STEPS = ("size", "sha256", "scan")
+
+
+async def run_pipeline(pipeline, files) -> int:
+    return len([result async for result in pipeline.process(files)])
+
+
+if __name__ == "__main__":
+    directory = tempfile.mkdtemp()
+    files = []
+    for index in range(FILES):
+        path = os.path.join(directory, f"file-{index}")
+        with open(path, "wb") as file:
+            file.write(os.urandom(FILE_SIZE))
+        files.append((f"file-{index}", path))
+
+    started = time.perf_counter()
+    for _, path in files:
+        upload_processing.process_file(path, STEPS)
+    print(f"{'sequential':<20} {time.perf_counter() - started:8.3f} s")
+
+    workers = 1
+    while workers <= os.cpu_count():
+        pipeline = upload_processing.UploadPipeline(STEPS, max_workers=workers)
+        asyncio.run(run_pipeline(pipeline, files[:workers]))  # start the workers before timing
+        started = time.perf_counter()
+        assert asyncio.run(run_pipeline(pipeline, files)) == FILES
+        print(f"{f'{workers} worker(s)':<20} {time.perf_counter() - started:8.3f} s")
+        pipeline.shutdown()
+        workers *= 2
+    shutil.rmtree(directory)
@@ -0,0 +1,88 @@
+"""
+Throughput vs number of workers of launcher.py (python -m fast_api_tutorial ... --workers N).
+
+For every worker count the launcher is started on a free port with 11ResponseModel:app, and CLIENTS processes keep
+CONNECTIONS keep-alive connections each busy with GET /items/foo for DURATION seconds. Unlike the other benchmarks
+this goes through real sockets and uvicorn, and the clients need CPU too: on a machine with few cores they compete
+with the workers, the numbers only grow while there are cores left.
+
+    python -m benchmarks.bench_workers [app] [worker counts...]
+"""
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks._asgi import ROOT
+
+APP = "11ResponseModel:app"
+PATH = "/items/foo"
+DURATION = 5.0
+CLIENTS = 2
+CONNECTIONS = 32  # per client process
+REQUEST = f"GET {PATH} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def connection(port: int, deadline: float) -> int:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    done = 0
+    while time.perf_counter() < deadline:
+        writer.write(REQUEST)
+        headers = await reader.readuntil(b"\r\n\r\n")
+        length = int(headers.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+        await reader.readexactly(length)
+        done += 1
+    writer.close()
+    return done
+
+
+def client(port: int, deadline: float, results) -> None:
+    async def main():
+        return sum(await asyncio.gather(*(connection(port, deadline) for _ in range(CONNECTIONS))))
+
+    results.put(asyncio.run(main()))
+
+
+def measure(app: str, workers: int) -> float:
+    port = free_port()
+    master = subprocess.Popen([sys.executable, "__main__.py", app, "--workers", str(workers), "--port", str(port),
+                               "--log-level", "warning"], cwd=ROOT)
+    try:
+        for _ in range(100):  # until it answers
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}{PATH}", timeout=1).read()
+                break
+            except OSError:
+                time.sleep(0.1)
+        results = multiprocessing.Queue()
+        deadline = time.perf_counter() + DURATION
+        clients = [multiprocessing.Process(target=client, args=(port, deadline, results)) for _ in range(CLIENTS)]
+        for process in clients:
+            process.start()
+        total = sum(results.get() for _ in clients)
+        for process in clients:
+            process.join()
+        return total / DURATION
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait()
+
+
+if __name__ == "__main__":
+    app = sys.argv[1] if len(sys.argv) > 1 else APP
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    counts = [int(count) for count in sys.argv[2:]] or sorted({1, 2, 4, cores})
+    print(f"{cores} CPU cores, {CLIENTS} client processes x {CONNECTIONS} connections, {DURATION:.0f} s each")
+    for workers in counts:
+        print(f"{workers:>3} workers {measure(app, workers):>10.0f} req/s", flush=True)
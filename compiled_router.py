@@ -0,0 +1,179 @@
+"""
+A compiled route table
+
+Starlette finds the route of a request by trying the regex of every route in turn, in the order they were added
+(starlette.routing.Router.__call__): a request for the last of 800 routes, or for a path that doesn't exist, runs 800
+regexes first.
+
+CompiledAPIRouter turns the paths of the routes into a tree of their segments, once: /items/{item_id:int} is the
+static segment "items" followed by a slot for an int. A request walks the tree with the segments of its path (a
+slot only takes a segment its convertor accepts, [0-9]+ for int) and gets the few routes that can match. Only
+those are then tried, still with their own regex and in their order, so the route picked is the one Starlette would
+pick: the first one that matches, 405 Method Not Allowed when only the method is wrong, the redirect to the path
+with (or without) the trailing slash, ...
+
+Routes the tree can't describe (Mount, Host, a {name:path} parameter that spans several segments) are tried for
+every request, as before. The tree is built again when routes are added.
+
+It works for the whole app, with the routes of all the included routers (include_router copies them into
+app.router):
+
+    app = FastAPI()
+    use_compiled_router(app)
+"""
+import re
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from fastapi import FastAPI
+from fastapi.routing import APIRouter
+from starlette.datastructures import URL
+from starlette.responses import RedirectResponse
+from starlette.routing import Match, Route, WebSocketRoute
+from starlette.types import Receive, Scope, Send
+
+PARAMETER = re.compile(r"^{([a-zA-Z_][a-zA-Z0-9_]*)(:[a-zA-Z_][a-zA-Z0-9_]*)?}$")
+ANY_SEGMENT = "[^/]+"
+
+
+class Node:
+    __slots__ = ("static", "slots", "routes")
+
+    def __init__(self) -> None:
+        self.static: Dict[str, "Node"] = {}
+        self.slots: Dict[str, Tuple[Pattern, "Node"]] = {}  # convertor regex: (compiled, node)
+        self.routes: List[int] = []  # indices of the routes whose path ends here
+
+
+class RouteTable:
+    def __init__(self, routes: list):
+        self.root = Node()
+        self.always: List[int] = []  # routes tried for every path
+        for index, route in enumerate(routes):
+            segments = self.segments(route)
+            if segments is None:
+                self.always.append(index)
+                continue
+            node = self.root
+            for segment in segments:
+                if isinstance(segment, str):
+                    node = node.static.setdefault(segment, Node())
+                else:
+                    regex = segment[0]
+                    if regex not in node.slots:
+                        node.slots[regex] = (re.compile(regex), Node())
+                    node = node.slots[regex][1]
+            node.routes.append(index)
+
+    @staticmethod
+    def segments(route) -> Optional[list]:
+        """The segments of the path of the route: static strings, or (convertor regex,) for a parameter."""
+        if not isinstance(route, (Route, WebSocketRoute)):
+            return None
+        segments: list = []
+        for segment in route.path[1:].split("/"):
+            if "{" not in segment:
+                segments.append(segment)
+                continue
+            match = PARAMETER.match(segment)
+            if match is None:  # "{name}.txt", "{a}-{b}": any segment, the regex of the route checks the rest
+                regex = ANY_SEGMENT
+            else:
+                convertor = route.param_convertors[match.group(1)]
+                regex = convertor.regex
+            if "/" in regex or ".*" in regex:  # {name:path}
+                return None
+            segments.append((regex,))
+        return segments
+
+    def candidates(self, path: str) -> List[int]:
+        """The indices of the routes that can match the path, in order."""
+        found = list(self.always)
+        stack = [(self.root, 0)]
+        parts = path[1:].split("/")
+        while stack:
+            node, depth = stack.pop()
+            if depth == len(parts):
+                found.extend(node.routes)
+                continue
+            part = parts[depth]
+            child = node.static.get(part)
+            if child is not None:
+                stack.append((child, depth + 1))
+            for pattern, slot in node.slots.values():
+                if pattern.fullmatch(part):
+                    stack.append((slot, depth + 1))
+        if len(found) > 1:
+            found.sort()
+        return found
+
+
+class CompiledAPIRouter(APIRouter):
+    _table: Optional[RouteTable] = None
+    _table_routes: Optional[list] = None
+    _table_size = 0
+
+    @property
+    def route_table(self) -> RouteTable:
+        # routes can be added at any time (include_router, add_api_route, mount, ...) or the list replaced (see
+        # lazy_routers.py): rebuilt when they change
+        if self._table is None or self._table_routes is not self.routes or self._table_size != len(self.routes):
+            self._table = RouteTable(self.routes)
+            self._table_routes = self.routes
+            self._table_size = len(self.routes)
+        return self._table
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # starlette.routing.Router.__call__, trying only the routes the table gives for the path
+        assert scope["type"] in ("http", "websocket", "lifespan")
+
+        if "router" not in scope:
+            scope["router"] = self
+
+        if scope["type"] == "lifespan":
+            await self.lifespan(scope, receive, send)
+            return
+
+        routes = self.routes
+        table = self.route_table
+        partial = None
+        partial_scope: Scope = {}
+
+        for index in table.candidates(scope["path"]):
+            route = routes[index]
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                scope.update(child_scope)
+                await route.handle(scope, receive, send)
+                return
+            elif match == Match.PARTIAL and partial is None:
+                partial = route
+                partial_scope = child_scope
+
+        if partial is not None:
+            # "405 Method Not Allowed"
+            scope.update(partial_scope)
+            await partial.handle(scope, receive, send)
+            return
+
+        if scope["type"] == "http" and self.redirect_slashes and scope["path"] != "/":
+            redirect_scope = dict(scope)
+            if scope["path"].endswith("/"):
+                redirect_scope["path"] = redirect_scope["path"].rstrip("/")
+            else:
+                redirect_scope["path"] = redirect_scope["path"] + "/"
+
+            for index in table.candidates(redirect_scope["path"] or "/"):
+                match, child_scope = routes[index].matches(redirect_scope)
+                if match != Match.NONE:
+                    redirect_url = URL(scope=redirect_scope)
+                    response = RedirectResponse(url=str(redirect_url))
+                    await response(scope, receive, send)
+                    return
+
+        await self.default(scope, receive, send)
+
+
+def use_compiled_router(app: FastAPI) -> None:
+    """Match the requests of the app with a CompiledAPIRouter, keeping its routes and settings."""
+    # FastAPI creates its APIRouter itself; CompiledAPIRouter only adds behaviour, no state of its own to set up
+    app.router.__class__ = CompiledAPIRouter
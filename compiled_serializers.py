@@ -0,0 +1,337 @@
+"""
+Compiled response serializers
+
+For a path operation with response_model=Item, FastAPI does this with every return value:
+
+1. validates it against Item (a full pydantic model is built, field by field),
+2. turns that model back into a dict with jsonable_encoder, applying response_model_include,
+   response_model_exclude and response_model_exclude_unset, again walking every field.
+
+Almost all of that work is the same for every request: the fields, their types, what is included or excluded.
+compile_serializer() looks at the model once and writes a small Python function just for it (and for that
+include/exclude/unset combination): one straight block of code per field that checks the type, fills in the default
+and copies the value. The functions are cached, so every route with the same combination shares one.
+
+The checks only accept the obvious, already-valid values (a str for a str field, an int or a float for a float
+field, ...). Anything else, a missing required field, a str where an int is expected, raises
+SerializationFallback and the value goes through FastAPI's normal validation instead, so errors and coercions behave
+exactly the same. The fields left out by include / exclude are checked too (FastAPI validates the whole model
+before it filters), they are just not copied. Models with validators, constrained or unusual field types (or
+defaults that aren't plain JSON data) are not compiled at all.
+
+Use it for all the routes of an app (before declaring them) with:
+
+    app.router.route_class = CompiledSerializerRoute
+"""
+import asyncio
+import copy
+import functools
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Type
+
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.dependencies.models import Dependant
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from fastapi.routing import APIRoute, _prepare_response_content, get_request_handler
+from pydantic import BaseModel, ValidationError
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON, ModelField
+
+Serializer = Callable[[Any], Any]
+
+SCALAR_TYPES = (str, int, float, bool)
+
+
+class SerializationFallback(Exception):
+    """The value is not one the compiled function can handle, use the generic path."""
+
+
+class _Missing:
+    def __repr__(self) -> str:
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+
+def _can_compile_model(model: Type[BaseModel]) -> bool:
+    config = model.__config__
+    return (
+        not model.__validators__
+        and not model.__pre_root_validators__
+        and not model.__post_root_validators__
+        and getattr(config.extra, "value", config.extra) == "ignore"
+        and not config.allow_population_by_field_name
+    )
+
+
+def _is_plain_json(value: Any) -> bool:
+    """Lists and dicts of str, int, float, bool and None: a default FastAPI sends as it is."""
+    if value is None or type(value) in SCALAR_TYPES:
+        return True
+    if type(value) is list:
+        return all(_is_plain_json(item) for item in value)
+    if type(value) is dict:
+        return all(type(key) is str and _is_plain_json(item) for key, item in value.items())
+    return False
+
+
+def _value_check(field: ModelField, flags: tuple, namespace: Dict[str, Any], lines: List[str], indent: str) -> bool:
+    """Adds the lines that check (and, for float, convert) `v` for this field. False if the type isn't supported."""
+    type_ = field.type_
+    if field.shape not in (SHAPE_SINGLETON, SHAPE_LIST):
+        return False
+    if isinstance(type_, type) and issubclass(type_, BaseModel):
+        nested = _compile_model(type_, None, None, *flags)
+        if nested is None:
+            return False
+        name = f"encode_{type_.__name__}_{id(nested)}"
+        namespace[name] = nested
+        if field.shape == SHAPE_LIST:
+            lines.append(f"{indent}if not isinstance(v, list): raise SerializationFallback")
+            lines.append(f"{indent}v = [{name}(item) for item in v]")
+        else:
+            lines.append(f"{indent}v = {name}(v)")
+        return True
+    if type_ not in SCALAR_TYPES:
+        return False
+    if field.shape == SHAPE_LIST:
+        if field.sub_fields and field.sub_fields[0].allow_none:
+            return False
+        if type_ is float:
+            lines.append(f"{indent}if type(v) is not list: raise SerializationFallback")
+            lines.append(f"{indent}v = [float(item) if type(item) is int else item for item in v]")
+        else:
+            lines.append(f"{indent}if type(v) is not list: raise SerializationFallback")
+        lines.append(f"{indent}for item in v:")
+        lines.append(f"{indent}    if type(item) is not {type_.__name__}: raise SerializationFallback")
+        return True
+    if type_ is float:
+        lines.append(f"{indent}if type(v) is int: v = float(v)")
+    lines.append(f"{indent}if type(v) is not {type_.__name__}: raise SerializationFallback")
+    return True
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_model(
+        model: Type[BaseModel],
+        include: Optional[FrozenSet[str]],
+        exclude: Optional[FrozenSet[str]],
+        by_alias: bool,
+        exclude_unset: bool,
+        exclude_defaults: bool,
+        exclude_none: bool,
+) -> Optional[Serializer]:
+    if not _can_compile_model(model):
+        return None
+    flags = (by_alias, exclude_unset, exclude_defaults, exclude_none)
+    namespace: Dict[str, Any] = {
+        "BaseModel": BaseModel,
+        "MISSING": MISSING,
+        "deepcopy": copy.deepcopy,
+        "SerializationFallback": SerializationFallback,
+    }
+    orm_mode = model.__config__.orm_mode
+    lines = [
+        "def encode(obj):",
+        "    if type(obj) is dict:",
+        "        get = obj.get",
+        "    elif isinstance(obj, BaseModel):",
+        f"        obj = obj.dict(by_alias=True, exclude_unset={exclude_unset}, exclude_defaults={exclude_defaults},"
+        f" exclude_none={exclude_none})",
+        "        get = obj.get",
+    ]
+    if orm_mode:
+        lines += [
+            "    else:",
+            "        get = lambda key, default: getattr(obj, key, default)",
+        ]
+    else:
+        lines += [
+            "    else:",
+            "        raise SerializationFallback",
+        ]
+    lines.append("    out = {}")
+    for name, field in model.__fields__.items():
+        if field.class_validators or field.pre_validators or field.post_validators:
+            return None
+        # a field that isn't in the output is still checked: FastAPI validates the whole model before it filters
+        output = not (include is not None and name not in include or exclude is not None and name in exclude)
+        key = field.alias if by_alias else name
+        default_name = f"default_{name}"
+        default = field.default
+        if default is None or type(default) in SCALAR_TYPES:
+            default_value = default_name
+        elif _is_plain_json(default):
+            default_value = f"deepcopy({default_name})"  # every response gets its own copy of a list or dict default
+        else:
+            return None
+        namespace[default_name] = default
+        lines.append(f"    v = get({field.alias!r}, MISSING)")
+        lines.append("    if v is MISSING:")
+        if field.required:
+            lines.append("        raise SerializationFallback")
+        elif not output or exclude_unset:
+            lines.append("        pass")
+        elif field.default_factory is not None:
+            return None
+        elif exclude_defaults:
+            lines.append("        pass")
+        elif exclude_none:
+            lines.append(f"        if {default_name} is not None: out[{key!r}] = {default_value}")
+        else:
+            lines.append(f"        out[{key!r}] = {default_value}")
+        lines.append("    else:")
+        if field.allow_none:
+            lines.append("        if v is not None:")
+            indent = "            "
+        else:
+            lines.append("        if v is None: raise SerializationFallback")
+            indent = "        "
+        if not _value_check(field, flags, namespace, lines, indent):
+            return None
+        if not output:
+            if field.allow_none:
+                lines.append(f"{indent}pass")
+            continue
+        condition = []
+        if exclude_none:
+            condition.append("v is not None")
+        if exclude_defaults:
+            condition.append(f"v != {default_name}")
+        prefix = f"if {' and '.join(condition)}: " if condition else ""
+        lines.append(f"        {prefix}out[{key!r}] = v")
+    lines.append("    return out")
+    exec("\n".join(lines), namespace)
+    return namespace["encode"]
+
+
+def compile_serializer(
+        field: ModelField,
+        include: Any = None,
+        exclude: Any = None,
+        by_alias: bool = True,
+        exclude_unset: bool = False,
+        exclude_defaults: bool = False,
+        exclude_none: bool = False,
+) -> Optional[Serializer]:
+    """
+    A function that turns a return value into the JSON compatible data FastAPI would send for this response field,
+    or None if the model can't be compiled. Works for response_model=Model and response_model=List[Model].
+    Only sets of field names are supported for include and exclude (not nested dicts).
+    """
+    if include is not None and not isinstance(include, (set, frozenset)):
+        return None
+    if exclude is not None and not isinstance(exclude, (set, frozenset)):
+        return None
+    model = field.type_
+    if not (isinstance(model, type) and issubclass(model, BaseModel)):
+        return None
+    if field.shape not in (SHAPE_SINGLETON, SHAPE_LIST):
+        return None
+    encode = _compile_model(
+        model,
+        frozenset(include) if include is not None else None,
+        frozenset(exclude) if exclude is not None else None,
+        by_alias,
+        exclude_unset,
+        exclude_defaults,
+        exclude_none,
+    )
+    if encode is None or field.shape == SHAPE_SINGLETON:
+        return encode
+
+    def encode_list(obj: Any) -> list:
+        if not isinstance(obj, list):
+            raise SerializationFallback
+        return [encode(item) for item in obj]
+
+    return encode_list
+
+
+def _uses_response_parameter(dependant: Dependant) -> bool:
+    return dependant.response_param_name is not None or any(
+        _uses_response_parameter(sub_dependant) for sub_dependant in dependant.dependencies
+    )
+
+
+class CompiledSerializerRoute(APIRoute):
+    """
+    An APIRoute that serializes the return value with compile_serializer() when it can.
+
+    The endpoint is wrapped so it returns the finished response itself (FastAPI sends a returned Response as it is).
+    For sync endpoints the serialization runs in the threadpool too, together with the endpoint.
+    Routes that declare a Response parameter (anywhere in their dependencies) keep the normal path, because headers
+    and status codes set on it are only applied by FastAPI's own serialization.
+    """
+
+    def get_route_handler(self) -> Callable:
+        field = self.secure_cloned_response_field
+        serializer = None
+        if field is not None and not _uses_response_parameter(self.dependant):
+            serializer = compile_serializer(
+                field,
+                include=self.response_model_include,
+                exclude=self.response_model_exclude,
+                by_alias=self.response_model_by_alias,
+                exclude_unset=self.response_model_exclude_unset,
+                exclude_defaults=self.response_model_exclude_defaults,
+                exclude_none=self.response_model_exclude_none,
+            )
+        if serializer is None:
+            return super().get_route_handler()
+
+        response_class = self.response_class
+        if isinstance(response_class, DefaultPlaceholder):
+            response_class = response_class.value
+        response_args = {"status_code": self.status_code} if self.status_code else {}
+        endpoint = self.dependant.call
+
+        def serialize(raw_response: Any) -> Any:
+            if isinstance(raw_response, Response):  # returned by the endpoint itself, sent as it is
+                return raw_response
+            try:
+                content = serializer(raw_response)
+            except SerializationFallback:
+                content = self.generic_serialize(field, raw_response)
+            return response_class(content, **response_args)
+
+        if asyncio.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def compiled_endpoint(**values: Any) -> Any:
+                return serialize(await endpoint(**values))
+        else:
+            @functools.wraps(endpoint)
+            def compiled_endpoint(**values: Any) -> Any:
+                return serialize(endpoint(**values))
+
+        dependant = copy.copy(self.dependant)
+        dependant.call = compiled_endpoint
+        return get_request_handler(
+            dependant=dependant,
+            body_field=self.body_field,
+            status_code=self.status_code,
+            response_class=self.response_class,
+            response_field=None,
+            dependency_overrides_provider=self.dependency_overrides_provider,
+        )
+
+    def generic_serialize(self, field: ModelField, raw_response: Any) -> Any:
+        """What fastapi.routing.serialize_response does, for the values the compiled function didn't accept."""
+        response_content = _prepare_response_content(
+            raw_response,
+            exclude_unset=self.response_model_exclude_unset,
+            exclude_defaults=self.response_model_exclude_defaults,
+            exclude_none=self.response_model_exclude_none,
+        )
+        value, errors = field.validate(response_content, {}, loc=("response",))
+        if errors:
+            raise ValidationError(errors if isinstance(errors, list) else [errors], field.type_)
+        return jsonable_encoder(
+            value,
+            include=self.response_model_include,
+            exclude=self.response_model_exclude,
+            by_alias=self.response_model_by_alias,
+            exclude_unset=self.response_model_exclude_unset,
+            exclude_defaults=self.response_model_exclude_defaults,
+            exclude_none=self.response_model_exclude_none,
+        )
@@ -0,0 +1,232 @@
+"""
+Response compression
+
+Big JSON responses (a list of users with all their items, ...) are mostly repeated keys and punctuation, they shrink
+to a fraction of their size when compressed. CompressionMiddleware compresses the responses of an app:
+
+- with zstd, brotli or gzip, the first one in `encodings` that the client accepts (Accept-Encoding). gzip is in the
+  standard library, brotli needs the brotli package and zstd the zstandard package, those are skipped when they
+  are not installed,
+- only responses of at least `minimum_size` bytes: for small ones the headers and the CPU time cost more than what
+  compressing saves,
+- a StreamingResponse is compressed chunk by chunk as it is sent, every chunk is flushed so the client gets it right
+  away instead of when the compressor's buffer is full,
+- bodies (or chunks) of `threadpool_size` bytes or more are compressed in the threadpool, so compressing a big
+  response doesn't stop the event loop from serving other requests meanwhile,
+- the levels can be changed for one path operation with @compression(...), or compression turned off for it:
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/users/")
+    @compression(gzip=9, br=6)  # below the @app.get decorator: it must be set before the route is created
+    def read_users():
+        ...
+
+A compressed response gets Vary: Accept-Encoding, and its ETag becomes weak (W/"..."), as the bytes sent are not the
+ones the ETag was computed from (If-None-Match uses the weak comparison, so 304s still work).
+"""
+import zlib
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+DEFAULT_LEVELS = {"zstd": 3, "br": 4, "gzip": 6}
+
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/x-ndjson", "application/javascript", "application/xml", "+json", "+xml"
+)
+
+
+class GzipCompressor:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class BrotliCompressor:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.process(data)
+        return output + (self._compressor.finish() if final else self._compressor.flush())
+
+
+class ZstdCompressor:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.compress(data)
+        return output + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH if final
+                                                else zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+
+COMPRESSORS: Dict[str, Callable[[int], Any]] = {"gzip": GzipCompressor}
+if brotli is not None:
+    COMPRESSORS["br"] = BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS["zstd"] = ZstdCompressor
+
+
+def compression(enabled: bool = True, **levels: int) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Compression levels for the responses of this path operation (e.g. gzip=9, br=6, zstd=10), or enabled=False."""
+
+    def decorator(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+        endpoint.compression = levels if enabled else None
+        return endpoint
+
+    return decorator
+
+
+def accepted_encodings(accept_encoding: str, available: Iterable[str] = ()) -> set:
+    """
+    The content codings in an Accept-Encoding header, without the ones refused with q=0.
+    "*" stands for the codings of `available` that the header doesn't name: "gzip;q=0, *" accepts br but not gzip.
+    """
+    accepted = set()
+    named = set()
+    for part in accept_encoding.split(","):
+        coding, _, parameters = part.partition(";")
+        coding = coding.strip().lower()
+        named.add(coding)
+        quality = parameters.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding)
+    if "*" in accepted:
+        accepted.update(coding for coding in available if coding not in named)
+    return accepted
+
+
+class CompressionMiddleware:
+    def __init__(
+            self,
+            app: ASGIApp,
+            minimum_size: int = 1024,
+            encodings: Iterable[str] = ("zstd", "br", "gzip"),
+            levels: Optional[Dict[str, int]] = None,
+            threadpool_size: int = 256 * 1024,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = [encoding for encoding in encodings if encoding in COMPRESSORS]
+        self.levels = {**DEFAULT_LEVELS, **(levels or {})}
+        self.threadpool_size = threadpool_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        encoding = next((encoding for encoding in self.encodings if encoding in accepted), None)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await CompressionResponder(self, scope, encoding)(receive, send)
+
+
+class CompressionResponder:
+    """Compresses one response: holds back the start message until the first body message says how to send it."""
+
+    def __init__(self, middleware: CompressionMiddleware, scope: Scope, encoding: str) -> None:
+        self.middleware = middleware
+        self.scope = scope
+        self.encoding = encoding
+        self.start_message: Optional[Message] = None
+        self.compressor: Any = None
+        self.passthrough = False
+
+    async def __call__(self, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.middleware.app(self.scope, receive, self.send_compressed)
+
+    def should_compress(self, headers: Headers) -> bool:
+        if self.start_message["status"] in (204, 206, 304) or "content-encoding" in headers:
+            return False
+        if "content-range" in headers:  # a part of the body: the range is of the uncompressed bytes
+            return False
+        content_type = headers.get("content-type", "")
+        if not any(compressible in content_type for compressible in COMPRESSIBLE_TYPES):
+            return False
+        content_length = headers.get("content-length")
+        return content_length is None or int(content_length) >= self.middleware.minimum_size
+
+    def start_compressor(self, start_message: Message) -> bool:
+        # the route is only known once the router ran, it left the endpoint in the scope
+        levels = getattr(self.scope.get("endpoint"), "compression", {})
+        if levels is None:  # @compression(enabled=False)
+            return False
+        level = levels.get(self.encoding, self.middleware.levels[self.encoding])
+        self.compressor = COMPRESSORS[self.encoding](level)
+        headers = MutableHeaders(scope=start_message)
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag is not None and not etag.startswith("W/"):
+            headers["etag"] = f"W/{etag}"
+        return True
+
+    async def compress(self, data: bytes, final: bool) -> bytes:
+        if len(data) >= self.middleware.threadpool_size:
+            return await run_in_threadpool(self.compressor.compress, data, final)
+        return self.compressor.compress(data, final)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            self.passthrough = not self.should_compress(Headers(raw=message.get("headers", [])))
+            if self.passthrough:
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" and not self.passthrough and self.start_message is not None:
+            # the body is sent another way (http.response.zerocopysend, http.response.pathsend, ...), it can't be
+            # compressed: the response goes as it is, its start first
+            self.passthrough = True
+            start_message, self.start_message = self.start_message, None
+            await self.send(start_message)
+        if self.passthrough or message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None and self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            # a whole body below the threshold (the response didn't say its length), or compression turned off
+            if not more_body and len(body) < self.middleware.minimum_size or not self.start_compressor(start_message):
+                self.passthrough = True
+                await self.send(start_message)
+                await self.send(message)
+                return
+            headers = MutableHeaders(scope=start_message)
+            if more_body:  # streaming: the compressed length isn't known yet
+                del headers["content-length"]
+                body = await self.compress(body, final=False)
+            else:
+                body = await self.compress(body, final=True)
+                headers["content-length"] = str(len(body))
+            await self.send(start_message)
+            await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+        body = await self.compress(body, final=not more_body)
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
@@ -0,0 +1,91 @@
+"""
+Conditional requests: ETag, If-None-Match and Cache-Control for read endpoints
+
+A client that polls GET /items/foo gets the whole item every time, even when nothing changed. With an ETag (a
+fingerprint of the response) the client can send it back in If-None-Match, and as long as the item is the same the
+answer is an empty 304 Not Modified: the client uses its cached copy.
+
+ConditionalRoute does that for all the GET routes of an app:
+
+- a 200 response without an ETag gets one, a hash of its body,
+- when If-None-Match matches the ETag, the body is dropped and a 304 is sent instead,
+- Cache-Control is added from the policy declared on the path operation with @cache_control(...).
+
+That saves the transfer, the response is still built. When the endpoint knows the version of what it returns (like
+the item store of 20UpdatesPUT.py), it can check If-None-Match itself with not_modified() before doing any work and
+return a 304 right away, that saves the serialization too.
+
+    app.router.route_class = ConditionalRoute
+
+    @app.get("/items/{item_id}")
+    @cache_control("no-cache")  # below the @app.get decorator: it must be set before the route is created
+    async def read_item(item_id: str):
+        ...
+"""
+import hashlib
+from typing import Any, Callable, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+
+def cache_control(policy: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """The Cache-Control header for the responses of this path operation, e.g. "no-cache" or "max-age=60"."""
+
+    def decorator(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+        endpoint.cache_control = policy
+        return endpoint
+
+    return decorator
+
+
+def body_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def not_modified(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    True if the If-None-Match header matches the ETag, so a 304 can be sent. Uses the weak comparison, as If-None-Match
+    does: W/"1" matches "1".
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class ConditionalRoute(APIRoute):
+    """
+    An APIRoute that adds ETags, answers If-None-Match with 304 and sets the declared Cache-Control on GET routes.
+    It works on top of other route classes too: class Route(ConditionalRoute, CompiledSerializerRoute): pass
+    """
+
+    def get_route_handler(self) -> Callable:
+        route_handler = super().get_route_handler()
+        if "GET" not in self.methods:
+            return route_handler
+        policy = getattr(self.endpoint, "cache_control", None)
+
+        async def conditional_route_handler(request: Request) -> Response:
+            response = await route_handler(request)
+            if response.status_code == 304:  # already decided by the endpoint
+                if policy is not None:
+                    response.headers.setdefault("cache-control", policy)
+                return response
+            if response.status_code != 200 or not hasattr(response, "body"):  # errors, streaming responses, ...
+                return response
+            etag = response.headers.get("etag")
+            if etag is None:
+                etag = body_etag(response.body)
+                response.headers["etag"] = etag
+            if policy is not None:
+                response.headers.setdefault("cache-control", policy)
+            if not_modified(request.headers.get("if-none-match"), etag):
+                headers = {key: value for key, value in response.headers.items()
+                           if key in ("etag", "cache-control", "vary", "last-modified")}
+                return Response(status_code=304, headers=headers)
+            return response
+
+        return conditional_route_handler
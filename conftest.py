@@ -0,0 +1,20 @@
+"""
+The tutorial modules start with a digit, so tests import them with importlib, as members of the fast_api_tutorial
+package (the name __main__.py uses), e.g. importlib.import_module("fast_api_tutorial.15RequestFiles"), and their
+relative imports (from .json_responses import ...) work. This registers the repository root as that package, for the
+tests in tests/ and the ones next to the tutorial modules (34TestingBigExample/test_main_b.py).
+"""
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PACKAGE = "fast_api_tutorial"
+
+if PACKAGE not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE, os.path.join(ROOT, "__init__.py"), submodule_search_locations=[ROOT]
+    )
+    package = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE] = package
+    spec.loader.exec_module(package)
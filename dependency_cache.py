@@ -0,0 +1,143 @@
+"""
+Application-scoped dependency cache with a TTL
+
+FastAPI's cache (use_cache, see 22SubDependencies.py) only lasts for one request: a dependency used twice in the
+same request runs once, but it runs again for the next request. For a dependency that costs something (checking a
+token against an auth service, loading the principal of an API key from the database, ...) and gives the same answer
+for a while, DependencyCache keeps the value across requests:
+
+    dependency_cache = DependencyCache()
+
+    @dependency_cache.cached(ttl=60, key=lambda x_token: x_token)
+    async def get_principal(x_token: str = Header(...)):
+        ...  # the expensive check, at most once a minute per token
+
+- `key` gets the same arguments as the dependency and returns what identifies its value (the token above). Without
+  it the key is all the arguments, which is only right when they are all plain values: with a sub-dependency (a
+  database session, ...) among them, say which arguments matter,
+- only values are cached: a dependency that raises (an HTTPException for an invalid token, ...) runs again next
+  time, a failure is never served from the cache,
+- at most `maxsize` values are kept per dependency, the least recently used one is dropped first,
+- the cached dependency keeps the signature of the original, FastAPI sees the same parameters and it can be used
+  in Depends() and in dependencies=[...] like before. A cached value is shared by all the requests with the same
+  key: it must not be changed by the code that gets it.
+
+dependency_cache.invalidate(get_principal, "some-token") drops one value (a revoked token), invalidate(get_principal)
+all the values of the dependency and invalidate() everything. dependency_cache.stats() gives the hits, misses,
+expired and evicted values and the hit rate of every cached dependency, by its module and qualified name
+("package.dependencies.get_principal").
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from fastapi.dependencies.utils import is_coroutine_callable
+
+_MISSING = object()
+
+
+class CachedDependency:
+    """The values of one cached dependency: key -> (expires at, value), least recently used first."""
+
+    def __init__(self, name: str, ttl: float, maxsize: int, key: Optional[Callable[..., Hashable]]):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.key = key
+        self.values: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.lock = threading.Lock()  # sync dependencies run in the threadpool
+        self.hits = self.misses = self.expired = self.evicted = 0
+
+    def make_key(self, kwargs: Dict[str, Any]) -> Hashable:
+        if self.key is not None:
+            return self.key(**kwargs)
+        return tuple(sorted(kwargs.items()))
+
+    def get(self, key: Hashable, now: float) -> Any:
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self.values.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self.values[key]
+                self.expired += 1
+            self.misses += 1
+            return _MISSING
+
+    def put(self, key: Hashable, value: Any, now: float) -> None:
+        with self.lock:
+            self.values[key] = (now + self.ttl, value)
+            self.values.move_to_end(key)
+            while len(self.values) > self.maxsize:
+                self.values.popitem(last=False)
+                self.evicted += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.values),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class DependencyCache:
+    def __init__(self, maxsize: int = 1024, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self.dependencies: Dict[Callable[..., Any], CachedDependency] = {}  # by the cached (wrapped) function
+
+    def cached(self, ttl: float, key: Optional[Callable[..., Hashable]] = None,
+               maxsize: Optional[int] = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """Cache the values of the decorated dependency for `ttl` seconds, per `key(**arguments)`."""
+
+        def decorator(call: Callable[..., Any]) -> Callable[..., Any]:
+            # the module and qualified name: two dependencies called get_user in different modules (or classes)
+            # get their own stats
+            cache = CachedDependency(f"{call.__module__}.{call.__qualname__}", ttl, maxsize or self.maxsize, key)
+            clock = self.clock
+
+            # functools.wraps sets __wrapped__: FastAPI reads the parameters of the original function
+            if is_coroutine_callable(call):
+                @functools.wraps(call)
+                async def cached_call(**kwargs: Any) -> Any:
+                    cache_key = cache.make_key(kwargs)
+                    value = cache.get(cache_key, clock())
+                    if value is _MISSING:
+                        value = await call(**kwargs)
+                        cache.put(cache_key, value, clock())
+                    return value
+            else:
+                @functools.wraps(call)
+                def cached_call(**kwargs: Any) -> Any:
+                    cache_key = cache.make_key(kwargs)
+                    value = cache.get(cache_key, clock())
+                    if value is _MISSING:
+                        value = call(**kwargs)
+                        cache.put(cache_key, value, clock())
+                    return value
+
+            self.dependencies[cached_call] = cache
+            return cached_call
+
+        return decorator
+
+    def invalidate(self, dependency: Optional[Callable[..., Any]] = None, key: Hashable = _MISSING) -> None:
+        """Drop the value of `key` for the dependency, all its values without a key, or everything without both."""
+        caches = self.dependencies.values() if dependency is None else [self.dependencies[dependency]]
+        for cache in caches:
+            with cache.lock:
+                if key is _MISSING:
+                    cache.values.clear()
+                else:
+                    cache.values.pop(key, None)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {cache.name: cache.stats() for cache in self.dependencies.values()}
@@ -0,0 +1,280 @@
+"""
+Precompiled dependency plans
+
+For every request FastAPI walks the dependency tree of the path operation again (fastapi.dependencies.utils.
+solve_dependencies): recursively, dependency by dependency, checking the overrides and the cache of each one on the
+way, and it runs them strictly one after the other, even async dependencies that don't need each other.
+
+PlannedRoute does that walk once, when the route is created, and turns the tree into a plan:
+
+- all the query, path, header, cookie and body parameters of the whole tree are validated in one go (FastAPI's
+  flat dependant). A request with invalid parameters goes through FastAPI's normal resolution instead, so it gets
+  exactly the same error as without the plan (a dependency that runs before the invalid parameter is reached can
+  still answer first, with its own HTTPException),
+- the dependencies become a flat list of steps, in the order FastAPI runs them: depth first, in the order they
+  are declared (the sub-dependencies of a dependency right before it). A dependency used several times is one step
+  (unless it was declared with use_cache=False), like FastAPI's cache,
+- the steps run one by one in that order, as before, except for async (async def) dependencies marked with
+  @independent that are declared next to each other by the same dependant (and don't need each other): those run
+  concurrently, with asyncio.gather. So an authorization check that fails still stops the request before a
+  dependency declared after it runs, and the ones with yield are set up (and cleaned up) in the same order.
+
+@independent says a dependency doesn't care what runs at the same time: it only reads its own parameters, and
+nothing else relies on it running before or after its siblings (checks like verify_token and verify_key in
+24GlobalDependencies.py, that do I/O). When several of them fail, the error raised is the one of the first in the
+order they are declared, the one the client would have got with them running one after the other.
+
+Every step is timed. PlannedRoute.timings keeps the count, total and maximum time of every dependency of the route,
+dependency_report(app) prints them for all the routes: where the time of the requests goes. With server_timing=True
+(or the SERVER_TIMING=1 environment variable) every response also gets a Server-Timing header with the time of each
+dependency of that request, the browser's developer tools show it next to the request.
+
+Use it for all the routes of an app (before declaring them) with:
+
+    app.router.route_class = PlannedRoute
+
+Routes with dependencies the plan doesn't cover (SecurityScopes parameters, a parameter name declared differently
+by two dependencies) keep FastAPI's normal resolution, as does every request while app.dependency_overrides is set.
+"""
+import asyncio
+import itertools
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.dependencies.models import Dependant
+from fastapi.dependencies.utils import (
+    get_flat_dependant,
+    is_async_gen_callable,
+    is_coroutine_callable,
+    is_gen_callable,
+    solve_generator,
+)
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from pydantic.fields import ModelField
+
+SERVER_TIMING = os.environ.get("SERVER_TIMING") == "1"
+
+# the names the plan gets the request, the response and the background tasks under from FastAPI
+REQUEST = "__plan_request"
+RESPONSE = "__plan_response"
+BACKGROUND_TASKS = "__plan_background_tasks"
+PLAN_STARTED = "dependency_plan_started"  # in the scope, once the parameters were valid and the plan runs
+
+
+def independent(call: Callable[..., Any]) -> Callable[..., Any]:
+    """Mark an async dependency as safe to run concurrently with the other independent ones, see above."""
+    call.independent = True
+    return call
+
+
+class Step:
+    def __init__(self, index: int, dependant: Dependant, dependencies: List[Tuple[Optional[str], int]], parent: int):
+        self.index = index
+        self.call = dependant.call
+        self.name = getattr(self.call, "__name__", type(self.call).__name__)
+        self.parent = parent  # the dependant that declared it (its first use, if it is cached)
+        self.dependencies = dependencies  # (parameter name, index of the step that gives its value)
+        self.parameters = [
+            field.name
+            for fields in (dependant.path_params, dependant.query_params, dependant.header_params,
+                           dependant.cookie_params, dependant.body_params)
+            for field in fields
+        ]
+        self.special = [
+            (name, source)
+            for name, source in (
+                (dependant.request_param_name, REQUEST),
+                (dependant.http_connection_param_name, REQUEST),
+                (dependant.response_param_name, RESPONSE),
+                (dependant.background_tasks_param_name, BACKGROUND_TASKS),
+            )
+            if name is not None
+        ]
+        self.is_generator = is_gen_callable(self.call) or is_async_gen_callable(self.call)
+        self.is_coroutine = not self.is_generator and is_coroutine_callable(self.call)
+        self.is_concurrent = self.is_coroutine and getattr(self.call, "independent", False)
+
+    def arguments(self, values: Dict[str, Any], results: List[Any]) -> Dict[str, Any]:
+        arguments = {name: values[name] for name in self.parameters}
+        for name, source in self.special:
+            arguments[name] = values[source]
+        for name, index in self.dependencies:
+            if name is not None:
+                arguments[name] = results[index]
+        return arguments
+
+
+class Plan:
+    def __init__(self, steps: List[Step]):
+        self.steps = steps  # the last one is the path operation function itself
+        # the dependencies in order, in runs: one step, or several independent siblings to run concurrently
+        self.runs: List[List[Step]] = []
+        for step in steps[:-1]:
+            run = self.runs[-1] if self.runs else None
+            if (run is not None and step.is_concurrent and run[0].is_concurrent and step.parent == run[0].parent
+                    and not {index for _, index in step.dependencies} & {other.index for other in run}):
+                run.append(step)
+            else:
+                self.runs.append([step])
+
+
+def _field_signature(field: ModelField) -> tuple:
+    return field.alias, field.type_, field.shape, repr(field.default), field.required, type(field.field_info)
+
+
+def compile_plan(dependant: Dependant) -> Optional[Plan]:
+    """The plan for the dependency tree of a path operation, None if it can't be planned."""
+    steps: List[Step] = []
+    cache: Dict[tuple, int] = {}
+    dependants = itertools.count()  # an id for every dependant visited, the parent of its dependencies
+
+    def add(sub_dependant: Dependant, parent: int) -> Optional[int]:
+        # the order of solve_dependencies: the sub-dependencies first, one by one, then the dependency itself
+        if sub_dependant.security_scopes_param_name or sub_dependant.websocket_param_name:
+            return None
+        # FastAPI's cache key: the same function with the same security scopes gives the same value
+        cache_key = (sub_dependant.call, tuple(sorted(set(sub_dependant.security_scopes or []))))
+        if sub_dependant.use_cache and cache_key in cache:
+            return cache[cache_key]
+        dependant_id = next(dependants)
+        dependencies = []
+        for dependency in sub_dependant.dependencies:
+            index = add(dependency, dependant_id)
+            if index is None:
+                return None
+            dependencies.append((dependency.name, index))
+        steps.append(Step(len(steps), sub_dependant, dependencies, parent))
+        cache.setdefault(cache_key, len(steps) - 1)
+        return len(steps) - 1
+
+    if add(dependant, -1) is None:
+        return None
+    # all the parameters are validated together, one value per name: the same name must mean the same thing
+    signatures: Dict[str, tuple] = {}
+    flat = get_flat_dependant(dependant, skip_repeats=True)
+    for fields in (flat.path_params, flat.query_params, flat.header_params, flat.cookie_params, flat.body_params):
+        for field in fields:
+            if signatures.setdefault(field.name, _field_signature(field)) != _field_signature(field):
+                return None
+    return Plan(steps)
+
+
+def _unique(fields: List[ModelField]) -> List[ModelField]:
+    return list({field.name: field for field in fields}.values())
+
+
+class PlannedRoute(APIRoute):
+    server_timing = SERVER_TIMING
+
+    def get_route_handler(self) -> Callable:
+        route_handler = super().get_route_handler()
+        # dependency (the callable: two dependencies can have the same name): [count, total seconds, maximum seconds]
+        self.timings: Dict[Callable, List[float]] = {}
+        plan = compile_plan(self.dependant)
+        if plan is None or len(plan.steps) == 1:  # no dependencies, nothing to plan
+            return route_handler
+
+        flat = get_flat_dependant(self.dependant, skip_repeats=True)
+        planned_dependant = Dependant(
+            path_params=_unique(flat.path_params),
+            query_params=_unique(flat.query_params),
+            header_params=_unique(flat.header_params),
+            cookie_params=_unique(flat.cookie_params),
+            body_params=_unique(flat.body_params),
+            call=self.plan_endpoint(plan),
+            request_param_name=REQUEST,
+            response_param_name=RESPONSE,
+            background_tasks_param_name=BACKGROUND_TASKS,
+            path=self.dependant.path,
+        )
+        # the other route classes (CompiledSerializerRoute, ...) build their handler from self.dependant
+        dependant, self.dependant = self.dependant, planned_dependant
+        try:
+            planned_handler = super().get_route_handler()
+        finally:
+            self.dependant = dependant
+
+        async def planned_route_handler(request: Request) -> Any:
+            provider = self.dependency_overrides_provider
+            if provider is not None and getattr(provider, "dependency_overrides", None):
+                return await route_handler(request)
+            try:
+                return await planned_handler(request)
+            except RequestValidationError:
+                if PLAN_STARTED in request.scope:  # raised by a dependency or the endpoint itself
+                    raise
+            # invalid parameters, nothing ran yet: FastAPI decides which error the client gets (the body is cached
+            # on the request, it can be read again)
+            return await route_handler(request)
+
+        return planned_route_handler
+
+    def plan_endpoint(self, plan: Plan) -> Callable:
+        endpoint_step = plan.steps[-1]
+        timings = self.timings
+        server_timing = self.server_timing
+
+        async def run_step(step: Step, arguments: Dict[str, Any], request: Request, durations: list) -> Any:
+            started = time.perf_counter()
+            if step.is_generator:
+                result = await solve_generator(call=step.call, stack=request.scope["fastapi_astack"],
+                                               sub_values=arguments)
+            elif step.is_coroutine:
+                result = await step.call(**arguments)
+            else:
+                result = await run_in_threadpool(step.call, **arguments)
+            elapsed = time.perf_counter() - started
+            timing = timings.get(step.call)
+            if timing is None:
+                timing = timings[step.call] = [0, 0.0, 0.0]
+            timing[0] += 1
+            timing[1] += elapsed
+            timing[2] = max(timing[2], elapsed)
+            durations.append((step.name, elapsed))
+            return result
+
+        async def planned_endpoint(**values: Any) -> Any:
+            request = values[REQUEST]
+            request.scope[PLAN_STARTED] = True
+            results: List[Any] = [None] * len(plan.steps)
+            durations: List[Tuple[str, float]] = []
+            for run in plan.runs:
+                if len(run) == 1:
+                    step = run[0]
+                    results[step.index] = await run_step(step, step.arguments(values, results), request, durations)
+                    continue
+                # all of them run to the end, then the error of the first one (in the order they are declared) is
+                # raised, the same one as when they ran one after the other (and stopped at that one)
+                outcomes = await asyncio.gather(
+                    *(run_step(step, step.arguments(values, results), request, durations) for step in run),
+                    return_exceptions=True,
+                )
+                for step, outcome in zip(run, outcomes):
+                    if isinstance(outcome, BaseException):
+                        raise outcome
+                    results[step.index] = outcome
+            if server_timing:
+                values[RESPONSE].headers.append(
+                    "server-timing", ", ".join(f"{name};dur={elapsed * 1000:.3f}" for name, elapsed in durations)
+                )
+            arguments = endpoint_step.arguments(values, results)
+            if endpoint_step.is_coroutine:
+                return await endpoint_step.call(**arguments)
+            return await run_in_threadpool(endpoint_step.call, **arguments)
+
+        return planned_endpoint
+
+
+def dependency_report(app: Any) -> str:
+    """The timings of the dependencies of every PlannedRoute of the app, as a table."""
+    lines = [f"{'route':<30} {'dependency':<30} {'calls':>8} {'mean us':>10} {'max us':>10} {'total ms':>10}"]
+    for route in app.routes:
+        for call, (count, total, maximum) in getattr(route, "timings", {}).items():
+            name = getattr(call, "__name__", type(call).__name__)
+            lines.append(f"{route.path:<30} {name:<30} {count:>8} {total / count * 1e6:>10.1f} {maximum * 1e6:>10.1f}"
+                         f" {total * 1e3:>10.2f}")
+    return "\n".join(lines)
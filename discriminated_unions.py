@@ -0,0 +1,55 @@
+"""
+Discriminated unions in response models
+
+A union with a discriminator (Field(discriminator="type"), see 12ExtraModels.py) is validated by looking up the model
+for the value of "type" in a mapping Pydantic builds when the model is created, instead of trying every member of
+the union in turn.
+
+FastAPI doesn't validate responses with the response_model itself but with a copy of it (so that returning an
+object of a subclass can't leak the extra fields of the subclass), and that copy (fastapi.utils.create_cloned_field,
+FastAPI 0.95) loses the discriminator: the responses are validated member by member again, up to once per model in
+the union.
+
+DiscriminatedUnionRoute puts the discriminators back into the copy when the route is created, so the lookup is
+done once, there, and every response is validated with just the one model its "type" picks. Use it for all the
+routes of an app (before declaring them) with:
+
+    app.router.route_class = DiscriminatedUnionRoute
+
+It works on top of other route classes too: class Route(DiscriminatedUnionRoute, ConditionalRoute): pass
+"""
+from typing import Callable, Optional, Set
+
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from pydantic.fields import ModelField
+
+
+def restore_discriminators(original: ModelField, cloned: ModelField, seen: Optional[Set[int]] = None) -> None:
+    """Copy the discriminators of original (and of the fields of its models, ...) to the cloned field."""
+    if seen is None:
+        seen = set()
+    if id(cloned) in seen:  # recursive models
+        return
+    seen.add(id(cloned))
+    for original_sub_field, cloned_sub_field in zip(original.sub_fields or (), cloned.sub_fields or ()):
+        restore_discriminators(original_sub_field, cloned_sub_field, seen)
+    if original.key_field is not None and cloned.key_field is not None:
+        restore_discriminators(original.key_field, cloned.key_field, seen)
+    original_type, cloned_type = original.type_, cloned.type_
+    if isinstance(original_type, type) and issubclass(original_type, BaseModel) and original_type is not cloned_type:
+        for name, original_field in original_type.__fields__.items():
+            cloned_field = cloned_type.__fields__.get(name)
+            if cloned_field is not None:
+                restore_discriminators(original_field, cloned_field, seen)
+    if original.discriminator_key is not None and cloned.discriminator_key is None:
+        cloned.discriminator_key = original.discriminator_key
+        # builds the {value of "type": field of the model} mapping from the cloned models
+        cloned.prepare_discriminated_union_sub_fields()
+
+
+class DiscriminatedUnionRoute(APIRoute):
+    def get_route_handler(self) -> Callable:
+        if self.response_field is not None and self.secure_cloned_response_field is not None:
+            restore_discriminators(self.response_field, self.secure_cloned_response_field)
+        return super().get_route_handler()
@@ -0,0 +1,141 @@
+"""
+A faster jsonable_encoder for pydantic models
+
+jsonable_encoder is generic: for every model it calls .dict(), then walks the result and checks the type of every
+value against a long list of cases, again for every nested value. On a write-heavy path that's most of the time
+spent in the path operation.
+
+model_encoder(Model) looks at the fields of the model class once and picks a converter for each one from its type:
+nothing to do for str, int, float and bool, .isoformat() for datetime, date and time, str() for UUID, list() for
+sets, the nested model's own encoder for models, and so on. The result is cached per class, so encoding an instance
+is one loop over (key, converter) pairs.
+
+A converter only trusts the declared type when the value really has it (pydantic validated it), otherwise it hands
+the value to jsonable_encoder, so the output is always the same as jsonable_encoder(model).
+Models with Config.json_encoders use jsonable_encoder directly.
+"""
+import datetime
+import functools
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Type
+from uuid import UUID
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_LIST, SHAPE_SET, SHAPE_SINGLETON, ModelField
+from pydantic.json import ENCODERS_BY_TYPE
+
+Converter = Callable[[Any], Any]
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _exactly(type_: type, convert: Converter) -> Converter:
+    def converter(value: Any) -> Any:
+        if type(value) is type_:
+            return convert(value)
+        if value is None:
+            return None
+        return jsonable_encoder(value)
+
+    return converter
+
+
+def _scalar(type_: type) -> Converter:
+    def converter(value: Any) -> Any:
+        if type(value) is type_ or value is None:
+            return value
+        return jsonable_encoder(value)
+
+    return converter
+
+
+SCALAR_CONVERTERS: Dict[type, Converter] = {
+    str: _scalar(str),
+    int: _scalar(int),
+    float: _scalar(float),
+    bool: _scalar(bool),
+    datetime.datetime: _exactly(datetime.datetime, datetime.datetime.isoformat),
+    datetime.date: _exactly(datetime.date, datetime.date.isoformat),
+    datetime.time: _exactly(datetime.time, datetime.time.isoformat),
+    UUID: _exactly(UUID, str),
+    Decimal: _exactly(Decimal, ENCODERS_BY_TYPE[Decimal]),  # int or float, depending on the exponent
+}
+
+
+def _item_converter(type_: Any) -> Converter:
+    if isinstance(type_, type) and issubclass(type_, BaseModel):
+        return _exactly_model(type_)
+    if type_ in SCALAR_CONVERTERS:
+        return SCALAR_CONVERTERS[type_]
+    if isinstance(type_, type) and issubclass(type_, Enum):
+        return lambda value: value.value if isinstance(value, type_) else jsonable_encoder(value)
+    return jsonable_encoder
+
+
+def _exactly_model(model: Type[BaseModel]) -> Converter:
+    def converter(value: Any) -> Any:
+        if type(value) is model:
+            return model_encoder(model)(value)
+        if value is None:
+            return None
+        return jsonable_encoder(value)
+
+    return converter
+
+
+def _field_converter(field: ModelField) -> Converter:
+    if field.sub_fields and field.shape == SHAPE_SINGLETON:
+        return jsonable_encoder  # Union[...] and other composite types
+    item = _item_converter(field.type_)
+    if field.shape == SHAPE_SINGLETON:
+        return item
+    if field.shape in (SHAPE_LIST, SHAPE_SET):
+        container = list if field.shape == SHAPE_LIST else set
+        if field.type_ in (str, int, float, bool):
+            # no conversion needed for the items, just a new list (sets become lists, as in jsonable_encoder)
+            return lambda value: list(value) if type(value) is container else jsonable_encoder(value)
+        return lambda value: [item(i) for i in value] if type(value) is container else jsonable_encoder(value)
+    return jsonable_encoder
+
+
+@functools.lru_cache(maxsize=None)
+def _field_converters(model: Type[BaseModel]) -> Optional[Tuple[Tuple[str, str, Converter], ...]]:
+    if model.__config__.json_encoders:
+        return None
+    return tuple(
+        (name, field.alias, _field_converter(field))
+        for name, field in model.__fields__.items()
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def model_encoder(model: Type[BaseModel]) -> Callable[..., Dict[str, Any]]:
+    """
+    The cached encoder for a model class. encoder(obj) gives the same dict as jsonable_encoder(obj),
+    encoder(obj, fields) only the given field names (e.g. obj.__fields_set__ for a partial update).
+    """
+    converters = _field_converters(model)
+    if converters is None:
+        def encode_generic(obj: BaseModel, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+            return jsonable_encoder(obj, include=set(fields) if fields is not None else None)
+
+        return encode_generic
+
+    def encode(obj: BaseModel, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        values = obj.__dict__
+        if fields is None:
+            return {key: convert(values[name]) for name, key, convert in converters}
+        return {key: convert(values[name]) for name, key, convert in converters if name in fields}
+
+    return encode
+
+
+def fast_jsonable_encoder(obj: Any) -> Any:
+    """jsonable_encoder, with the cached per-class encoder for pydantic models."""
+    if isinstance(obj, BaseModel):
+        return model_encoder(type(obj))(obj)
+    return jsonable_encoder(obj)
@@ -0,0 +1,173 @@
+"""
+Compiled validators for scalar path, query, header and cookie parameters
+
+For q: Optional[str] = Query(None, min_length=3, max_length=50) or item_id: int = Path(..., gt=0, le=1000) FastAPI
+validates every value of every request with the full Pydantic machinery: a ModelField with its list of validators
+(type conversion, length, regex, limits), each called in turn, wrapped for error reporting.
+
+compile_validator() looks at the parameters of a path operation once and writes a small Python function just for
+them, like compiled_serializers.py does for responses: one straight block of code per parameter that reads the
+value, converts it (int(v), float(v), ...) and checks the declared limits, with the regexes compiled once.
+
+It only accepts what is plainly valid. A missing required value, a conversion that fails, a limit that isn't met:
+the function gives up and FastAPI's own validation runs for the request instead, so the errors (and the 422) are
+exactly the ones FastAPI gives. Path operations with other parameters (a body, dependencies, lists, a Request, ...)
+or with constraints the function doesn't know are not compiled at all.
+
+Use it for all the routes of an app (before declaring them) with:
+
+    app.router.route_class = FastParamsRoute
+"""
+from copy import deepcopy
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import Request
+from fastapi.dependencies.models import Dependant
+from fastapi.dependencies.utils import is_coroutine_callable, request_params_to_args
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from pydantic.fields import SHAPE_SINGLETON, ModelField
+from pydantic.types import ConstrainedFloat, ConstrainedInt, ConstrainedStr
+
+REQUEST = "__fast_params_request"
+MAX_STR_INT = 4300  # pydantic.validators.max_str_int: longer strings are refused before int()
+BOOL_TRUE = {"1", "on", "t", "true", "y", "yes"}
+BOOL_FALSE = {"0", "off", "f", "false", "n", "no"}
+SOURCES = (("path_params", "path"), ("query_params", "query"), ("header_params", "headers"),
+           ("cookie_params", "cookies"))
+SOURCE_ATTRIBUTES = {"path": "path_params", "query": "query_params", "headers": "headers", "cookies": "cookies"}
+
+Validator = Callable[[Request], Optional[Dict[str, Any]]]
+
+
+def _checks(field: ModelField, namespace: Dict[str, Any], lines: List[str], indent: str) -> bool:
+    """The lines converting and checking v, a str, for the type of the field. False if it can't be compiled."""
+    type_ = field.type_
+    if type_ is bool:
+        lines.append(f"{indent}b = v.lower()")
+        lines.append(f"{indent}if b in BOOL_TRUE: v = True")
+        lines.append(f"{indent}elif b in BOOL_FALSE: v = False")
+        lines.append(f"{indent}else: return None")
+        return True
+    if not isinstance(type_, type):
+        return False
+    # only the types themselves and their constr(), conint(), ... versions: a subclass (an Enum of str, ...) is
+    # validated differently
+    if type_ is str or issubclass(type_, ConstrainedStr):
+        if type_ is not str and (getattr(type_, "strip_whitespace", False) or getattr(type_, "to_upper", False)
+                                 or getattr(type_, "to_lower", False) or getattr(type_, "strict", False)
+                                 or getattr(type_, "curtail_length", None) is not None):
+            return False
+        if getattr(type_, "min_length", None) is not None:
+            lines.append(f"{indent}if len(v) < {type_.min_length}: return None")
+        if getattr(type_, "max_length", None) is not None:
+            lines.append(f"{indent}if len(v) > {type_.max_length}: return None")
+        if getattr(type_, "regex", None) is not None:
+            name = f"regex_{field.name}"
+            namespace[name] = type_.regex
+            lines.append(f"{indent}if {name}.match(v) is None: return None")
+        return True
+    if type_ in (int, float) or issubclass(type_, (ConstrainedInt, ConstrainedFloat)):
+        if getattr(type_, "strict", False) or getattr(type_, "multiple_of", None) is not None \
+                or getattr(type_, "allow_inf_nan", None) is False:
+            return False
+        lines.append(f"{indent}try:")
+        if type_ is int or issubclass(type_, ConstrainedInt):
+            lines.append(f"{indent}    if len(v) > {MAX_STR_INT}: return None")
+            lines.append(f"{indent}    v = int(v)")
+        else:
+            lines.append(f"{indent}    v = float(v)")
+        lines.append(f"{indent}except ValueError:")
+        lines.append(f"{indent}    return None")
+        # written like pydantic's number_size_validator, so nan fails them the same way
+        for limit, operator in (("gt", ">"), ("ge", ">="), ("lt", "<"), ("le", "<=")):
+            value = getattr(type_, limit, None)
+            if value is not None:
+                lines.append(f"{indent}if not v {operator} {value!r}: return None")
+        return True
+    return False
+
+
+def compile_validator(dependant: Dependant) -> Optional[Validator]:
+    """
+    validate(request) -> the values of the parameters of the path operation, or
+    None when FastAPI's validation must decide. None instead of a function if the parameters can't be compiled.
+    """
+    if (dependant.dependencies or dependant.body_params or dependant.request_param_name
+            or dependant.websocket_param_name or dependant.http_connection_param_name
+            or dependant.response_param_name or dependant.background_tasks_param_name
+            or dependant.security_scopes_param_name):
+        return None
+    namespace: Dict[str, Any] = {"BOOL_TRUE": BOOL_TRUE, "BOOL_FALSE": BOOL_FALSE}
+    lines = ["def validate(request):", "    values = {}"]
+    for attribute, source in SOURCES:
+        fields = getattr(dependant, attribute)
+        if fields:  # only the parts of the request that are used: request.cookies parses the Cookie header, ...
+            lines.append(f"    {source} = request.{SOURCE_ATTRIBUTES[source]}")
+        for field in fields:
+            if field.shape != SHAPE_SINGLETON or field.class_validators or field.sub_fields:
+                return None
+            lines.append(f"    v = {source}.get({field.alias!r})")
+            lines.append("    if v is None:")
+            if field.required:
+                lines.append("        return None")
+            elif field.default is None or type(field.default) in (str, int, float, bool):
+                lines.append(f"        values[{field.name!r}] = {field.default!r}")
+            else:
+                name = f"default_{field.name}"
+                namespace[name] = field.default
+                namespace["deepcopy"] = deepcopy
+                lines.append(f"        values[{field.name!r}] = deepcopy({name})")
+            lines.append("    else:")
+            lines.append("        if v.__class__ is not str: return None")  # converted by the path's convertor
+            if not _checks(field, namespace, lines, "        "):
+                return None
+            lines.append(f"        values[{field.name!r}] = v")
+    lines.append("    return values")
+    exec("\n".join(lines), namespace)
+    return namespace["validate"]
+
+
+def validate_generic(dependant: Dependant, request: Request) -> Dict[str, Any]:
+    """FastAPI's own validation of the parameters, as solve_dependencies does it: the values, or the 422."""
+    values: Dict[str, Any] = {}
+    errors: list = []
+    for attribute, received in (("path_params", request.path_params), ("query_params", request.query_params),
+                                ("header_params", request.headers), ("cookie_params", request.cookies)):
+        source_values, source_errors = request_params_to_args(getattr(dependant, attribute), received)
+        values.update(source_values)
+        errors += source_errors
+    if errors:
+        raise RequestValidationError(errors, body=None)
+    return values
+
+
+class FastParamsRoute(APIRoute):
+    def get_route_handler(self) -> Callable:
+        validate = compile_validator(self.dependant)
+        if validate is None:
+            return super().get_route_handler()
+
+        dependant = self.dependant
+        call = dependant.call
+
+        def values_of(request: Request) -> Dict[str, Any]:
+            values = validate(request)
+            return validate_generic(dependant, request) if values is None else values
+
+        # the endpoint FastAPI calls only gets the request, the parameters are validated above instead of by FastAPI.
+        # Sync endpoints stay sync: FastAPI runs them (and validates their response) in the threadpool as before
+        if is_coroutine_callable(call):
+            async def fast_endpoint(**kwargs: Any) -> Any:
+                return await call(**values_of(kwargs[REQUEST]))
+        else:
+            def fast_endpoint(**kwargs: Any) -> Any:
+                return call(**values_of(kwargs[REQUEST]))
+
+        # the other route classes (CompiledSerializerRoute, ...) build their handler from self.dependant, the
+        # OpenAPI schema keeps using the original one
+        self.dependant = Dependant(call=fast_endpoint, request_param_name=REQUEST, path=dependant.path)
+        try:
+            return super().get_route_handler()
+        finally:
+            self.dependant = dependant
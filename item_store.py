@@ -0,0 +1,214 @@
+"""
+Versioned item stores
+
+A plain dict of items has two problems once several requests write to it:
+
+- two clients read the same item, both change it and both write it back: the second write silently drops the first
+  one ("lost update"),
+- with several uvicorn workers every process has its own dict, so they don't even see each other's writes.
+
+An ItemStore keeps a version number with every item, it goes up by one on every write. The version is sent to the
+client as the ETag header, and the client sends it back in If-Match when it writes: if the item changed in the
+meantime the versions don't match and the write is refused (VersionConflict, 412 Precondition Failed) instead of
+overwriting somebody else's change ("optimistic concurrency"). If-Match: * only lets the write through if the item
+exists.
+
+MemoryItemStore keeps the items in a dict with one lock per key being written (dropped when the last writer is
+done), so writes to different items never wait for each other. SQLiteItemStore keeps them in an SQLite file (in WAL
+mode), so all the workers of a deployment share them.
+Both methods are blocking, call them from normal def path operations (FastAPI runs those in the threadpool).
+"""
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+Versioned = Tuple[Dict[str, Any], int]
+
+ANY_VERSION = -2  # expected_version for If-Match: *, any version as long as the item exists
+
+
+class VersionConflict(Exception):
+    def __init__(self, key: str, expected: int, current: Optional[int]):
+        if current is None:
+            super().__init__(f"Item {key!r} doesn't exist")
+        else:
+            super().__init__(f"Item {key!r} is at version {current}, not {expected}")
+        self.key = key
+        self.expected = expected
+        self.current = current
+
+
+class ItemStore(ABC):
+    @abstractmethod
+    def get(self, key: str) -> Optional[Versioned]:
+        """The item and its version, None if there is no such item."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def put(self, key: str, data: Dict[str, Any], expected_version: Optional[int] = None) -> int:
+        """
+        Store data as the new value of the item and return its new version.
+        With expected_version the write only happens if the item is still at that version (VersionConflict if not),
+        with ANY_VERSION if it exists.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def update(self, key: str, changes: Dict[str, Any], expected_version: Optional[int] = None) -> Versioned:
+        """Merge changes into the stored item in one step (KeyError if there is no such item)."""
+        raise NotImplementedError
+
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """The version in an If-Match header (as sent back from our ETag), ANY_VERSION for "*", None if there is none."""
+    if if_match is None:
+        return None
+    if if_match.strip() == "*":
+        return ANY_VERSION
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        return -1  # never matches
+
+
+class MemoryItemStore(ItemStore):
+    def __init__(self, initial: Optional[Dict[str, Dict[str, Any]]] = None):
+        self._items: Dict[str, Versioned] = {key: (data, 1) for key, data in (initial or {}).items()}
+        self._locks: Dict[str, List[Any]] = {}  # key -> [lock, number of threads holding or waiting for it]
+        self._locks_lock = threading.Lock()
+
+    @contextmanager
+    def _lock(self, key: str) -> Iterator[None]:
+        with self._locks_lock:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_lock:
+                entry[1] -= 1
+                if not entry[1]:  # nobody else wants it: a key that is written once doesn't keep a lock forever
+                    del self._locks[key]
+
+    def get(self, key: str) -> Optional[Versioned]:
+        return self._items.get(key)
+
+    def _check(self, key: str, expected_version: Optional[int]) -> int:
+        current = self._items.get(key)
+        current_version = current[1] if current is not None else 0
+        if expected_version == ANY_VERSION:
+            if current is None:
+                raise VersionConflict(key, expected_version, None)
+        elif expected_version is not None and expected_version != current_version:
+            raise VersionConflict(key, expected_version, current_version if current is not None else None)
+        return current_version
+
+    def put(self, key: str, data: Dict[str, Any], expected_version: Optional[int] = None) -> int:
+        with self._lock(key):
+            version = self._check(key, expected_version) + 1
+            self._items[key] = (data, version)
+            return version
+
+    def update(self, key: str, changes: Dict[str, Any], expected_version: Optional[int] = None) -> Versioned:
+        with self._lock(key):
+            if key not in self._items:
+                raise KeyError(key)
+            version = self._check(key, expected_version) + 1
+            data = {**self._items[key][0], **changes}
+            self._items[key] = (data, version)
+            return data, version
+
+
+class SQLiteItemStore(ItemStore):
+    def __init__(self, path: str, initial: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.path = path
+        self._local = threading.local()  # sqlite3 connections can't be shared between threads
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS items (key TEXT PRIMARY KEY, data TEXT NOT NULL, version INTEGER NOT NULL)"
+        )
+        for key, data in (initial or {}).items():
+            connection.execute(
+                "INSERT OR IGNORE INTO items (key, data, version) VALUES (?, ?, 1)", (key, json.dumps(data))
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # isolation_level=None: no implicit transactions, we open them ourselves with BEGIN IMMEDIATE
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection()
+        # IMMEDIATE takes the write lock at the start, so the read-check-write below can't interleave with
+        # another writer (in this process or in another worker)
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def get(self, key: str) -> Optional[Versioned]:
+        row = self._row(self._connection(), key)
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def _row(self, connection: sqlite3.Connection, key: str) -> Optional[Tuple[str, int]]:
+        return connection.execute("SELECT data, version FROM items WHERE key = ?", (key,)).fetchone()
+
+    def _check(self, key: str, row: Optional[Tuple[str, int]], expected_version: Optional[int]) -> None:
+        if expected_version == ANY_VERSION:
+            if row is None:
+                raise VersionConflict(key, expected_version, None)
+        elif expected_version is not None and expected_version != (row[1] if row is not None else 0):
+            raise VersionConflict(key, expected_version, row[1] if row is not None else None)
+
+    def put(self, key: str, data: Dict[str, Any], expected_version: Optional[int] = None) -> int:
+        with self._transaction() as connection:
+            row = self._row(connection, key)
+            self._check(key, row, expected_version)
+            version = row[1] + 1 if row is not None else 1
+            connection.execute(
+                "INSERT OR REPLACE INTO items (key, data, version) VALUES (?, ?, ?)", (key, json.dumps(data), version)
+            )
+        return version
+
+    def update(self, key: str, changes: Dict[str, Any], expected_version: Optional[int] = None) -> Versioned:
+        with self._transaction() as connection:
+            row = self._row(connection, key)
+            if row is None:  # whatever the expected version, like in MemoryItemStore
+                raise KeyError(key)
+            self._check(key, row, expected_version)
+            data = {**json.loads(row[0]), **changes}
+            version = row[1] + 1
+            connection.execute(
+                "UPDATE items SET data = ?, version = ? WHERE key = ?", (json.dumps(data), version, key)
+            )
+        return data, version
+
+
+def item_store_from_url(url: str, initial: Optional[Dict[str, Dict[str, Any]]] = None) -> ItemStore:
+    """"memory" or "sqlite:///path/to/file.db", e.g. from an environment variable."""
+    if url == "memory":
+        return MemoryItemStore(initial)
+    if url.startswith("sqlite:///"):
+        return SQLiteItemStore(url[len("sqlite:///"):], initial)
+    raise ValueError(f"Unknown item store {url!r}")
@@ -0,0 +1,114 @@
+"""
+Fast JSON responses
+
+By default FastAPI renders every response with JSONResponse, that uses the standard library json module.
+For big list responses encoding becomes one of the biggest CPU costs of the request.
+
+orjson and msgspec are much faster JSON encoders (both written in C / Rust). The response classes below use them,
+and DefaultJSONResponse is the fastest one that is installed, falling back to the standard library when neither is.
+You can also choose it with the JSON_BACKEND environment variable ("orjson", "msgspec" or "json").
+
+Set it for the whole app when creating it:
+
+    app = FastAPI(default_response_class=DefaultJSONResponse)
+
+or for one path operation with response_class=... . It only changes how the final JSON is written, the response
+model validation and filtering stay the same.
+
+The output is the same as JSONResponse's, including its errors. What the fast encoders can't write (an int bigger
+than 64 bits, ...) is written by JSONResponse instead. They write NaN and infinite floats as null where JSONResponse
+refuses them (ValueError, a 500), so when a body has a null the floats of the content are checked for those: a walk
+through the dicts and lists that only looks at the floats, not a second encoding. For a list of 10k items with a None
+field it costs about as much as orjson takes to write them: together still well under half of what JSONResponse takes
+(python -m benchmarks.bench_json_responses).
+"""
+import json
+import os
+from typing import Any, Dict, Optional, Type
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+
+class StdlibJSONResponse(JSONResponse):
+    """The same output as JSONResponse, for when no faster encoder is installed."""
+
+
+def _has_non_finite(value: Any) -> bool:
+    """True if there is a NaN or an infinite float in the dicts, lists and tuples of value."""
+    for item in value.values() if type(value) is dict else value:
+        item_type = type(item)
+        if item_type is float:
+            if item - item != 0:  # nan - nan and inf - inf are nan
+                return True
+        elif item_type is dict or item_type is list or item_type is tuple:
+            if _has_non_finite(item):
+                return True
+    return False
+
+
+def _check_nulls(content: Any, body: bytes) -> bytes:
+    """The body, once it is sure its nulls are all None: NaN and infinities raise ValueError like JSONResponse."""
+    if b"null" in body:
+        if type(content) is float and content - content != 0 or \
+                type(content) in (dict, list, tuple) and _has_non_finite(content):
+            raise ValueError("Out of range float values are not JSON compliant")
+    return body
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            raise RuntimeError("orjson must be installed to use ORJSONResponse")
+        try:
+            body = orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:  # orjson.JSONEncodeError: a type or an int orjson can't write
+            return super().render(content)
+        return _check_nulls(content, body)
+
+
+class MsgspecJSONResponse(JSONResponse):
+    _encoder = msgspec.json.Encoder() if msgspec is not None else None
+
+    def render(self, content: Any) -> bytes:
+        if self._encoder is None:
+            raise RuntimeError("msgspec must be installed to use MsgspecJSONResponse")
+        try:
+            body = self._encoder.encode(content)
+        except (TypeError, OverflowError, msgspec.EncodeError):
+            return super().render(content)
+        return _check_nulls(content, body)
+
+
+JSON_RESPONSE_CLASSES: Dict[str, Type[JSONResponse]] = {
+    "orjson": ORJSONResponse,
+    "msgspec": MsgspecJSONResponse,
+    "json": StdlibJSONResponse,
+}
+
+
+def json_response_class(backend: Optional[str] = None) -> Type[JSONResponse]:
+    backend = backend or os.environ.get("JSON_BACKEND")
+    if backend is not None:
+        if backend not in JSON_RESPONSE_CLASSES:
+            raise ValueError(f"Unknown JSON backend {backend!r}, use one of {sorted(JSON_RESPONSE_CLASSES)}")
+        if {"orjson": orjson, "msgspec": msgspec}.get(backend, json) is None:
+            raise ImportError(f"JSON_BACKEND is {backend!r} but {backend} is not installed")
+        return JSON_RESPONSE_CLASSES[backend]
+    if orjson is not None:
+        return ORJSONResponse
+    if msgspec is not None:
+        return MsgspecJSONResponse
+    return StdlibJSONResponse
+
+
+DefaultJSONResponse = json_response_class()
@@ -0,0 +1,368 @@
+"""
+A persistent key-value store for the fake_db dicts
+
+The tutorial keeps its "database" in module level dicts (fake_db, fake_items_db, items, ...). That's fine for trying
+things out, but everything is lost on restart. KVStore behaves like such a dict (str keys, JSON compatible values)
+and keeps the data in a directory on disk:
+
+- data.log: an append-only log. Every write (and every delete) appends one record, nothing is ever changed in place,
+  so a crash can only cut off the last record. Every record has a CRC, a torn record at the end is dropped (with a
+  warning) when the store is opened again. A bad record followed by more records isn't something a crash does: the
+  file was damaged, and opening the store raises ValueError instead of throwing away everything after it.
+- data.hint: a snapshot of the index (for every key: where its value is in the log). Opening a store reads the index
+  from the hint and only replays the part of the log written after it, instead of reading the whole log again. The
+  hint is stored column by column (all the offsets, all the lengths, all the keys), so it is read with a few bulk
+  operations instead of a Python loop over the keys. Keys can't contain "\0", it separates them in the hint.
+
+The index itself is a dict in memory, the log is read through mmap, so a read is a dict lookup and a json.loads of
+a slice of the mapped file. (Only the log is mapped, not the index: a dict lookup is faster than any lookup in a
+mapped structure, and with the hint building the dict when the store opens takes a few bulk operations.) Overwritten and deleted values stay in the log until it is compacted: once more than
+half of a big enough log is garbage, the live records are copied into a new log (and a new hint is written), this
+can also be done by calling compact(). Writes are blocked while that happens.
+
+The values you read are new objects every time: changing a dict you got from the store doesn't change the store,
+assign it again (store[key] = value) to save it.
+
+Only one process can have a store open, a second one gets a RuntimeError: with several workers give each one its own
+directory, or use the SQLite item store from item_store.py to share the data. That includes a child process forked
+after the store was opened (the launcher's preloaded workers, see launcher.py): it inherits the open log and its
+lock, but its index is a copy that stops matching the log as soon as one of the processes writes, so using the
+store in the child raises a RuntimeError too (closing it only lets go of the child's copy of the file).
+
+open_store() is what the tutorial modules use: with the KV_STORE_DIR environment variable set it opens (or creates)
+a KVStore there, without it you get the plain dict as before.
+"""
+import atexit
+import json
+import logging
+from array import array
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, MutableMapping as MutableMappingType, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+KV_STORE_DIR = os.environ.get("KV_STORE_DIR")
+
+MAGIC = b"FKV1"
+FILE_HEADER = struct.Struct("<4sQ")  # magic, generation (changes with every compaction)
+RECORD_HEADER = struct.Struct("<IIi")  # crc32 of key + value, key length, value length (-1: the key was deleted)
+# magic, generation of the log, size of the log the hint covers, number of keys. Then the value offsets (array of
+# "Q"), the value lengths (array of "I"), both in the machine's byte order, and the keys joined with "\0".
+HINT_HEADER = struct.Struct("<4sQQQ")
+
+Location = Tuple[int, int]  # value offset in the log, value length
+
+
+def _record(key: bytes, value: Optional[bytes]) -> bytes:
+    if value is None:
+        return RECORD_HEADER.pack(zlib.crc32(key), len(key), -1) + key
+    return RECORD_HEADER.pack(zlib.crc32(value, zlib.crc32(key)), len(key), len(value)) + key + value
+
+
+class KVStore(MutableMapping):
+    def __init__(
+            self,
+            path: str,
+            initial: Optional[Dict[str, Any]] = None,
+            sync: bool = False,
+            compact_min_size: int = 4 * 1024 * 1024,
+            checkpoint_interval: int = 64 * 1024 * 1024,
+    ):
+        """
+        path: the directory of the store, created if needed. initial: the data of a new store (ignored when the
+        store already exists). sync: fsync after every write, so it survives a power cut too, not just a crash of
+        the process (much slower). compact_min_size: logs smaller than this are never compacted automatically.
+        checkpoint_interval: write a new hint after this many bytes were appended to the log.
+        """
+        self.path = path
+        self.sync = sync
+        self.compact_min_size = compact_min_size
+        self.checkpoint_interval = checkpoint_interval
+        self._lock = threading.Lock()
+        self._index: Dict[str, Location] = {}
+        os.makedirs(path, exist_ok=True)
+        self._log_path = os.path.join(path, "data.log")
+        self._hint_path = os.path.join(path, "data.hint")
+        new = not os.path.exists(self._log_path)
+        self._open()
+        if new and initial:
+            self.update(initial)
+
+    # opening and recovery
+
+    def _open(self) -> None:
+        self._pid = os.getpid()  # the lock is inherited by forked children, they are refused by _check_process()
+        self._fd = os.open(self._log_path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(self._fd)
+                raise RuntimeError(f"{self.path} is already open in another process")
+        self._map = None
+        try:
+            self._load()
+        except BaseException:
+            if self._map is not None:
+                self._map.close()
+            os.close(self._fd)  # and the lock with it
+            raise
+
+    def _load(self) -> None:
+        if os.fstat(self._fd).st_size < FILE_HEADER.size:
+            os.ftruncate(self._fd, 0)
+            os.pwrite(self._fd, FILE_HEADER.pack(MAGIC, 0), 0)
+        self._map = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+        magic, self._generation = FILE_HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{self._log_path} is not a KVStore log")
+        self._index = {}
+        self._dead = 0  # bytes of overwritten and deleted records, what compaction would free
+        start = self._load_hint()
+        self._size = self._replay(start)
+        if self._size < len(self._map):  # a record cut off by a crash
+            logger.warning("Dropping an incomplete record at the end of %s (%d bytes)", self._log_path,
+                           len(self._map) - self._size)
+            self._map.close()
+            os.ftruncate(self._fd, self._size)
+            self._map = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+        self._checkpointed = start  # what the hint covers, close() writes a new one if something was replayed
+
+    def _load_hint(self) -> int:
+        """Fills the index from the hint file, returns the position in the log where the replay has to start."""
+        try:
+            with open(self._hint_path, "rb") as hint_file:
+                hint = hint_file.read()
+        except FileNotFoundError:
+            return FILE_HEADER.size
+        if len(hint) < HINT_HEADER.size:
+            return FILE_HEADER.size
+        magic, generation, covered, count = HINT_HEADER.unpack_from(hint)
+        # a hint of an older generation describes a log that was compacted away
+        if magic != MAGIC or generation != self._generation or covered > len(self._map):
+            return FILE_HEADER.size
+        if count:
+            offsets, lengths = array("Q"), array("I")
+            position = HINT_HEADER.size
+            offsets.frombytes(hint[position:position + count * offsets.itemsize])
+            position += count * offsets.itemsize
+            lengths.frombytes(hint[position:position + count * lengths.itemsize])
+            keys = hint[position + count * lengths.itemsize:]
+            self._index = dict(zip(keys.decode().split("\0"), zip(offsets, lengths)))
+            # every live record: its header, its key (the keys minus the separators) and its value
+            live = count * RECORD_HEADER.size + len(keys) - (count - 1) + sum(lengths)
+            self._dead = covered - FILE_HEADER.size - live
+        return covered
+
+    def _replay(self, position: int) -> int:
+        """Applies the records from position to the end of the log, returns where the last complete record ends."""
+        data = self._map
+        end = len(data)
+        index = self._index
+        unpack_header = RECORD_HEADER.unpack_from
+        header_size = RECORD_HEADER.size
+        crc32 = zlib.crc32
+        dead = 0
+        while position + header_size <= end:
+            crc, key_length, value_length = unpack_header(data, position)
+            key_start = position + header_size
+            value_start = key_start + key_length
+            record_end = value_start + max(value_length, 0)
+            if record_end > end:
+                break
+            key = data[key_start:value_start]
+            if value_length < 0:
+                checksum = crc32(key)
+            else:
+                checksum = crc32(data[value_start:record_end], crc32(key))
+            if checksum != crc:
+                if record_end < end:  # more records follow: a damaged file, not a crash while appending
+                    raise ValueError(f"{self._log_path} is damaged: bad record at offset {position} of {end}")
+                break
+            key = key.decode()
+            old = index.get(key)
+            if old is not None:
+                dead += header_size + key_length + old[1]
+            if value_length < 0:
+                index.pop(key, None)
+                dead += record_end - position
+            else:
+                index[key] = (value_start, value_length)
+            position = record_end
+        self._dead += dead
+        return position
+
+    def _check_process(self) -> None:
+        if os.getpid() != self._pid:
+            raise RuntimeError(f"{self.path} was opened by process {self._pid}, a forked process can't use it: open "
+                               f"the store in the process that uses it")
+
+    # the dict interface
+
+    def __getitem__(self, key: str) -> Any:
+        self._check_process()
+        with self._lock:
+            offset, length = self._index[key]
+            value = self._mapped(offset + length)[offset:offset + length]
+        return json.loads(value)
+
+    def __contains__(self, key: object) -> bool:
+        self._check_process()
+        return key in self._index
+
+    def __len__(self) -> int:
+        self._check_process()
+        return len(self._index)
+
+    def __iter__(self) -> Iterator[str]:
+        self._check_process()
+        return iter(list(self._index))
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if not isinstance(key, str):
+            raise TypeError(f"KVStore keys must be str, not {type(key).__name__}")
+        if "\0" in key:
+            raise ValueError("KVStore keys can't contain \"\\0\"")
+        key_bytes = key.encode()
+        value_bytes = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+        record = _record(key_bytes, value_bytes)
+        self._check_process()
+        with self._lock:
+            position = self._append(record)
+            old = self._index.get(key)
+            if old is not None:
+                self._dead += RECORD_HEADER.size + len(key_bytes) + old[1]
+            self._index[key] = (position + RECORD_HEADER.size + len(key_bytes), len(value_bytes))
+            self._maintain()
+
+    def __delitem__(self, key: str) -> None:
+        self._check_process()
+        with self._lock:
+            old = self._index[key]
+            key_bytes = key.encode()
+            record = _record(key_bytes, None)
+            self._append(record)
+            del self._index[key]
+            self._dead += RECORD_HEADER.size + len(key_bytes) + old[1] + len(record)
+            self._maintain()
+
+    def __repr__(self) -> str:
+        return f"KVStore({self.path!r}, {len(self._index)} keys)"
+
+    # writing
+
+    def _append(self, record: bytes) -> int:
+        position = self._size
+        os.pwrite(self._fd, record, position)
+        if self.sync:
+            os.fsync(self._fd)
+        self._size = position + len(record)
+        return position
+
+    def _mapped(self, end: int) -> mmap.mmap:
+        # a map only covers the file as it was when it was made, map it again once the log grew past that
+        if end > len(self._map):
+            self._map = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _maintain(self) -> None:
+        if self._size >= self.compact_min_size and self._dead * 2 > self._size:
+            self._compact()
+        elif self._size - self._checkpointed >= self.checkpoint_interval:
+            self._checkpoint()
+
+    def _checkpoint(self) -> None:
+        index = self._index
+        parts = [
+            HINT_HEADER.pack(MAGIC, self._generation, self._size, len(index)),
+            array("Q", [offset for offset, _ in index.values()]).tobytes(),
+            array("I", [length for _, length in index.values()]).tobytes(),
+            "\0".join(index).encode(),
+        ]
+        temporary_path = self._hint_path + ".tmp"
+        with open(temporary_path, "wb") as hint_file:
+            hint_file.write(b"".join(parts))
+            hint_file.flush()
+            os.fsync(hint_file.fileno())
+        os.replace(temporary_path, self._hint_path)
+        self._checkpointed = self._size
+
+    def _compact(self) -> None:
+        generation = self._generation + 1
+        temporary_path = self._log_path + ".compact"
+        data = self._mapped(self._size)
+        index = {}
+        parts = [FILE_HEADER.pack(MAGIC, generation)]
+        position = FILE_HEADER.size
+        for key, (offset, length) in self._index.items():
+            # copy the whole record as it is: the header and the key come right before the value
+            key_length = len(key.encode())
+            start = offset - key_length - RECORD_HEADER.size
+            parts.append(data[start:offset + length])
+            index[key] = (position + RECORD_HEADER.size + key_length, length)
+            position += offset + length - start
+        with open(temporary_path, "wb") as log_file:
+            log_file.write(b"".join(parts))
+            log_file.flush()
+            os.fsync(log_file.fileno())
+        # the new log has a new generation, so a crash before the new hint is written just means a full replay
+        os.replace(temporary_path, self._log_path)
+        self._map.close()
+        os.close(self._fd)
+        self._fd = os.open(self._log_path, os.O_RDWR)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._map = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+        self._generation = generation
+        self._index = index
+        self._size = position
+        self._dead = 0
+        self._checkpoint()
+
+    def compact(self) -> None:
+        """Rewrite the log with only the current values."""
+        self._check_process()
+        with self._lock:
+            self._compact()
+
+    def checkpoint(self) -> None:
+        """Write the index to the hint file, so the next open only replays what is written after this."""
+        self._check_process()
+        with self._lock:
+            self._checkpoint()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd < 0:
+                return
+            # a forked child only closes its copy of the file (the lock stays with the parent's), it writes nothing
+            if self._size != self._checkpointed and os.getpid() == self._pid:
+                self._checkpoint()
+            self._map.close()
+            os.close(self._fd)  # also releases the flock
+            self._fd = -1
+
+    def __enter__(self) -> "KVStore":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def open_store(name: str, initial: Optional[Dict[str, Any]] = None) -> MutableMappingType[str, Any]:
+    """A KVStore in KV_STORE_DIR/name (closed when the process exits), or a dict when KV_STORE_DIR is not set."""
+    if not KV_STORE_DIR:
+        return dict(initial or {})
+    store = KVStore(os.path.join(KV_STORE_DIR, name), initial)
+    atexit.register(store.close)
+    return store
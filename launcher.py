@@ -0,0 +1,361 @@
+"""
+A multi-process launcher for the apps of the tutorial
+
+uvicorn.run(..., reload=True) in __main__.py is one process, with the reloader watching the files: fine on a laptop,
+but in production it uses one CPU core and restarts on every file change. The launcher runs a master process and
+several uvicorn workers:
+
+    python -m fast_api_tutorial 20UpdatesPUT:app --workers 4 --port 8000
+    python -m fast_api_tutorial fast_api_tutorial.30SQLRelationalDatabases.main:app  # a full module path works too
+    python -m fast_api_tutorial 20UpdatesPUT:app --reload  # development: the single process with the reloader
+    python -m fast_api_tutorial 33Metadata:app --write-openapi openapi.json  # build step, see openapi_cache.py
+
+- workers: one per CPU core available to the process by default (an async worker keeps its core busy on its own),
+- preload: the master imports the app once and then forks the workers, they share the memory of the imported modules
+  (copy-on-write) instead of each importing its own copy. gc.freeze() keeps the garbage collector from touching,
+  and so copying, those objects in every worker. --no-preload makes every worker import the app itself. Preloading
+  is turned off when KV_STORE_DIR or ITEM_STORE (other than memory) are set: the tutorial opens those stores when it
+  is imported, and a store opened before the fork would be shared by all the workers, which it doesn't support
+  (see kv_store.py), so every worker opens its own,
+- SO_REUSEPORT: every worker listens on its own socket bound to the same port, the kernel spreads the connections
+  between them (without it, where the platform doesn't have it, the workers share one socket opened by the master).
+  The master opens those sockets and keeps them: a worker's socket goes to the worker that replaces it, so the
+  connections waiting in its queue are never lost (a socket closed with connections waiting resets them),
+- rolling restart: on SIGHUP the workers are replaced one at a time, a new worker is started and only once it
+  accepts requests the old one is stopped gracefully (it stops accepting, gets a moment to read the requests of the
+  connections it just accepted, and finishes the requests in progress, at most --graceful-timeout seconds): the
+  port never stops answering. With --no-preload the new workers import the new
+  code; with preload they are forked from the master again (the code imported by the master stays the same),
+- a worker that dies is replaced, SIGTERM / SIGINT stop the workers gracefully, then the master. A worker that dies
+  less than MIN_UPTIME seconds after it was started (it can't import the app, it crashes on startup, ...) is
+  replaced after a delay that doubles with every such failure (up to BACKOFF_MAX seconds), and after
+  --max-failures of them in a row the master stops everything and exits with an error, instead of forking a
+  crashing worker ten times a second forever.
+"""
+import argparse
+import asyncio
+import gc
+import importlib
+import importlib.util
+import logging
+import os
+import select
+import signal
+import socket
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import uvicorn
+from uvicorn.config import LOG_LEVELS
+from uvicorn.importer import import_from_string
+
+logger = logging.getLogger(__name__)
+
+PACKAGE = "fast_api_tutorial"
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_APP = "20UpdatesPUT:app"
+MIN_UPTIME = 5.0  # seconds: a worker that dies sooner failed
+FAILURE_WINDOW = 60.0  # seconds: failures further apart than this don't count as in a row
+BACKOFF_START = 0.1
+BACKOFF_MAX = 30.0
+ACCEPTED_GRACE = 0.5  # seconds: a stopping worker waits this long for the request of a connection it just accepted
+
+
+def cpu_count() -> int:
+    if hasattr(os, "sched_getaffinity"):  # the cores this process may run on (containers, taskset, ...)
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def app_path(target: str) -> str:
+    """"20UpdatesPUT:app" is a module of the tutorial, "package.module:app" any importable module."""
+    first = target.partition(":")[0].split(".")[0]
+    if os.path.exists(os.path.join(ROOT, f"{first}.py")) or os.path.isdir(os.path.join(ROOT, first)):
+        return f"{PACKAGE}.{target}"
+    return target
+
+
+def register_package() -> None:
+    """Make the repository importable as fast_api_tutorial, whatever the name of its directory (see tests/)."""
+    if PACKAGE not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            PACKAGE, os.path.join(ROOT, "__init__.py"), submodule_search_locations=[ROOT]
+        )
+        package = importlib.util.module_from_spec(spec)
+        sys.modules[PACKAGE] = package
+        spec.loader.exec_module(package)
+
+
+def stores_opened_at_import() -> List[str]:
+    """The environment variables that make the tutorial open a store at import time (kv_store.py, item_store.py)."""
+    names = []
+    if os.environ.get("KV_STORE_DIR"):
+        names.append("KV_STORE_DIR")
+    if os.environ.get("ITEM_STORE", "memory") != "memory":
+        names.append("ITEM_STORE")
+    return names
+
+
+def listen(host: str, port: int, reuse_port: bool, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class ReadyServer(uvicorn.Server):
+    """A uvicorn server that tells the master, through a pipe, when it accepts requests."""
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets: Optional[List[socket.socket]] = None) -> None:
+        await super().startup(sockets=sockets)
+        if self.started:
+            os.write(self.ready_fd, b"1")
+            os.close(self.ready_fd)
+
+    async def shutdown(self, sockets: Optional[List[socket.socket]] = None) -> None:
+        # uvicorn closes the connections that haven't sent a request yet right away, a client that just connected
+        # would see its connection closed without a response: stop accepting first, then give them a moment
+        for server in self.servers:
+            server.close()
+        if self.server_state.connections:
+            await asyncio.sleep(ACCEPTED_GRACE)
+        await super().shutdown(sockets=sockets)
+
+
+class Master:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.app: Any = None
+        self.reuse_port = hasattr(socket, "SO_REUSEPORT") and not args.no_reuse_port
+        self.shared_socket: Optional[socket.socket] = None
+        self.workers: Dict[int, int] = {}  # pid: read end of its ready pipe
+        self.started: Dict[int, float] = {}  # pid: when it was forked
+        self.sockets: Dict[int, socket.socket] = {}  # pid: the socket it listens on, kept for its replacement
+        self.respawn_at: List[Tuple[float, socket.socket]] = []  # when to replace the workers that died, their socket
+        self.failures = 0  # workers that died early, in a row
+        self.last_failure = 0.0
+        self.stopping = False
+        self.restart_requested = False
+
+    def run(self) -> int:
+        """Run the workers until the master is stopped, returns the exit code."""
+        stores = stores_opened_at_import()
+        if "KV_STORE_DIR" in stores and self.args.workers > 1:
+            logger.error("KV_STORE_DIR is set: a KVStore can only be open in one process (see kv_store.py), run one "
+                         "worker (--workers 1)")
+            return 2
+        if not self.args.no_preload and stores:
+            logger.warning("%s set: not preloading, every worker opens its own stores", " and ".join(stores))
+            self.args.no_preload = True
+        if not self.args.no_preload:
+            self.app = import_from_string(self.args.app)
+            gc.collect()
+            gc.freeze()  # the imported objects: not scanned again, so their pages aren't copied by the workers
+        if not self.reuse_port:  # else spawn() opens a socket for every worker, the first fails if the port is taken
+            self.shared_socket = listen(self.args.host, self.args.port, reuse_port=False)
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        signal.signal(signal.SIGHUP, self.handle_restart)
+        logger.info("master %d: %d workers of %s on http://%s:%d (%s, %s)", os.getpid(), self.args.workers,
+                    self.args.app, self.args.host, self.args.port,
+                    "SO_REUSEPORT" if self.reuse_port else "shared socket",
+                    "no preload" if self.args.no_preload else "preloaded")
+        for _ in range(self.args.workers):
+            self.spawn()
+        code = 0
+        while not self.stopping:
+            if self.restart_requested:
+                self.restart_requested = False
+                self.rolling_restart()
+            self.reap(replace=True)
+            if self.failures >= self.args.max_failures:
+                logger.error("%d workers in a row died on startup, stopping", self.failures)
+                code = 1
+                break
+            now = time.monotonic()
+            for respawn in [respawn for respawn in self.respawn_at if respawn[0] <= now]:
+                self.respawn_at.remove(respawn)
+                self.spawn(respawn[1])
+            time.sleep(0.1)
+        self.stop_all()
+        return code
+
+    def handle_stop(self, signum: int, frame: Any) -> None:
+        self.stopping = True
+
+    def handle_restart(self, signum: int, frame: Any) -> None:
+        self.restart_requested = True
+
+    def spawn(self, sock: Optional[socket.socket] = None) -> int:
+        """Start a worker listening on sock, a new socket if it doesn't replace a worker."""
+        if sock is None:
+            sock = self.shared_socket or listen(self.args.host, self.args.port, reuse_port=True)
+        ready_read, ready_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # the worker
+            os.close(ready_read)
+            for fd in self.workers.values():  # the ready pipes of the other workers
+                os.close(fd)
+            for other in {*self.sockets.values(), *(respawn[1] for respawn in self.respawn_at)} - {sock}:
+                other.close()
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(signum, signal.SIG_DFL)
+            code = 0
+            try:
+                self.serve(sock, ready_write)
+            except BaseException:  # noqa: the traceback is printed, the master replaces the worker
+                import traceback
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(ready_write)
+        self.workers[pid] = ready_read
+        self.started[pid] = time.monotonic()
+        self.sockets[pid] = sock
+        return pid
+
+    def serve(self, sock: socket.socket, ready_fd: int) -> None:
+        app = self.app if self.app is not None else self.args.app
+        config = uvicorn.Config(app, host=self.args.host, port=self.args.port, lifespan="on",
+                                log_level=self.args.log_level,
+                                timeout_graceful_shutdown=self.args.graceful_timeout)
+        ReadyServer(config, ready_fd).run(sockets=[sock])
+
+    def wait_ready(self, pid: int, timeout: float) -> bool:
+        fd = self.workers[pid]
+        readable, _, _ = select.select([fd], [], [], timeout)
+        return bool(readable) and os.read(fd, 1) == b"1"
+
+    def reap(self, replace: bool) -> None:
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            fd = self.workers.pop(pid, None)
+            if fd is None:
+                continue
+            os.close(fd)
+            sock = self.sockets.pop(pid)
+            now = time.monotonic()
+            uptime = now - self.started.pop(pid)
+            if replace and not self.stopping:
+                delay = 0.0
+                if uptime < MIN_UPTIME:
+                    if now - self.last_failure > FAILURE_WINDOW:
+                        self.failures = 0
+                    self.failures += 1
+                    self.last_failure = now
+                    delay = min(BACKOFF_START * 2 ** (self.failures - 1), BACKOFF_MAX)
+                    if self.failures >= self.args.max_failures:  # run() stops the master
+                        logger.error("worker %d exited (%d) after %.1fs", pid, os.waitstatus_to_exitcode(status),
+                                     uptime)
+                        continue
+                logger.warning("worker %d exited (%d) after %.1fs, replacing it in %.1fs", pid,
+                               os.waitstatus_to_exitcode(status), uptime, delay)
+                self.respawn_at.append((now + delay, sock))
+
+    def stop(self, pid: int) -> None:
+        """Stop one worker gracefully, killed if it takes longer than the graceful timeout (and a margin)."""
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        try:
+            while time.monotonic() < deadline:
+                finished, _ = os.waitpid(pid, os.WNOHANG)
+                if finished:
+                    break
+                time.sleep(0.05)
+            else:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+        except ChildProcessError:  # already gone
+            pass
+        os.close(self.workers.pop(pid))
+        self.started.pop(pid, None)
+        self.sockets.pop(pid, None)
+
+    def rolling_restart(self) -> None:
+        logger.info("rolling restart")
+        for old in list(self.workers):
+            new = self.spawn(self.sockets[old])
+            if not self.wait_ready(new, timeout=self.args.startup_timeout):
+                logger.error("new worker %d didn't start, keeping worker %d", new, old)
+                self.stop(new)
+                return
+            self.stop(old)
+
+    def stop_all(self) -> None:
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in list(self.workers):
+            self.stop(pid)
+        for sock in {*self.sockets.values(), *(respawn[1] for respawn in self.respawn_at)}:
+            sock.close()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog=f"python -m {PACKAGE}", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("app", nargs="?", default=DEFAULT_APP,
+                        help=f"module:attribute of the app (default {DEFAULT_APP}), in the tutorial or importable")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=cpu_count(), help="default: the number of CPU cores")
+    parser.add_argument("--no-preload", action="store_true", help="every worker imports the app itself")
+    parser.add_argument("--no-reuse-port", action="store_true", help="share one socket instead of SO_REUSEPORT")
+    parser.add_argument("--graceful-timeout", type=int, default=30,
+                        help="seconds a stopping worker gets to finish its requests")
+    parser.add_argument("--startup-timeout", type=float, default=60,
+                        help="seconds a new worker gets to start during a rolling restart")
+    parser.add_argument("--max-failures", type=int, default=10,
+                        help="stop when this many workers in a row die on startup")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--reload", action="store_true", help="development: one process, restarted on changes")
+    parser.add_argument("--write-openapi", metavar="PATH",
+                        help="write the OpenAPI document of the app (and its compressed variants) to PATH and exit")
+    return parser.parse_args(argv)
+
+
+def configure_logging(log_level: str) -> None:
+    """The master's messages, at the --log-level the workers' uvicorn logging uses too."""
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("[launcher] %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(LOG_LEVELS.get(log_level.lower(), logging.INFO))
+    logger.propagate = False
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    configure_logging(args.log_level)
+    register_package()
+    args.app = app_path(args.app)
+    if args.write_openapi:
+        openapi_cache = importlib.import_module(f"{PACKAGE}.openapi_cache")
+        openapi_cache.OpenAPIDocument(import_from_string(args.app)).write(args.write_openapi)
+        logger.info("wrote %s for %s", args.write_openapi, args.app)
+        return
+    if args.reload:
+        uvicorn.run(args.app, host=args.host, port=args.port, reload=True, reload_dirs=[ROOT])
+        return
+    code = Master(args).run()
+    if code:
+        sys.exit(code)
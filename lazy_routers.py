@@ -0,0 +1,228 @@
+"""
+Lazy routers
+
+31BiggerApplications/main.py imports every router module when the app is imported: with hundreds of routers (and
+the models, the database code, ... they import) a new worker spends seconds importing before it can answer a
+request, and starting workers quickly is what autoscaling needs.
+
+LazyRouters includes routers by module path instead. Their module is only imported on the first request to one of
+their paths, or in the background right after startup (warmup), while the worker already serves requests:
+
+    lazy_routers = LazyRouters(app, package=__package__, manifest="lazy_routers.json")
+    lazy_routers.include(".routers.items")  # the `router` of the module, or ".routers.items:other_router"
+    lazy_routers.include(".internal.admin", prefix="/admin", tags=["admin"])  # what app.include_router() takes
+
+To know the paths of a router (and its part of the OpenAPI schema, for /docs) without importing it, LazyRouters
+keeps a manifest: a JSON file with the paths and the OpenAPI operations of every router, captured from the real
+routes. A router that isn't in the manifest yet, or whose module changed since (its size or modification time), is
+imported right away like with app.include_router(), and the manifest is written again when the app starts. So the
+first start after a change is as slow as before, the next ones are fast. Delete the file to capture everything again
+(a change in a module the router imports, not in the router's own module, isn't noticed). A manifest that can't be
+read (missing, cut off, not JSON) is treated like an empty one.
+
+Several workers can start at the same time (see launcher.py): the manifest is written to a temporary file that
+then replaces it, so a worker never reads a half-written one, and it is only written when its content changed. If
+it can't be written (a read-only deployment), the app still starts, with the slower start every time.
+
+Until a router is imported, its paths are served by placeholder routes: the first request to one imports the router,
+puts its routes where the placeholders were (so the order of the routes stays the same) and is then handled by them.
+If the import fails, that request fails with the error (a 500) and the next one tries again, the warmup logs it and
+goes on with the other routers.
+"""
+import asyncio
+import importlib
+import importlib.util
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from starlette.routing import Route
+from starlette.types import Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+class LazyRouter:
+    """A router included by module path: imported on the first request to one of its paths, or by the warmup."""
+
+    def __init__(self, registry: "LazyRouters", key: str, module: str, attribute: str, kwargs: Dict[str, Any]):
+        self.registry = registry
+        self.key = key
+        self.module = module
+        self.attribute = attribute
+        self.kwargs = kwargs
+        self.loaded = False
+        self.routes: List[Any] = []  # its routes in the app, once loaded
+        self._loading: Optional[asyncio.Future] = None
+
+    def fingerprint(self) -> Optional[list]:
+        spec = importlib.util.find_spec(self.module, self.registry.package)
+        if spec is None or spec.origin is None or not os.path.exists(spec.origin):
+            return None
+        stat = os.stat(spec.origin)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def import_router(self) -> Any:
+        return getattr(importlib.import_module(self.module, self.registry.package), self.attribute)
+
+    def install(self, router: Any) -> None:
+        """Include the router in the app, in place of its placeholders."""
+        app_router = self.registry.app.router
+        before = len(app_router.routes)
+        self.registry.app.include_router(router, **self.kwargs)
+        self.routes = app_router.routes[before:]
+        routes = app_router.routes[:before]
+        placeholders = [index for index, route in enumerate(routes) if getattr(route, "endpoint", None) is self]
+        position = placeholders[0] if placeholders else len(routes)
+        routes = [route for route in routes if getattr(route, "endpoint", None) is not self]
+        # a new list (not changed in place): CompiledAPIRouter builds its table again for it
+        app_router.routes = routes[:position] + self.routes + routes[position:]
+        self.loaded = True
+
+    def load_now(self) -> None:
+        if not self.loaded:
+            self.install(self.import_router())
+
+    async def load(self) -> None:
+        if self.loaded:
+            return
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(self._load())
+        await self._loading
+
+    async def _load(self) -> None:
+        try:
+            router = await run_in_threadpool(self.import_router)  # the event loop keeps serving the other requests
+        except BaseException:
+            self._loading = None  # the requests waiting for it get the error, the next one tries again
+            raise
+        if not self.loaded:
+            self.install(router)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # a request to one of the paths of the router, while it isn't imported yet
+        await self.load()
+        await scope["router"](scope, receive, send)  # the real routes are in place now
+
+
+class LazyRouters:
+    def __init__(self, app: FastAPI, package: Optional[str] = None, manifest: Optional[str] = None,
+                 warmup: bool = True) -> None:
+        self.app = app
+        self.package = package
+        self.manifest_path = manifest
+        self.warmup = warmup
+        self.manifest: Dict[str, Any] = self.read_manifest()
+        self.routers: List[LazyRouter] = []
+        self.stale = False  # a router was missing from the manifest or changed: write it again on startup
+        self._warmup_task: Optional[asyncio.Future] = None
+        app.openapi = self.openapi
+        app.add_event_handler("startup", self.startup)
+
+    def include(self, spec: str, **kwargs: Any) -> LazyRouter:
+        """Include the router at "module:attribute" (the attribute defaults to router) with app.include_router's
+        keyword arguments."""
+        module, _, attribute = spec.partition(":")
+        key = f"{spec} {kwargs.get('prefix', '')}"
+        router = LazyRouter(self, key, module, attribute or "router", kwargs)
+        self.routers.append(router)
+        entry = self.manifest["routers"].get(key)
+        if entry is None or entry["fingerprint"] != router.fingerprint():
+            router.load_now()
+            self.stale = True
+            return router
+        for path in entry["paths"]:
+            # an ASGI app as the endpoint: every method matches, the real routes answer 405 if needed
+            self.app.router.routes.append(Route(path, endpoint=router, include_in_schema=False))
+        return router
+
+    async def startup(self) -> None:
+        if self.stale and self.manifest_path is not None:
+            self.write_manifest()
+        elif self.warmup:
+            self._warmup_task = asyncio.ensure_future(self.load_all())
+
+    async def load_all(self) -> None:
+        for router in self.routers:
+            try:
+                await router.load()
+            except Exception:  # the warmup goes on, the router's requests try again (and fail with the error)
+                logger.exception("Can't import the lazy router %s", router.module)
+
+    def read_manifest(self) -> Dict[str, Any]:
+        empty: Dict[str, Any] = {"routers": {}, "components": {}}
+        if self.manifest_path is None:
+            return empty
+        try:
+            with open(self.manifest_path) as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            return empty
+        except (OSError, ValueError) as error:
+            logger.warning("Ignoring the lazy routers manifest %s: %s", self.manifest_path, error)
+            return empty
+        if not isinstance(manifest, dict) or not isinstance(manifest.get("routers"), dict):
+            return empty
+        manifest.setdefault("components", {})
+        return manifest
+
+    def write_manifest(self) -> None:
+        """Import all the routers and write their paths and OpenAPI operations to the manifest."""
+        for router in self.routers:
+            router.load_now()
+        self.app.openapi_schema = None
+        schema = self.app.openapi()
+        self.app.openapi_schema = None
+        routers = {}
+        for router in self.routers:
+            paths: List[str] = []
+            operations: Dict[str, Dict[str, Any]] = {}
+            for route in router.routes:
+                if route.path not in paths:
+                    paths.append(route.path)
+                if isinstance(route, APIRoute) and route.include_in_schema:
+                    for method in route.methods:
+                        operation = schema["paths"].get(route.path_format, {}).get(method.lower())
+                        if operation is not None:
+                            operations.setdefault(route.path_format, {})[method.lower()] = operation
+            routers[router.key] = {"fingerprint": router.fingerprint(), "paths": paths, "operations": operations}
+        self.manifest = {"routers": routers, "components": schema.get("components", {})}
+        self.stale = False
+        content = json.dumps(self.manifest)
+        try:
+            with open(self.manifest_path) as file:
+                if file.read() == content:  # another worker wrote the same thing already
+                    return
+        except (OSError, ValueError):
+            pass
+        temporary_path = f"{self.manifest_path}.{os.getpid()}.tmp"  # one per worker, they may write together
+        try:
+            with open(temporary_path, "w") as file:
+                file.write(content)
+            os.replace(temporary_path, self.manifest_path)
+        except OSError as error:
+            logger.warning("Can't write the lazy routers manifest %s: %s", self.manifest_path, error)
+            try:
+                os.unlink(temporary_path)
+            except OSError:
+                pass
+
+    def openapi(self) -> Dict[str, Any]:
+        """The OpenAPI schema of the app, with the operations of the routers not imported yet from the manifest."""
+        if self.app.openapi_schema:
+            return self.app.openapi_schema
+        schema = FastAPI.openapi(self.app)
+        pending = [router for router in self.routers if not router.loaded]
+        if pending:
+            paths = schema.setdefault("paths", {})
+            for router in pending:
+                for path, operations in self.manifest["routers"][router.key]["operations"].items():
+                    paths.setdefault(path, {}).update(operations)
+            for section, components in self.manifest["components"].items():
+                for name, component in components.items():
+                    schema.setdefault("components", {}).setdefault(section, {}).setdefault(name, component)
+        return schema
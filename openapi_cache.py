@@ -0,0 +1,120 @@
+"""
+A prebuilt, precompressed OpenAPI document
+
+FastAPI builds the OpenAPI schema of the app on the first request to /openapi.json (what /docs and /redoc load): for
+an app with hundreds of routes that is seconds on a request, in every worker. Then every request still serializes
+the whole schema to JSON again, and sends it uncompressed (or CompressionMiddleware compresses it every time).
+
+serve_cached_openapi(app) replaces the /openapi.json route of the app with an OpenAPIDocument:
+
+- the schema is built once, when the app starts (or on the first request if it is used without the startup events),
+  serialized once, and compressed once with zstd, brotli and gzip (the ones installed, see compression.py),
+- a request gets the bytes in the best encoding its Accept-Encoding allows, with an ETag: the browser revalidates
+  with If-None-Match and gets a 304 while the schema is the same,
+- with a file (serve_cached_openapi(app, "openapi.json")), the document is read from it, and from openapi.json.zst,
+  .br and .gz next to it, instead of being built: they are written at build time, with the launcher:
+
+    python -m fast_api_tutorial 33Metadata:app --write-openapi openapi.json
+
+  Write them again when the API changes: the file is served as it is.
+"""
+import json
+import os
+from typing import Dict, Optional
+
+from fastapi import FastAPI
+from starlette.responses import Response
+from starlette.routing import Route
+from starlette.types import Receive, Scope, Send
+
+from .compression import COMPRESSORS, accepted_encodings
+from .conditional_requests import body_etag, not_modified
+
+EXTENSIONS = {"zstd": ".zst", "br": ".br", "gzip": ".gz"}
+# on startup: good ratios without making the start noticeably slower. Written ahead of time: the best ones
+STARTUP_LEVELS = {"zstd": 10, "br": 9, "gzip": 9}
+BUILD_LEVELS = {"zstd": 19, "br": 11, "gzip": 9}
+
+
+class OpenAPIDocument:
+    def __init__(self, app: FastAPI, path: Optional[str] = None):
+        self.app = app
+        self.path = path
+        self.body: Optional[bytes] = None
+        self.variants: Dict[str, bytes] = {}  # encoding: compressed body
+        self.etag = ""
+
+    def render(self) -> bytes:
+        # what FastAPI's JSONResponse sends for app.openapi()
+        return json.dumps(self.app.openapi(), ensure_ascii=False, allow_nan=False, indent=None,
+                          separators=(",", ":")).encode("utf-8")
+
+    def compress(self, levels: Dict[str, int]) -> None:
+        for encoding in EXTENSIONS:
+            if encoding in COMPRESSORS and encoding not in self.variants:
+                self.variants[encoding] = COMPRESSORS[encoding](levels[encoding]).compress(self.body, final=True)
+
+    def build(self) -> None:
+        """Read the document from the file, or build it from the app."""
+        if self.path is not None and os.path.exists(self.path):
+            with open(self.path, "rb") as file:
+                self.body = file.read()
+            for encoding, extension in EXTENSIONS.items():
+                if encoding in COMPRESSORS and os.path.exists(self.path + extension):
+                    with open(self.path + extension, "rb") as file:
+                        self.variants[encoding] = file.read()
+        else:
+            self.body = self.render()
+        self.compress(STARTUP_LEVELS)
+        self.etag = body_etag(self.body)
+
+    def write(self, path: str) -> None:
+        """Build the document from the app and write it, with its compressed variants, for build()."""
+        self.body = self.render()
+        self.variants = {}
+        self.compress(BUILD_LEVELS)
+        self.etag = body_etag(self.body)
+        files = {path: self.body, **{path + EXTENSIONS[encoding]: data for encoding, data in self.variants.items()}}
+        for name, data in files.items():
+            with open(name + ".tmp", "wb") as file:
+                file.write(data)
+            os.replace(name + ".tmp", name)
+
+    async def startup(self) -> None:
+        if self.body is None:
+            self.build()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.body is None:
+            self.build()
+        headers = {"cache-control": "no-cache", "vary": "Accept-Encoding"}
+        request_headers = dict(scope["headers"])
+        accepted = accepted_encodings(request_headers.get(b"accept-encoding", b"").decode("latin-1"), self.variants)
+        encoding = next((encoding for encoding in EXTENSIONS if encoding in self.variants and encoding in accepted),
+                        None)
+        if encoding is None:
+            body, headers["etag"] = self.body, self.etag
+        else:
+            # other bytes than the ones the ETag was computed from: weak, like CompressionMiddleware does
+            body, headers["etag"], headers["content-encoding"] = self.variants[encoding], f"W/{self.etag}", encoding
+        if not_modified(request_headers.get(b"if-none-match", b"").decode("latin-1"), self.etag):
+            response = Response(status_code=304, headers={"etag": headers["etag"], "cache-control": "no-cache",
+                                                           "vary": "Accept-Encoding"})
+        else:
+            response = Response(body, media_type="application/json", headers=headers)
+        await response(scope, receive, send)
+
+
+def serve_cached_openapi(app: FastAPI, path: Optional[str] = None) -> OpenAPIDocument:
+    """Serve app.openapi_url from an OpenAPIDocument built on startup (or read from `path`)."""
+    routes = app.router.routes
+    index = next((index for index, route in enumerate(routes) if getattr(route, "path", None) == app.openapi_url),
+                 None)
+    if app.openapi_url is None or index is None:
+        raise ValueError("The app doesn't serve an OpenAPI document (openapi_url=None), there is nothing to cache")
+    document = OpenAPIDocument(app, path)
+    route = Route(app.openapi_url, endpoint=document, methods=["GET"], include_in_schema=False)
+    app.router.routes = routes[:index] + [route] + routes[index + 1:]  # a new list, see compiled_router.py
+    app.add_event_handler("startup", document.startup)
+    return document
+
@@ -0,0 +1,90 @@
+"""
+Limits on the query parameters and the headers of a request
+
+q: List[str] = Query(...) takes every q= of the query string, x_token: List[str] = Header(None) every X-Token header,
+with no bound: a request with 100k q= parameters makes Starlette split and decode 100k pairs into a list, then
+FastAPI validates a list of 100k strings, and the endpoint gets it. One such request costs a worker a lot of CPU
+time and memory, the cost grows with the size of the request, and the client decides the size.
+
+ParameterLimitsMiddleware checks a request before anything parses it (routing, the Request object, the validation of
+the parameters) and refuses the ones over the limits:
+
+- the size of the query string (max_query_size bytes), 414 URI Too Long, then the number of its parameters
+  (max_query_params), 400 Bad Request (the URI isn't too long, it has too many parameters), counted by scanning the
+  raw bytes for "&" and stopping as soon as the limit is passed: no list of pairs is built, and an oversized query
+  string isn't scanned at all. Like Starlette's parsing, empty pairs ("a=1&&b=2") don't count,
+- the number of headers (max_headers), then their total size (max_header_size bytes, names and values).
+  431 Request Header Fields Too Large.
+
+So whatever a request sends, its cost is bounded by the limits before the app does any work for it. The defaults
+come from the environment, like MAX_UPLOAD_SIZE in 15RequestFiles.py:
+
+    app.add_middleware(ParameterLimitsMiddleware)  # MAX_QUERY_PARAMS, MAX_QUERY_SIZE, MAX_HEADERS, MAX_HEADER_SIZE
+    app.add_middleware(ParameterLimitsMiddleware, max_query_params=100)
+
+(the server limits the request line and headers too, uvicorn's h11 to 16 KiB in total, httptools not at all.)
+"""
+import os
+from typing import Iterable, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+MAX_QUERY_PARAMS = int(os.environ.get("MAX_QUERY_PARAMS", 1000))
+MAX_QUERY_SIZE = int(os.environ.get("MAX_QUERY_SIZE", 64 * 1024))  # bytes
+MAX_HEADERS = int(os.environ.get("MAX_HEADERS", 100))
+MAX_HEADER_SIZE = int(os.environ.get("MAX_HEADER_SIZE", 64 * 1024))  # bytes, all the headers
+
+
+def count_query_params(query_string: bytes, limit: int) -> int:
+    """The number of non-empty parameters of the query string, counting at most up to limit + 1."""
+    count = 0
+    start = 0
+    end = len(query_string)
+    while start < end and count <= limit:
+        separator = query_string.find(b"&", start)
+        if separator == -1:
+            separator = end
+        if separator > start:
+            count += 1
+        start = separator + 1
+    return count
+
+
+def header_size(headers: Iterable[Tuple[bytes, bytes]]) -> int:
+    return sum(len(name) + len(value) for name, value in headers)
+
+
+class ParameterLimitsMiddleware:
+    def __init__(self, app: ASGIApp, max_query_params: Optional[int] = None, max_query_size: Optional[int] = None,
+                 max_headers: Optional[int] = None, max_header_size: Optional[int] = None) -> None:
+        self.app = app
+        self.max_query_params = MAX_QUERY_PARAMS if max_query_params is None else max_query_params
+        self.max_query_size = MAX_QUERY_SIZE if max_query_size is None else max_query_size
+        self.max_headers = MAX_HEADERS if max_headers is None else max_headers
+        self.max_header_size = MAX_HEADER_SIZE if max_header_size is None else max_header_size
+
+    def check(self, scope: Scope) -> Optional[JSONResponse]:
+        """The error response for a request over the limits, None for the others. The cheap checks first."""
+        headers = scope["headers"]
+        if len(headers) > self.max_headers:
+            return JSONResponse({"detail": f"More than {self.max_headers} headers"}, status_code=431)
+        if header_size(headers) > self.max_header_size:
+            return JSONResponse({"detail": f"Headers larger than {self.max_header_size} bytes"}, status_code=431)
+        query_string = scope.get("query_string", b"")
+        if len(query_string) > self.max_query_size:
+            return JSONResponse({"detail": f"Query string larger than {self.max_query_size} bytes"}, status_code=414)
+        if count_query_params(query_string, self.max_query_params) > self.max_query_params:
+            return JSONResponse({"detail": f"More than {self.max_query_params} query parameters"}, status_code=400)
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket"):
+            response = self.check(scope)
+            if response is not None:
+                if scope["type"] == "websocket":  # no HTTP response before the handshake: closed instead
+                    await send({"type": "websocket.close", "code": 1009})
+                    return
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
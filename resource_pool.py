@@ -0,0 +1,224 @@
+"""
+A pool of resources for dependencies with yield
+
+get_db in 25DepWithYield.py creates a DBSession for every request and closes it after the response: every request
+pays for setting up a connection (TCP, TLS, authentication, ...) before doing anything useful. ResourcePool keeps the
+resources open and hands them out again:
+
+    db_pool = ResourcePool(DBSession, close=lambda db: db.close(), min_size=2, max_size=10)
+
+    async def get_db():
+        async with db_pool.resource() as db:
+            yield db
+
+- min_size resources are created ahead of time (start(), on the startup of the app, or the first acquire), and the
+  pool grows up to max_size when the requests need more. A request that finds them all in use waits for one to be
+  released, at most acquire_timeout seconds, then PoolTimeout is raised,
+- `check(resource)` (optional) is called before handing out an idle resource, one that fails it (returns False or
+  raises) is closed and replaced: a connection the database dropped doesn't reach a request,
+- a resource older than max_lifetime seconds is closed instead of going back to the pool, and replaced, as is one
+  used by a request that raised an error (a transaction left open, a connection in the middle of a reply, ...),
+- create, close and check can be plain or async functions. Plain ones run in the threadpool, a slow constructor
+  doesn't block the event loop,
+- stats() gives the size of the pool, the resources in use, the requests waiting, and how long the acquires waited
+  (the mean and the maximum): when the wait grows, max_size is too small.
+
+The pool belongs to one event loop, the one of the app.
+"""
+import asyncio
+import collections
+import inspect
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+
+class PoolTimeout(Exception):
+    """No resource was released within the acquire timeout."""
+
+
+async def _call(function: Callable[..., Any], *args: Any) -> Any:
+    if inspect.iscoroutinefunction(function):
+        return await function(*args)
+    return await run_in_threadpool(function, *args)
+
+
+class ResourcePool:
+    def __init__(
+            self,
+            create: Callable[[], Any],
+            close: Optional[Callable[[Any], Any]] = None,
+            check: Optional[Callable[[Any], Any]] = None,
+            min_size: int = 1,
+            max_size: int = 10,
+            max_lifetime: Optional[float] = None,
+            acquire_timeout: float = 5.0,
+            clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError("0 <= min_size <= max_size and max_size >= 1")
+        self.create = create
+        self.close_resource = close
+        self.check = check
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.acquire_timeout = acquire_timeout
+        self.clock = clock
+        self._idle: Deque[Tuple[Any, float]] = collections.deque()  # (resource, created at), last released last
+        self._created: Dict[int, float] = {}  # id of the resources in use: created at
+        self._size = 0  # idle + in use + being created
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+        self._starting: Optional[asyncio.Future] = None
+        self._closed = False
+        self.acquired = self.timeouts = self.created = self.discarded = 0
+        self.wait_total = self.wait_max = 0.0
+
+    async def start(self) -> None:
+        """Create the min_size resources ahead of time (concurrently). Raises the error of create, if any."""
+        if self._starting is None:
+            self._starting = asyncio.ensure_future(self._fill())
+        errors = await self._starting
+        if errors:
+            raise errors[0]
+
+    async def _fill(self) -> list:
+        """Create resources up to min_size, returns the errors of the ones that couldn't be created."""
+        missing = self.min_size - self._size
+        if missing <= 0:
+            return []
+        self._size += missing
+        results = await asyncio.gather(*(self._create() for _ in range(missing)), return_exceptions=True)
+        errors = []
+        for result in results:
+            if isinstance(result, BaseException):
+                self._size -= 1
+                errors.append(result)
+            else:
+                self._idle.append(result)
+            self._wake()
+        return errors
+
+    async def _create(self) -> Tuple[Any, float]:
+        resource = await _call(self.create)
+        self.created += 1
+        return resource, self.clock()
+
+    async def _discard(self, resource: Any) -> None:
+        self._size -= 1
+        self.discarded += 1
+        try:
+            if self.close_resource is not None:
+                await _call(self.close_resource, resource)
+        finally:
+            self._wake()  # there is room for a new one
+
+    def _expired(self, created_at: float) -> bool:
+        return self.max_lifetime is not None and self.clock() - created_at >= self.max_lifetime
+
+    async def _healthy(self, resource: Any) -> bool:
+        if self.check is None:
+            return True
+        try:
+            return await _call(self.check, resource) is not False
+        except Exception:
+            return False
+
+    def _wake(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    async def acquire(self) -> Any:
+        if self._closed:
+            raise RuntimeError("The pool is closed")
+        if self._starting is None:
+            await self.start()
+        elif not self._starting.done():  # another request started the pool, its resources are on the way
+            await self._starting
+        started = time.perf_counter()
+        deadline = started + self.acquire_timeout
+        while True:
+            while self._idle:
+                resource, created_at = self._idle.pop()  # the most recently used one, the likeliest to be alive
+                if self._expired(created_at) or not await self._healthy(resource):
+                    await self._discard(resource)
+                    continue
+                return self._hand_out(resource, created_at, started)
+            if self._size < self.max_size:
+                self._size += 1
+                try:
+                    resource, created_at = await self._create()
+                except BaseException:
+                    self._size -= 1
+                    self._wake()
+                    raise
+                return self._hand_out(resource, created_at, started)
+            remaining = deadline - time.perf_counter()
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, max(remaining, 0))
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise PoolTimeout(f"No resource released within {self.acquire_timeout} s "
+                                  f"({self._size} in the pool, all in use)") from None
+            except BaseException:
+                if waiter.done() and not waiter.cancelled():  # woken up but cancelled: wake someone else
+                    self._wake()
+                raise
+
+    def _hand_out(self, resource: Any, created_at: float, started: float) -> Any:
+        waited = time.perf_counter() - started
+        self.acquired += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        self._created[id(resource)] = created_at
+        return resource
+
+    async def release(self, resource: Any, discard: bool = False) -> None:
+        """Give a resource back. discard=True closes it instead (it is broken, ...)."""
+        created_at = self._created.pop(id(resource))
+        if discard or self._closed or self._expired(created_at):
+            await self._discard(resource)
+            if not self._closed and self._size < self.min_size:
+                await self._fill()  # if that fails, the next acquire tries again
+            return
+        self._idle.append((resource, created_at))
+        self._wake()
+
+    @asynccontextmanager
+    async def resource(self) -> AsyncIterator[Any]:
+        """Acquire a resource for the block, discarded if the block raises (it may be left half way through)."""
+        resource = await self.acquire()
+        try:
+            yield resource
+        except BaseException:
+            await self.release(resource, discard=True)
+            raise
+        await self.release(resource)
+
+    async def close(self) -> None:
+        """Close the idle resources, the ones in use are closed when they are released."""
+        self._closed = True
+        while self._idle:
+            resource, _ = self._idle.pop()
+            await self._discard(resource)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self._size,
+            "idle": len(self._idle),
+            "in_use": len(self._created),
+            "waiting": sum(not waiter.done() for waiter in self._waiters),
+            "acquired": self.acquired,
+            "created": self.created,
+            "discarded": self.discarded,
+            "timeouts": self.timeouts,
+            "wait_mean_ms": self.wait_total / self.acquired * 1000 if self.acquired else 0.0,
+            "wait_max_ms": self.wait_max * 1000,
+        }
@@ -0,0 +1,55 @@
+import importlib
+import itertools
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+compiled_router = importlib.import_module("fast_api_tutorial.compiled_router")
+
+PATHS = [
+    "/", "/items", "/items/", "/items/5", "/items/five", "/items/5/", "/items/5/tags", "/items/special",
+    "/users/me", "/users/rick", "/files/a/b/c.txt", "/files/", "/reports/2023.csv", "/reports/2023.json",
+    "/static/app.js", "/nothing", "/items/5/tags/x", "/v1/items/5",
+]
+
+
+def make_app(compiled: bool) -> FastAPI:
+    app = FastAPI()
+    if compiled:
+        compiled_router.use_compiled_router(app)
+    router = APIRouter(prefix="/items")
+
+    def endpoint(name):
+        return lambda: name
+
+    # the order matters: /items/special is shadowed by /items/{item_id} for GET, not for POST
+    router.add_api_route("/", endpoint("items"))
+    router.add_api_route("/{item_id:int}", endpoint("item by id"))
+    router.add_api_route("/{item_id}", endpoint("item by name"), methods=["POST"])
+    router.add_api_route("/special", endpoint("special"))
+    router.add_api_route("/{item_id}/tags", endpoint("tags"))
+    app.include_router(router)
+    app.include_router(router, prefix="/v1")
+    app.add_api_route("/users/me", endpoint("me"))
+    app.add_api_route("/users/{username}", endpoint("user"))
+    app.add_api_route("/files/{file_path:path}", endpoint("file"))
+    app.add_api_route("/reports/{year}.csv", endpoint("csv report"))
+    app.mount("/static", PlainTextResponse("static"))
+    return app
+
+
+def test_picks_the_route_starlette_picks():
+    clients = [TestClient(make_app(compiled)) for compiled in (False, True)]
+    for path, method in itertools.product(PATHS, ("GET", "POST")):
+        expected, got = (client.request(method, path, follow_redirects=False) for client in clients)
+        assert (got.status_code, got.headers.get("location"), got.content) == \
+               (expected.status_code, expected.headers.get("location"), expected.content), (method, path)
+
+
+def test_table_follows_new_routes():
+    app = make_app(compiled=True)
+    client = TestClient(app)
+    assert client.get("/late").status_code == 404
+    app.add_api_route("/late", lambda: "late")
+    assert client.get("/late").json() == "late"
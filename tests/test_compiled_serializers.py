@@ -0,0 +1,78 @@
+import importlib
+import itertools
+from typing import List, Optional
+
+import pytest
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+compiled_serializers = importlib.import_module("fast_api_tutorial.compiled_serializers")
+
+
+class Image(BaseModel):
+    url: str
+    name: str = "image"
+
+
+class Item(BaseModel):
+    name: str
+    description: Optional[str] = None
+    price: float
+    tax: float = 10.5
+    tags: List[str] = []
+    image: Optional[Image] = None
+
+
+VALUES = [
+    {"name": "Foo", "price": 50.2},
+    {"name": "Bar", "description": "The bartenders", "price": 62, "tax": 20.2, "tags": ["a"]},
+    {"name": "Baz", "price": 50.2, "tax": 10.5, "tags": [], "image": {"url": "http://x"}},
+    {"name": "Baz", "price": 50.2, "tax": None},  # invalid, even where tax isn't sent
+    {"name": "Baz", "price": "cheap"},  # invalid
+    {"name": "Baz", "price": "50.2"},  # coerced
+    {"price": 1},  # the required name is missing
+    {"name": "Qux", "price": 1, "image": {"name": "no url"}},  # invalid nested model
+    Item(name="Model", price=3, tags=["x"]),
+]
+
+FLAGS = [
+    dict(response_model_include=include, response_model_exclude=exclude, response_model_exclude_unset=unset,
+         response_model_exclude_none=none)
+    for include, exclude, unset, none in itertools.product(
+        [None, {"name", "price"}], [None, {"tax"}, {"tags", "image"}], [False, True], [False, True])
+]
+
+
+def make_app(route_class, flags) -> FastAPI:
+    app = FastAPI()
+    app.router.route_class = route_class
+
+    @app.get("/{index}", response_model=Item, **flags)
+    def read(index: int):
+        value = VALUES[index]
+        return value.copy() if isinstance(value, dict) else value
+
+    @app.get("/list/", response_model=List[Item], **flags)
+    def read_list():
+        return [value for value in VALUES[:3]]
+
+    return app
+
+
+@pytest.mark.parametrize("flags", FLAGS)
+def test_same_responses_as_fastapi(flags):
+    compiled_app = make_app(compiled_serializers.CompiledSerializerRoute, flags)
+    compiled = TestClient(compiled_app, raise_server_exceptions=False)
+    generic = TestClient(make_app(APIRoute, flags), raise_server_exceptions=False)
+    for path in [f"/{index}" for index in range(len(VALUES))] + ["/list/"]:
+        expected, got = generic.get(path), compiled.get(path)
+        assert (got.status_code, got.content) == (expected.status_code, expected.content), path
+
+
+def test_mutable_defaults_are_not_shared():
+    encode = compiled_serializers.compile_serializer(make_app(APIRoute, {}).routes[-2].secure_cloned_response_field)
+    first, second = encode({"name": "a", "price": 1}), encode({"name": "b", "price": 2})
+    first["tags"].append("changed")
+    assert second["tags"] == [] and Item.__fields__["tags"].default == []
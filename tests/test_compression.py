@@ -0,0 +1,179 @@
+import asyncio
+import gzip
+import importlib
+import zlib
+
+import brotli
+import pytest
+import zstandard
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+
+compression = importlib.import_module("fast_api_tutorial.compression")
+
+BIG = [{"id": n, "email": f"user{n}@example.com", "is_active": True} for n in range(100)]
+CHUNK = b'{"id": 1, "email": "user1@example.com"}\n' * 20
+
+app = FastAPI()
+app.add_middleware(compression.CompressionMiddleware, minimum_size=500)
+
+
+@app.get("/big")
+def big():
+    return BIG
+
+
+@app.get("/small")
+def small():
+    return {"id": 1}
+
+
+@app.get("/stream")
+def stream():
+    return StreamingResponse(iter([CHUNK] * 3), media_type="application/x-ndjson")
+
+
+@app.get("/off")
+@compression.compression(enabled=False)
+def off():
+    return BIG
+
+
+@app.get("/tagged")
+def tagged(response: Response):
+    response.headers["etag"] = '"v1"'
+    response.headers["vary"] = "Cookie"
+    return BIG
+
+
+@app.get("/part")
+def part():
+    return Response(b"x" * 2000, status_code=206, media_type="text/plain",
+                    headers={"content-range": "bytes 0-1999/10000"})
+
+
+@app.get("/range")
+def whole_range():
+    return Response(b"x" * 2000, media_type="text/plain", headers={"content-range": "bytes 0-1999/2000"})
+
+
+async def zero_copy_app(scope, receive, send):
+    """Sends its body with the zerocopysend extension (the file descriptor of a file, sent by the server)."""
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"text/plain"), (b"content-length", b"2000")]})
+    await send({"type": "http.response.zerocopysend", "file": 3})
+
+
+@app.get("/image")
+def image():
+    return Response(b"\x89PNG" + b"\x00" * 2000, media_type="image/png")
+
+
+def get(path: str, accept_encoding: str = None):
+    """GET path straight through the ASGI app: the status, the headers and the body messages, as sent."""
+    headers = [] if accept_encoding is None else [(b"accept-encoding", accept_encoding.encode())]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"", "headers": headers,
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+    sent = []
+    messages = iter([{"type": "http.request", "body": b"", "more_body": False}])
+
+    async def receive():
+        message = next(messages, None)
+        if message is None:  # the client stays connected
+            await asyncio.Event().wait()
+        return message
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start, bodies = sent[0], [message.get("body", b"") for message in sent[1:]]
+    response_headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    return start["status"], response_headers, bodies
+
+
+DECOMPRESS = {
+    "gzip": gzip.decompress,
+    "br": brotli.decompress,
+    "zstd": lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data),
+}
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip", "gzip"),
+    ("br, gzip", "br"),
+    ("gzip, br, zstd", "zstd"),
+    ("*", "zstd"),
+    ("zstd;q=0, *", "br"),
+    ("gzip;q=0, br;q=0, *", "zstd"),
+    ("zstd;q=0, br;q=0.0, *", "gzip"),
+    ("zstd;q=0, br;q=0, gzip;q=0, *", None),
+    ("*;q=0", None),
+    ("identity", None),
+    (None, None),
+])
+def test_encoding_choice(accept_encoding, expected):
+    status, headers, bodies = get("/big", accept_encoding)
+    assert status == 200
+    assert headers.get("content-encoding") == expected
+    body = b"".join(bodies)
+    if expected is not None:
+        body = DECOMPRESS[expected](body)
+        assert headers["content-length"] == str(len(b"".join(bodies)))
+    assert body == get("/big")[2][0]
+
+
+def test_accepted_encodings():
+    assert compression.accepted_encodings("gzip;q=0, *", ["zstd", "br", "gzip"]) == {"*", "zstd", "br"}
+    assert compression.accepted_encodings("GZIP;q=0.5, br;q=bad") == {"gzip"}
+    assert compression.accepted_encodings("*") == {"*"}
+
+
+def test_small_responses_are_not_compressed():
+    _, headers, bodies = get("/small", "gzip")
+    assert "content-encoding" not in headers
+    assert bodies == [b'{"id":1}']
+
+
+def test_streaming_chunks_are_flushed():
+    _, headers, bodies = get("/stream", "gzip")
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    # every chunk can be decompressed as soon as it arrives
+    received = [decompressor.decompress(body) for body in bodies]
+    assert received[:3] == [CHUNK] * 3
+    assert b"".join(received) == CHUNK * 3
+    assert decompressor.eof
+
+
+def test_opt_out_and_other_types():
+    for path in ("/off", "/image", "/part", "/range"):
+        _, headers, _ = get(path, "gzip")
+        assert "content-encoding" not in headers, path
+
+
+def test_vary_and_weak_etag():
+    _, headers, _ = get("/big", "gzip")
+    assert headers["vary"] == "Accept-Encoding"
+    _, headers, _ = get("/tagged", "gzip")
+    assert headers["vary"] == "Cookie, Accept-Encoding"
+    assert headers["etag"] == 'W/"v1"'
+    _, headers, _ = get("/tagged")
+    assert headers["etag"] == '"v1"'
+
+
+def test_other_body_messages_follow_the_start():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", b"gzip")]}
+    middleware = compression.CompressionMiddleware(zero_copy_app, minimum_size=500)
+    asyncio.run(middleware(scope, None, send))
+    assert [message["type"] for message in sent] == ["http.response.start", "http.response.zerocopysend"]
+    assert (b"content-encoding", b"gzip") not in sent[0]["headers"]
@@ -0,0 +1,76 @@
+import importlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+response_model = importlib.import_module("fast_api_tutorial.11ResponseModel")
+updates = importlib.import_module("fast_api_tutorial.20UpdatesPUT")
+main_b = importlib.import_module("fast_api_tutorial.30SQLRelationalDatabases.34TestingBigExample.main_b")
+item_store = importlib.import_module("fast_api_tutorial.item_store")
+
+
+def poll(client, path, times, **kwargs):
+    """GET path `times` times like a polling client: sends back the last ETag, returns the bytes and the statuses."""
+    received, statuses, etag = 0, [], None
+    for _ in range(times):
+        headers = dict(kwargs.get("headers", {}))
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        response = client.get(path, headers=headers)
+        statuses.append(response.status_code)
+        etag = response.headers["etag"]
+        received += len(response.content)
+    return received, statuses
+
+
+def test_repeat_fetch_is_not_modified():
+    client = TestClient(response_model.app)
+    first = client.get("/items/bar")
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "max-age=60"
+    again = client.get("/items/bar", headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == first.headers["etag"]
+    assert again.headers["cache-control"] == "max-age=60"
+    assert client.get("/items/bar", headers={"If-None-Match": '"something else"'}).status_code == 200
+    assert client.get("/items/foo").headers["etag"] != first.headers["etag"]
+
+
+def test_private_item_needs_the_token_first():
+    client = TestClient(main_b.app)
+    token = {"X-Token": "coneofsilence"}
+    first = client.get("/items/foo", headers=token)
+    assert first.headers["cache-control"] == "private, no-cache"
+    etag = first.headers["etag"]
+    assert client.get("/items/foo", headers={**token, "If-None-Match": etag}).status_code == 304
+    assert client.get("/items/foo", headers={"X-Token": "hailhydra", "If-None-Match": etag}).status_code == 400
+
+
+def test_versioned_item_changes_etag_on_update():
+    client = TestClient(updates.app)
+    first = client.get("/items/baz")
+    assert client.get("/items/baz", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+    client.patch("/items/baz", json={"description": "changed"})
+    changed = client.get("/items/baz", headers={"If-None-Match": first.headers["etag"]})
+    assert changed.status_code == 200
+    assert changed.json()["description"] == "changed"
+
+
+@pytest.fixture
+def big_item(monkeypatch):
+    """A store with one big item instead of the app's, put back after the test."""
+    big = {"name": "Big", "price": 1.0, "tags": [f"tag-{n}" for n in range(5000)]}
+    monkeypatch.setattr(updates, "item_store", item_store.MemoryItemStore({"big": big}))
+    return "/items/big"
+
+
+def test_polling_saves_bandwidth(big_item):
+    client = TestClient(updates.app)
+    polls = 20
+    plain_bytes = sum(len(client.get(big_item).content) for _ in range(polls))
+    conditional_bytes, statuses = poll(client, big_item, polls)
+
+    # only the first poll transfers the item
+    assert statuses == [200] + [304] * (polls - 1)
+    assert conditional_bytes == plain_bytes / polls
@@ -0,0 +1,84 @@
+import importlib
+
+from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi.testclient import TestClient
+
+dependency_cache = importlib.import_module("fast_api_tutorial.dependency_cache")
+
+
+class Clock:
+    now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_app(maxsize=1024):
+    clock = Clock()
+    cache = dependency_cache.DependencyCache(maxsize=maxsize, clock=clock)
+    checks = []
+
+    @cache.cached(ttl=60, key=lambda x_token: x_token)
+    async def get_principal(x_token: str = Header(...)):
+        checks.append(x_token)
+        if x_token == "bad":
+            raise HTTPException(status_code=401, detail="Invalid token")
+        return {"user": x_token}
+
+    app = FastAPI()
+
+    @app.get("/me")
+    def read_me(principal: dict = Depends(get_principal)):
+        return principal
+
+    return TestClient(app), cache, get_principal, clock, checks
+
+
+def test_values_are_shared_across_requests_until_the_ttl():
+    client, cache, get_principal, clock, checks = make_app()
+    for _ in range(3):
+        assert client.get("/me", headers={"X-Token": "rick"}).json() == {"user": "rick"}
+    assert checks == ["rick"]
+    clock.now = 61
+    client.get("/me", headers={"X-Token": "rick"})
+    assert checks == ["rick", "rick"]
+    assert cache.stats()[f"{__name__}.make_app.<locals>.get_principal"] == {
+        "size": 1, "hits": 2, "misses": 2, "expired": 1, "evicted": 0, "hit_rate": 0.5
+    }
+
+
+def test_errors_are_not_cached_and_values_can_be_invalidated():
+    client, cache, get_principal, clock, checks = make_app(maxsize=2)
+    assert client.get("/me", headers={"X-Token": "bad"}).status_code == 401
+    assert client.get("/me", headers={"X-Token": "bad"}).status_code == 401
+    assert checks == ["bad", "bad"]
+    for token in ("rick", "morty", "rick", "summer"):  # morty is the least recently used one
+        client.get("/me", headers={"X-Token": token})
+    assert cache.stats()[f"{__name__}.make_app.<locals>.get_principal"]["evicted"] == 1
+    cache.invalidate(get_principal, "rick")
+    client.get("/me", headers={"X-Token": "summer"})
+    client.get("/me", headers={"X-Token": "rick"})
+    assert checks[2:] == ["rick", "morty", "summer", "rick"]
+
+
+def test_dependencies_with_the_same_name_have_their_own_stats():
+    cache = dependency_cache.DependencyCache()
+
+    class Users:
+        @staticmethod
+        @cache.cached(ttl=60)
+        def get(user_id: int):
+            return {"user": user_id}
+
+    class Items:
+        @staticmethod
+        @cache.cached(ttl=60)
+        def get(item_id: int):
+            return {"item": item_id}
+
+    Users.get(user_id=1)
+    Users.get(user_id=1)
+    Items.get(item_id=1)
+    scope = f"{__name__}.test_dependencies_with_the_same_name_have_their_own_stats.<locals>"
+    stats = cache.stats()
+    assert (stats[f"{scope}.Users.get"]["hits"], stats[f"{scope}.Items.get"]["hits"]) == (1, 0)
@@ -0,0 +1,98 @@
+import importlib
+
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+dependency_plans = importlib.import_module("fast_api_tutorial.dependency_plans")
+global_dependencies = importlib.import_module("fast_api_tutorial.24GlobalDependencies")
+
+TOKEN = "fake-super-secret-token"
+KEY = "fake-super-secret-key"
+
+
+def test_global_dependencies_are_awaited_together():
+    route = next(route for route in global_dependencies.app.routes if getattr(route, "path", None) == "/items/")
+    plan = dependency_plans.compile_plan(route.dependant)
+    run, = plan.runs
+    assert [step.name for step in run] == ["verify_token", "verify_key"]
+
+
+def test_error_precedence_is_the_sequential_one():
+    client = TestClient(global_dependencies.app)
+    assert client.get("/items/", headers={"X-Token": TOKEN, "X-Key": KEY}).status_code == 200
+    # both fail: the first declared wins
+    response = client.get("/users/", headers={"X-Token": "wrong", "X-Key": "wrong"})
+    assert (response.status_code, response.json()["detail"]) == (400, "X-Token header invalid")
+    # verify_token fails before the missing X-Key is noticed, as with FastAPI's resolution
+    response = client.get("/users/", headers={"X-Token": "wrong"})
+    assert (response.status_code, response.json()["detail"]) == (400, "X-Token header invalid")
+    response = client.get("/users/", headers={"X-Token": TOKEN})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["header", "x-key"]
+    response = client.get("/users/", headers={"X-Token": TOKEN, "X-Key": "wrong"})
+    assert (response.status_code, response.json()["detail"]) == (400, "X-Key header invalid")
+
+
+def make_ordering_app(route_class, calls: list) -> FastAPI:
+    """Dependencies with side effects, an authorization failure and yield clean ups, recording what runs when."""
+    app = FastAPI()
+    app.router.route_class = route_class
+
+    async def get_user(user: str = "guest"):
+        calls.append("get_user")
+        return user
+
+    async def require_admin(user: str = Depends(get_user)):
+        calls.append("require_admin")
+        if user != "admin":
+            raise HTTPException(status_code=403)
+
+    async def charge_quota():
+        calls.append("charge_quota")
+
+    async def session():
+        calls.append("session")
+        yield
+        calls.append("session closed")
+
+    async def transaction(_=Depends(session)):
+        calls.append("transaction")
+        yield
+        calls.append("transaction closed")
+
+    @dependency_plans.independent
+    async def audit():  # the same name as the other audit: timed separately
+        calls.append("audit 1")
+
+    def second_audit():
+        @dependency_plans.independent
+        async def audit():
+            calls.append("audit 2")
+        return audit
+
+    @app.get("/", dependencies=[Depends(require_admin), Depends(charge_quota), Depends(transaction), Depends(audit),
+                                Depends(second_audit())])
+    async def endpoint():
+        calls.append("endpoint")
+
+    return app
+
+
+@pytest.mark.parametrize("user", ["guest", "admin"])
+def test_dependencies_run_in_fastapi_order(user):
+    stock_calls, planned_calls = [], []
+    stock = TestClient(make_ordering_app(APIRoute, stock_calls)).get("/", params={"user": user})
+    planned_app = make_ordering_app(dependency_plans.PlannedRoute, planned_calls)
+    planned = TestClient(planned_app).get("/", params={"user": user})
+    assert planned.status_code == stock.status_code == (403 if user == "guest" else 200)
+    # the two audits are gathered, in any order
+    assert sorted(planned_calls) == sorted(stock_calls)
+    assert [call for call in planned_calls if "audit" not in call] == [call for call in stock_calls
+                                                                        if "audit" not in call]
+    if user == "admin":
+        route = next(route for route in planned_app.routes if getattr(route, "path", None) == "/")
+        last_run = dependency_plans.compile_plan(route.dependant).runs[-1]
+        assert [step.name for step in last_run] == ["audit", "audit"]
+        assert len(route.timings) == 7
@@ -0,0 +1,34 @@
+import importlib
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+discriminated_unions = importlib.import_module("fast_api_tutorial.discriminated_unions")
+extra_models = importlib.import_module("fast_api_tutorial.12ExtraModels")
+
+
+def root_field(route: APIRoute):
+    """The __root__ field of the copy of Item FastAPI validates the responses with."""
+    return route.secure_cloned_response_field.type_.__fields__["__root__"]
+
+
+def test_car_with_a_size_is_a_car(monkeypatch):
+    monkeypatch.setitem(extra_models.items, "item3", {"description": "A car on a plane", "type": "car", "size": 5})
+    client = TestClient(extra_models.app)
+    assert client.get("/items/item3").json() == {"description": "A car on a plane", "type": "car"}
+    assert client.get("/items/item2").json() == {
+        "description": "Music is my aeroplane, it's my aeroplane", "type": "plane", "size": 5,
+    }
+
+
+def test_cloned_response_field_keeps_the_discriminator():
+    route = next(route for route in extra_models.app.routes if getattr(route, "path", None) == "/items/{item_id}")
+    assert isinstance(route, discriminated_unions.DiscriminatedUnionRoute)
+    field = root_field(route)
+    assert field.discriminator_key == "type"
+    assert set(field.sub_fields_mapping) == {"car", "plane"}
+
+    app = FastAPI()  # without DiscriminatedUnionRoute, FastAPI's copy has lost it
+    app.get("/items/{item_id}", response_model=extra_models.Item)(extra_models.read_item)
+    assert root_field(app.routes[-1]).discriminator_key is None
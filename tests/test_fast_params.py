@@ -0,0 +1,52 @@
+import importlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+fast_params = importlib.import_module("fast_api_tutorial.fast_params")
+path_params = importlib.import_module("fast_api_tutorial.3path_param")
+query_params = importlib.import_module("fast_api_tutorial.2query_params")
+
+
+def generic_copy(app: FastAPI) -> FastAPI:
+    """The same routes with FastAPI's own parameter validation."""
+    generic = FastAPI()
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            generic.add_api_route(route.path, route.endpoint, methods=list(route.methods))
+    return generic
+
+
+generic_path_app = generic_copy(path_params.app)
+generic_query_app = generic_copy(query_params.app)
+
+
+def test_tutorial_routes_are_compiled():
+    for route in [*path_params.app.routes, *query_params.app.routes]:
+        if isinstance(route, APIRoute) and route.path != "/list-items/":  # lists keep FastAPI's validation
+            assert fast_params.compile_validator(route.dependant) is not None, route.path
+
+
+@pytest.mark.parametrize("url", [
+    "/items/5?item-query=foo", "/items/5", "/items/five", "/items/%20",
+    "/number-validation-items/5?q=x&size=3.5", "/number-validation-items/0?q=x&size=3.5",
+    "/number-validation-items/1000?q=x&size=10.5", "/number-validation-items/7?q=x&size=nan",
+    "/number-validation-items/7?size=1", "/number-validation-items/7?q=x&size=1e1", f"/items/{'9' * 5000}",
+])
+def test_same_responses_as_fastapi(url):
+    fast, generic = TestClient(path_params.app).get(url), TestClient(generic_path_app).get(url)
+    assert (fast.status_code, fast.json()) == (generic.status_code, generic.json())
+
+
+@pytest.mark.parametrize("url", [
+    "/items/", "/items/?q=ab", "/items/?q=abc", f"/items/?q={'x' * 51}",
+    "/alias-items/?item-query=foo", "/alias-items/?q=foo", "/alias-items/?item-query=",
+    "/deprecated-items/", "/deprecated-items/?item-query=fixedquery", "/deprecated-items/?item-query=fixedquery2",
+    "/deprecated-items/?item-query=other", "/deprecated-items/?item-query=fq", "/deprecated-items/?q=fixedquery",
+    "/more-mt-list-items/?q=ab", "/more-mt-list-items/?q=abcd",
+])
+def test_same_query_responses_as_fastapi(url):
+    fast, generic = TestClient(query_params.app).get(url), TestClient(generic_query_app).get(url)
+    assert (fast.status_code, fast.json()) == (generic.status_code, generic.json())
@@ -0,0 +1,128 @@
+import importlib
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+item_store = importlib.import_module("fast_api_tutorial.item_store")
+updates = importlib.import_module("fast_api_tutorial.20UpdatesPUT")
+
+FOO = {"name": "Foo", "price": 50.2}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return item_store.MemoryItemStore({"foo": FOO})
+    return item_store.SQLiteItemStore(str(tmp_path / "items.db"), {"foo": FOO})
+
+
+def test_versions(store):
+    assert store.get("foo") == (FOO, 1)
+    assert store.get("missing") is None
+    assert store.put("foo", {"name": "Foo 2"}) == 2
+    assert store.put("new", {"name": "New"}, expected_version=0) == 1  # 0: only if it doesn't exist yet
+    assert store.get("new") == ({"name": "New"}, 1)
+
+
+def test_version_conflicts(store):
+    with pytest.raises(item_store.VersionConflict) as conflict:
+        store.put("foo", {"name": "Stale"}, expected_version=3)
+    assert (conflict.value.expected, conflict.value.current) == (3, 1)
+    with pytest.raises(item_store.VersionConflict):
+        store.put("foo", {"name": "Exists"}, expected_version=0)
+    with pytest.raises(item_store.VersionConflict):
+        store.update("foo", {"name": "Stale"}, expected_version=3)
+    assert store.get("foo") == (FOO, 1)
+    assert store.put("foo", {"name": "Current"}, expected_version=1) == 2
+
+
+def test_any_version_needs_the_item(store):
+    assert store.put("foo", {"name": "Any"}, expected_version=item_store.ANY_VERSION) == 2
+    with pytest.raises(item_store.VersionConflict):
+        store.put("missing", {"name": "Any"}, expected_version=item_store.ANY_VERSION)
+    assert store.get("missing") is None
+
+
+def test_update_merges(store):
+    assert store.update("foo", {"price": 1.0, "tags": ["a"]}) == ({"name": "Foo", "price": 1.0, "tags": ["a"]}, 2)
+    assert store.get("foo") == ({"name": "Foo", "price": 1.0, "tags": ["a"]}, 2)
+    for expected_version in (None, 1, item_store.ANY_VERSION):
+        with pytest.raises(KeyError):
+            store.update("missing", {"price": 1.0}, expected_version=expected_version)
+
+
+def test_concurrent_updates_are_not_lost(store):
+    def increment():
+        for _ in range(50):
+            while True:
+                data, version = store.get("foo")
+                try:
+                    store.put("foo", {**data, "price": data["price"] + 1}, expected_version=version)
+                    break
+                except item_store.VersionConflict:
+                    pass
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.get("foo") == ({**FOO, "price": FOO["price"] + 200}, 201)
+
+
+def test_memory_store_drops_unused_locks():
+    store = item_store.MemoryItemStore({"foo": FOO})
+    for n in range(100):
+        store.put(f"item-{n}", {"n": n})
+        with pytest.raises(item_store.VersionConflict):
+            store.put(f"other-{n}", {"n": n}, expected_version=5)
+        with pytest.raises(KeyError):
+            store.update(f"missing-{n}", {"n": n})
+    assert store._locks == {}
+
+
+def test_incomplete_store_cant_be_created():
+    class GetOnlyStore(item_store.ItemStore):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnlyStore()
+
+
+def test_parse_if_match():
+    assert item_store.parse_if_match(None) is None
+    assert item_store.parse_if_match(' "3" ') == 3
+    assert item_store.parse_if_match('W/"3"') == 3
+    assert item_store.parse_if_match("*") == item_store.ANY_VERSION
+    assert item_store.parse_if_match('"abc"') == -1
+
+
+@pytest.fixture
+def client(monkeypatch, store):
+    monkeypatch.setattr(updates, "item_store", store)
+    return TestClient(updates.app)
+
+
+def test_put_and_patch_endpoints(client):
+    response = client.get("/items/foo")
+    assert response.headers["etag"] == '"1"'
+    response = client.patch("/items/foo", json={"description": "patched"}, headers={"If-Match": '"1"'})
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"2"'
+    assert response.json() == {"name": "Foo", "description": "patched", "price": 50.2, "tax": 10.5, "tags": []}
+    assert client.get("/items/foo").json()["description"] == "patched"
+
+    stale = client.put("/items/foo", json={"name": "Stale", "price": 1}, headers={"If-Match": '"1"'})
+    assert stale.status_code == 412
+    assert client.patch("/items/foo", json={"price": 1}, headers={"If-Match": '"1"'}).status_code == 412
+    assert client.patch("/items/missing", json={"price": 1}).status_code == 404
+
+
+def test_if_match_any(client):
+    assert client.put("/items/foo", json={"name": "Any", "price": 1}, headers={"If-Match": "*"}).status_code == 200
+    missing = client.put("/items/missing", json={"name": "Any", "price": 1}, headers={"If-Match": "*"})
+    assert missing.status_code == 412
+    assert client.get("/items/missing").status_code == 404
+    assert client.put("/items/missing", json={"name": "New", "price": 1}).status_code == 200
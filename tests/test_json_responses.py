@@ -0,0 +1,55 @@
+import importlib
+import math
+
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+json_responses = importlib.import_module("fast_api_tutorial.json_responses")
+path_params = importlib.import_module("fast_api_tutorial.3path_param")
+
+BACKENDS = [backend for backend, module in (("orjson", json_responses.orjson), ("msgspec", json_responses.msgspec))
+            if module is not None] + ["json"]
+
+CONTENTS = [
+    {"item_id": 123456789012345678901234567, "q": "x"},  # beyond 64 bits
+    {"name": "Foo", "price": 50.2, "tags": ["a", "é"], "description": None, "nested": {"ok": True}},
+    [1, -2 ** 63, 2 ** 64, 0.1, None, "null"],
+    {1: "non-str key"},
+]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("content", CONTENTS)
+def test_same_body_as_json_response(backend, content):
+    response_class = json_responses.json_response_class(backend)
+    assert response_class(content).body == JSONResponse(content).body
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("value", [math.nan, math.inf, -math.inf])
+def test_non_finite_floats_are_refused_like_json_response(backend, value):
+    with pytest.raises(ValueError):
+        JSONResponse({"value": value})
+    with pytest.raises(ValueError):
+        json_responses.json_response_class(backend)({"value": value})
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("content", [math.nan, [None, [{"a": (1, math.inf)}]], {"a": None, "b": {"c": [-math.inf]}}])
+def test_nested_non_finite_floats_are_refused(backend, content):
+    with pytest.raises(ValueError):
+        JSONResponse(content)
+    with pytest.raises(ValueError):
+        json_responses.json_response_class(backend)(content)
+
+
+def test_big_ints_through_an_app():
+    response = TestClient(path_params.app).get("/items/123456789012345678901234567", params={"item-query": "x"})
+    assert response.status_code == 200
+    assert response.json() == {"item_id": 123456789012345678901234567, "q": "x"}
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        json_responses.json_response_class("yaml")
@@ -0,0 +1,94 @@
+import importlib
+import os
+
+import pytest
+
+kv_store = importlib.import_module("fast_api_tutorial.kv_store")
+
+
+def test_reopen_keeps_the_data(tmp_path):
+    with kv_store.KVStore(str(tmp_path), initial={"a": {"x": 1}}) as store:
+        store["b"] = [1, "two"]
+        del store["a"]
+    with kv_store.KVStore(str(tmp_path), initial={"ignored": True}) as store:
+        assert dict(store) == {"b": [1, "two"]}
+        store["c"] = "after the hint"
+        store._checkpointed = store._size  # as if the process died before writing a new hint: the log is replayed
+        store.close()
+    with kv_store.KVStore(str(tmp_path)) as store:
+        assert dict(store) == {"b": [1, "two"], "c": "after the hint"}
+
+
+def test_compaction_keeps_only_the_live_values(tmp_path):
+    with kv_store.KVStore(str(tmp_path), compact_min_size=1024) as store:
+        for round_ in range(50):
+            for key in range(10):
+                store[str(key)] = {"round": round_, "padding": "x" * 20}
+        del store["0"]
+        store.compact()
+        size = os.path.getsize(tmp_path / "data.log")
+        assert store._generation > 0 and store._dead == 0
+        assert size < 1024
+    with kv_store.KVStore(str(tmp_path)) as store:
+        assert len(store) == 9
+        assert store["9"] == {"round": 49, "padding": "x" * 20}
+
+
+def test_torn_tail_is_dropped(tmp_path, caplog):
+    with kv_store.KVStore(str(tmp_path)) as store:
+        store["kept"] = 1
+        store["torn"] = "a value cut off by a crash"
+    os.remove(tmp_path / "data.hint")
+    log = tmp_path / "data.log"
+    os.truncate(log, os.path.getsize(log) - 5)
+    with kv_store.KVStore(str(tmp_path)) as store:
+        assert dict(store) == {"kept": 1}
+        assert "incomplete record" in caplog.text
+        store["after"] = 2  # appended where the torn record started
+    with kv_store.KVStore(str(tmp_path)) as store:
+        assert dict(store) == {"kept": 1, "after": 2}
+
+
+def test_damage_before_the_end_is_refused(tmp_path):
+    with kv_store.KVStore(str(tmp_path)) as store:
+        store["first"] = "damaged"
+        store["second"] = "valid, but after the damage"
+    os.remove(tmp_path / "data.hint")
+    log = tmp_path / "data.log"
+    data = bytearray(log.read_bytes())
+    position = data.index(b"damaged")
+    data[position] ^= 0xFF
+    log.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="damaged"):
+        kv_store.KVStore(str(tmp_path))
+    assert log.read_bytes() == bytes(data)  # nothing was cut off
+    with pytest.raises(ValueError):  # and the failed open didn't keep the lock
+        kv_store.KVStore(str(tmp_path))
+
+
+@pytest.mark.skipif(kv_store.fcntl is None, reason="no flock")
+def test_second_open_is_refused(tmp_path):
+    with kv_store.KVStore(str(tmp_path)):
+        with pytest.raises(RuntimeError):
+            kv_store.KVStore(str(tmp_path))
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="no fork")
+def test_forked_child_cannot_use_the_store(tmp_path):
+    with kv_store.KVStore(str(tmp_path), initial={"a": 1}) as store:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                try:
+                    store["b"] = 2
+                except RuntimeError:
+                    store.close()  # only lets go of the child's copy
+                    code = 0
+            finally:
+                os._exit(code)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+        store["c"] = 3
+    with kv_store.KVStore(str(tmp_path)) as store:
+        assert dict(store) == {"a": 1, "c": 3}
@@ -0,0 +1,172 @@
+import importlib
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import pytest
+
+launcher = importlib.import_module("fast_api_tutorial.launcher")
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork") or not os.path.exists(f"/proc/{os.getpid()}/task"),
+                                reason="fork and /proc (Linux)")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start(*args: str, env=None) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, os.path.join(launcher.ROOT, "__main__.py"), *args, "--log-level",
+                             "warning"], env={**os.environ, **(env or {})}, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, text=True)
+
+
+def workers(master: subprocess.Popen) -> set:
+    with open(f"/proc/{master.pid}/task/{master.pid}/children") as file:
+        return {int(pid) for pid in file.read().split()}
+
+
+def wait_for(condition, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if condition():
+                return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise AssertionError("timed out")
+
+
+def test_preload_is_turned_off_for_stores(monkeypatch):
+    monkeypatch.delenv("KV_STORE_DIR", raising=False)
+    monkeypatch.setenv("ITEM_STORE", "memory")
+    assert launcher.stores_opened_at_import() == []
+    monkeypatch.setenv("KV_STORE_DIR", "/tmp/stores")
+    monkeypatch.setenv("ITEM_STORE", "sqlite:///items.db")
+    assert launcher.stores_opened_at_import() == ["KV_STORE_DIR", "ITEM_STORE"]
+
+
+def test_kv_store_needs_a_single_worker(tmp_path):
+    master = start("11ResponseModel:app", "--workers", "2", "--port", str(free_port()),
+                   env={"KV_STORE_DIR": str(tmp_path)})
+    try:
+        assert master.wait(timeout=60) == 2
+        assert "run one worker" in master.stdout.read()
+    finally:
+        master.stdout.close()
+
+
+def test_workers_are_replaced_and_stopped():
+    port = free_port()
+    master = start("2query_params:app", "--workers", "2", "--port", str(port))
+    try:
+        url = f"http://127.0.0.1:{port}/items/"
+        wait_for(lambda: urllib.request.urlopen(url, timeout=1).status == 200)
+        wait_for(lambda: len(workers(master)) == 2)
+        first = workers(master)
+        victim = min(first)
+        os.kill(victim, signal.SIGKILL)
+        wait_for(lambda: len(workers(master)) == 2 and victim not in workers(master))
+        assert urllib.request.urlopen(url, timeout=5).status == 200
+        running = workers(master)
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=30) == 0
+        for pid in running:
+            assert not os.path.exists(f"/proc/{pid}/status") or "zombie" in open(f"/proc/{pid}/status").read()
+    finally:
+        if master.poll() is None:
+            master.kill()
+            master.wait()
+        master.stdout.close()
+
+
+def test_crashing_workers_stop_the_master(tmp_path):
+    (tmp_path / "crashing_app.py").write_text("raise RuntimeError('broken at import')\n")
+    master = start("crashing_app:app", "--workers", "1", "--port", str(free_port()), "--no-preload",
+                   "--max-failures", "3", env={"PYTHONPATH": str(tmp_path)})
+    try:
+        assert master.wait(timeout=60) == 1
+        output = master.stdout.read()
+        assert output.count("replacing it in") == 2  # 0.1s, then 0.2s, the third failure stops it
+        assert "3 workers in a row died on startup" in output
+    finally:
+        if master.poll() is None:
+            master.kill()
+            master.wait()
+        master.stdout.close()
+
+
+@pytest.mark.parametrize("sockets", [(), ("--no-reuse-port",)], ids=["reuse-port", "shared-socket"])
+def test_rolling_restart_keeps_answering(sockets):
+    port = free_port()
+    master = start("2query_params:app", "--workers", "2", "--port", str(port), *sockets)
+    url = f"http://127.0.0.1:{port}/items/"
+    answered, failed = [], []
+    done = threading.Event()
+
+    def requests():
+        while not done.is_set():
+            try:
+                answered.append(urllib.request.urlopen(url, timeout=5).status)
+            except OSError as error:
+                failed.append(error)
+
+    try:
+        wait_for(lambda: urllib.request.urlopen(url, timeout=1).status == 200)
+        wait_for(lambda: len(workers(master)) == 2)
+        first = workers(master)
+        client = threading.Thread(target=requests)
+        client.start()
+        try:
+            master.send_signal(signal.SIGHUP)
+            wait_for(lambda: len(workers(master)) == 2 and not workers(master) & first)
+        finally:
+            done.set()
+            client.join()
+        assert failed == []
+        assert answered and set(answered) == {200}
+    finally:
+        if master.poll() is None:
+            master.kill()
+            master.wait()
+        master.stdout.close()
+
+
+def test_rolling_restart_keeps_the_old_worker_when_the_new_one_fails(tmp_path):
+    broken = tmp_path / "broken"
+    (tmp_path / "restart_app.py").write_text(
+        "import os\n"
+        "from fastapi import FastAPI\n"
+        f"if os.path.exists({str(broken)!r}):\n"
+        "    raise RuntimeError('broken at import')\n"
+        "app = FastAPI()\n"
+    )
+    port = free_port()
+    master = start("restart_app:app", "--workers", "1", "--port", str(port), "--no-preload",
+                   "--startup-timeout", "10", env={"PYTHONPATH": str(tmp_path)})
+    try:
+        url = f"http://127.0.0.1:{port}/docs"
+        wait_for(lambda: urllib.request.urlopen(url, timeout=1).status == 200)
+        wait_for(lambda: len(workers(master)) == 1)
+        first = workers(master)
+        broken.touch()
+        master.send_signal(signal.SIGHUP)
+        time.sleep(1)
+        wait_for(lambda: workers(master) == first)
+        assert urllib.request.urlopen(url, timeout=5).status == 200
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=30) == 0
+        assert f"didn't start, keeping worker {first.pop()}" in master.stdout.read()
+    finally:
+        if master.poll() is None:
+            master.kill()
+            master.wait()
+        master.stdout.close()
@@ -0,0 +1,137 @@
+import asyncio
+import importlib
+import json
+import os
+import sys
+
+from fastapi import Depends, FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+lazy_routers = importlib.import_module("fast_api_tutorial.lazy_routers")
+dependencies = importlib.import_module("fast_api_tutorial.31BiggerApplications.dependencies")
+
+PACKAGE = "fast_api_tutorial.31BiggerApplications"
+TOKEN = {"X-Token": "fake-super-secret-token"}
+
+
+def make_app(manifest):
+    """31BiggerApplications/main.py, with the manifest somewhere else."""
+    app = FastAPI(dependencies=[Depends(dependencies.get_query_token)])
+    routers = lazy_routers.LazyRouters(app, package=PACKAGE, manifest=str(manifest), warmup=False)
+    routers.include(".routers.users")
+    routers.include(".routers.items")
+    routers.include(".internal.admin", prefix="/admin", tags=["admin"],
+                    dependencies=[Depends(dependencies.get_token_header)])
+
+    @app.get("/")
+    async def root():
+        return {"message": "Hello Bigger Applications!"}
+
+    return app
+
+
+def paths(app):
+    return [(route.path, sorted(getattr(route, "methods", None) or ())) for route in app.routes]
+
+
+def test_routers_are_imported_on_first_hit_with_the_same_routes_and_schema(tmp_path):
+    manifest = tmp_path / "lazy_routers.json"
+    eager = make_app(manifest)  # no manifest yet: imported right away, the manifest is written on startup
+    with TestClient(eager):
+        pass
+    assert manifest.exists()
+
+    lazy = make_app(manifest)
+    assert not any(isinstance(route, APIRoute) and route.path.startswith("/items") for route in lazy.routes)
+    assert lazy.openapi() == eager.openapi()
+    client = TestClient(lazy)
+    response = client.get("/items/plumbus", params={"token": "jessica"}, headers=TOKEN)
+    assert response.json() == {"name": "Plumbus", "item_id": "plumbus"}
+    assert client.post("/admin/", params={"token": "jessica"}, headers=TOKEN).status_code == 200
+    assert client.get("/admin/", params={"token": "jessica"}, headers=TOKEN).status_code == 405
+    client.get("/users/", params={"token": "jessica"})
+    assert paths(lazy) == paths(eager)
+
+
+def test_corrupt_manifest_is_rebuilt(tmp_path):
+    manifest = tmp_path / "lazy_routers.json"
+    manifest.write_text('{"routers": {".routers.items ": {"fingerpr')  # cut off by a crash
+    app = make_app(manifest)
+    assert any(isinstance(route, APIRoute) and route.path.startswith("/items") for route in app.routes)
+    with TestClient(app):
+        pass
+    assert set(json.loads(manifest.read_text())["routers"]) == {".routers.users ", ".routers.items ",
+                                                                 ".internal.admin /admin"}
+
+
+def test_unchanged_manifest_is_not_written_again(tmp_path):
+    manifest = tmp_path / "lazy_routers.json"
+    with TestClient(make_app(manifest)):
+        pass
+    os.utime(manifest, ns=(0, 0))
+    app = make_app(manifest)
+    app.openapi.__self__.stale = True  # as if a router had changed, but it captures the same manifest
+    with TestClient(app):
+        pass
+    assert os.stat(manifest).st_mtime_ns == 0
+    assert list(tmp_path.iterdir()) == [manifest]
+
+
+def test_manifest_that_cant_be_written(tmp_path, caplog):
+    # like a read-only deployment: writing the manifest fails, the app starts anyway
+    manifest = tmp_path / "missing-directory" / "lazy_routers.json"
+    with TestClient(make_app(manifest)) as client:
+        assert client.get("/", params={"token": "jessica"}, headers=TOKEN).status_code == 200
+    assert "Can't write the lazy routers manifest" in caplog.text
+
+
+FLAKY_ROUTER = '''
+import os
+
+from fastapi import APIRouter
+
+if os.environ.get("FLAKY_ROUTER_FAILS"):
+    raise RuntimeError("the flaky router failed to import")
+
+router = APIRouter()
+
+
+@router.get("/{name}")
+def read(name: str):
+    return {"name": name}
+'''
+
+
+def test_router_that_fails_to_import(tmp_path, monkeypatch, caplog):
+    package = tmp_path / "lazy_routers_failing"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "flaky.py").write_text(FLAKY_ROUTER)
+    (package / "steady.py").write_text(FLAKY_ROUTER.replace("FLAKY_ROUTER_FAILS", "STEADY_ROUTER_FAILS"))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    manifest = tmp_path / "lazy_routers.json"
+
+    def make_flaky_app(warmup):
+        app = FastAPI()
+        routers = lazy_routers.LazyRouters(app, package="lazy_routers_failing", manifest=str(manifest), warmup=warmup)
+        routers.include(".flaky", prefix="/flaky")
+        routers.include(".steady", prefix="/steady")
+        return app, routers
+
+    with TestClient(make_flaky_app(warmup=False)[0]):  # imported right away, the manifest is written
+        pass
+    for module in ("lazy_routers_failing.flaky", "lazy_routers_failing.steady"):
+        monkeypatch.delitem(sys.modules, module)
+
+    monkeypatch.setenv("FLAKY_ROUTER_FAILS", "1")
+    app, routers = make_flaky_app(warmup=True)
+    with TestClient(app, raise_server_exceptions=False) as client:
+        client.portal.call(asyncio.wait_for, routers._warmup_task, 10)
+        assert "Can't import the lazy router .flaky" in caplog.text
+        assert routers.routers[1].loaded  # the warmup went on after the failure
+        assert client.get("/steady/a").json() == {"name": "a"}
+        assert client.get("/flaky/a").status_code == 500
+        assert client.get("/flaky/a").status_code == 500  # tried again, not the first error kept forever
+        monkeypatch.delenv("FLAKY_ROUTER_FAILS")
+        assert client.get("/flaky/a").json() == {"name": "a"}
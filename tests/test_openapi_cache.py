@@ -0,0 +1,40 @@
+import importlib
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+metadata = importlib.import_module("fast_api_tutorial.33Metadata")
+openapi_cache = importlib.import_module("fast_api_tutorial.openapi_cache")
+
+
+def test_openapi_is_served_precompressed_with_an_etag(tmp_path, monkeypatch):
+    expected = metadata.app.openapi()
+    with TestClient(metadata.app) as client:
+        plain = client.get("/api/v1/openapi.json", headers={"Accept-Encoding": "identity"})
+        assert plain.json() == expected
+        compressed = client.get("/api/v1/openapi.json", headers={"Accept-Encoding": "gzip"})
+        # "*" doesn't bring back the codings refused with q=0
+        wildcard = client.get("/api/v1/openapi.json", headers={"Accept-Encoding": "zstd;q=0, br;q=0, *"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert wildcard.headers["content-encoding"] == "gzip"
+    assert compressed.headers["etag"] == f"W/{plain.headers['etag']}"
+    assert compressed.json() == expected  # decompressed by the client
+    with TestClient(metadata.app) as client:
+        again = client.get("/api/v1/openapi.json", headers={"If-None-Match": compressed.headers["etag"]})
+    assert again.status_code == 304 and again.content == b""
+
+    # written at build time, then read instead of built
+    path = str(tmp_path / "openapi.json")
+    openapi_cache.OpenAPIDocument(metadata.app).write(path)
+    document = openapi_cache.OpenAPIDocument(metadata.app, path)
+    monkeypatch.setattr(metadata.app, "openapi_schema", None)
+    document.build()
+    assert metadata.app.openapi_schema is None
+    assert json.loads(document.body) == expected and document.etag == plain.headers["etag"]
+
+
+def test_app_without_openapi():
+    with pytest.raises(ValueError, match="openapi_url=None"):
+        openapi_cache.serve_cached_openapi(FastAPI(openapi_url=None))
@@ -0,0 +1,46 @@
+import importlib
+from urllib.parse import parse_qsl
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+parameter_limits = importlib.import_module("fast_api_tutorial.parameter_limits")
+query_params = importlib.import_module("fast_api_tutorial.2query_params")
+header = importlib.import_module("fast_api_tutorial.10header")
+
+
+@pytest.mark.parametrize("query_string", [b"", b"q", b"q=1", b"q=1&", b"&&q=1&&q=2&", b"a=1&b&c=&&d=%26", b"&"])
+def test_counts_like_starlette_parses(query_string):
+    expected = len(parse_qsl(query_string.decode(), keep_blank_values=True))
+    assert parameter_limits.count_query_params(query_string, limit=100) == expected
+
+
+def test_counting_stops_past_the_limit():
+    assert parameter_limits.count_query_params(b"q=1&" * 10_000, limit=5) == 6
+
+
+def test_repeated_query_parameters():
+    client = TestClient(query_params.app)
+    limit = parameter_limits.MAX_QUERY_PARAMS
+    response = client.get("/list-items/?" + "&".join(["q=a"] * limit))
+    assert response.status_code == 200 and len(response.json()["q"]) == limit
+    assert client.get("/list-items/?" + "&".join(["q=a"] * (limit + 1))).status_code == 400
+
+
+def test_repeated_headers():
+    client = TestClient(header.app)
+    headers = [("x-token", "foo"), ("x-token", "bar")]
+    assert client.get("/items-with-multiple-x-token/", headers=headers).status_code == 200
+    headers = [(f"x-token-{n}", "foo") for n in range(parameter_limits.MAX_HEADERS + 1)]  # httpx joins repeated ones
+    assert client.get("/items-with-multiple-x-token/", headers=headers).status_code == 431
+
+
+def test_sizes():
+    app = FastAPI()
+    app.add_middleware(parameter_limits.ParameterLimitsMiddleware, max_query_size=100, max_header_size=500)
+    app.get("/")(lambda: None)
+    client = TestClient(app)
+    assert client.get("/?q=" + "a" * 90).status_code == 200
+    assert client.get("/?q=" + "a" * 100).status_code == 414
+    assert client.get("/", headers={"x-token": "a" * 500}).status_code == 431
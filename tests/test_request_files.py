@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import importlib
+import time
+import tracemalloc
+
+import pytest
+from fastapi.testclient import TestClient
+
+request_files = importlib.import_module("fast_api_tutorial.15RequestFiles")
+
+BOUNDARY = "tutorialboundary"
+CHUNK = b"x" * (64 * 1024)
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(request_files, "UPLOAD_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_create_file_reports_size_and_checksum(upload_dir):
+    client = TestClient(request_files.app)
+    content = b"hello streaming world" * 1000
+    response = client.post("/files/", files={"files": ("hello.txt", content)})
+    assert response.status_code == 200
+    assert response.json() == {"file_size": len(content), "sha256": hashlib.sha256(content).hexdigest()}
+    assert list(upload_dir.iterdir()) == []  # deleted once the path operation is done with it
+
+
+def test_create_file_too_large(upload_dir, monkeypatch):
+    monkeypatch.setattr(request_files, "MAX_UPLOAD_SIZE", 1024)
+    client = TestClient(request_files.app)
+    response = client.post("/files/", files={"files": ("big.bin", b"x" * 4096)})
+    assert response.status_code == 413
+    assert list(upload_dir.iterdir()) == []
+
+
+HEAD = (
+    f"--{BOUNDARY}\r\n"
+    'Content-Disposition: form-data; name="files"; filename="big.bin"\r\n'
+    "Content-Type: application/octet-stream\r\n\r\n"
+).encode()
+TAIL = f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def upload(app, chunks: int, tail: bytes = TAIL, headers=(), head: bytes = HEAD):
+    """Stream a multipart body of `chunks` * 64 KiB straight into the ASGI app, without building it in memory."""
+    parts = iter([head] + [CHUNK] * chunks + [tail])
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/files/", "raw_path": b"/files/", "root_path": "", "query_string": b"",
+        "headers": [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode()), *headers],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+    body = []
+
+    async def receive():
+        part = next(parts, None)
+        await asyncio.sleep(0)  # let the other uploads interleave
+        if part is None:
+            return {"type": "http.disconnect"}
+        return {"type": "http.request", "body": part, "more_body": part is not tail}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(body)
+
+
+def test_concurrent_large_uploads_keep_python_allocations_bounded(upload_dir):
+    chunks = 256  # 16 MiB per upload
+    uploads = 4
+
+    async def main():
+        return await asyncio.gather(*(upload(request_files.app, chunks) for _ in range(uploads)))
+
+    tracemalloc.start()
+    try:
+        results = asyncio.run(main())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    expected = '"file_size":%d' % (chunks * len(CHUNK))
+    assert all(expected.encode() in result for result in results)
+    # 64 MiB went through the app, a buffered implementation would need at least that much (tracemalloc counts the
+    # memory allocated by Python, not the RSS of the process: the buffers are Python objects)
+    assert peak < 8 * 1024 * 1024
+    assert list(upload_dir.iterdir()) == []
+
+
+def test_invalid_content_length():
+    response = asyncio.run(upload(request_files.app, 1, headers=[(b"content-length", b"12abc")]))
+    assert b"Invalid Content-Length" in response
+
+
+def test_filename_that_isnt_utf8(upload_dir):
+    head = HEAD.replace(b'filename="big.bin"', b'filename="\xffbig.bin"')
+    response = asyncio.run(upload(request_files.app, 1, head=head))
+    assert b'"file_size":%d' % len(CHUNK) in response
+
+
+def test_incomplete_body_is_refused_and_removed(upload_dir):
+    response = asyncio.run(upload(request_files.app, 4, tail=b""))
+    assert b"Incomplete multipart body" in response
+    assert list(upload_dir.iterdir()) == []
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def new_session(client, size=8, chunk_size=4) -> str:
+    response = client.post("/uploadfile/sessions/", json={"filename": "a.bin", "size": size, "chunk_size": chunk_size})
+    assert response.status_code == 201
+    return response.json()["upload_id"]
+
+
+def put_chunk(client, upload_id, offset, data, checksum=None):
+    return client.put(f"/uploadfile/sessions/{upload_id}?offset={offset}", content=data,
+                      headers={"X-Chunk-SHA256": checksum or sha256(data)})
+
+
+def test_bad_checksum_leaves_the_chunk_missing():
+    client = TestClient(request_files.app)
+    upload_id = new_session(client)
+    assert put_chunk(client, upload_id, 0, b"AAAA", checksum=sha256(b"nope")).status_code == 422
+    assert client.get(f"/uploadfile/sessions/{upload_id}").json()["missing_chunks"] == [0, 1]
+    assert put_chunk(client, upload_id, 0, b"AAAA").status_code == 204
+    assert client.get(f"/uploadfile/sessions/{upload_id}").json()["missing_chunks"] == [1]
+
+
+def test_retransmit_cannot_change_a_verified_chunk():
+    client = TestClient(request_files.app)
+    upload_id = new_session(client)
+    assert put_chunk(client, upload_id, 0, b"AAAA").status_code == 204
+    assert put_chunk(client, upload_id, 0, b"AAAA").status_code == 204  # the same chunk again
+    assert put_chunk(client, upload_id, 0, b"EVIL", checksum=sha256(b"nope")).status_code == 409
+    assert put_chunk(client, upload_id, 0, b"EVIL").status_code == 409
+    assert put_chunk(client, upload_id, 4, b"BBBB").status_code == 204
+    response = client.post(f"/uploadfile/sessions/{upload_id}/finalize")
+    assert response.status_code == 200
+    with open(response.json()["path"], "rb") as file:
+        assert file.read() == b"AAAABBBB"
+
+
+def test_finalize():
+    client = TestClient(request_files.app)
+    upload_id = new_session(client)
+    assert put_chunk(client, upload_id, 0, b"AAAA").status_code == 204
+    response = client.post(f"/uploadfile/sessions/{upload_id}/finalize")
+    assert (response.status_code, response.json()["detail"]) == (409, {"missing_chunks": [1]})
+    assert put_chunk(client, upload_id, 4, b"BBBB").status_code == 204
+    assert client.post(f"/uploadfile/sessions/{upload_id}/finalize").status_code == 200
+    assert client.post(f"/uploadfile/sessions/{upload_id}/finalize").status_code == 404
+    assert put_chunk(client, upload_id, 0, b"AAAA").status_code == 404
+
+
+def test_abandoned_sessions_expire(upload_dir):
+    client = TestClient(request_files.app)
+    upload_id = new_session(client)
+    session = request_files.upload_sessions[upload_id]
+    request_files.expire_upload_sessions(now=session.last_activity + request_files.UPLOAD_SESSION_TTL + 1)
+    assert upload_id not in request_files.upload_sessions
+    assert not (upload_dir / f"resumable-{upload_id}").exists()
+
+
+def test_abandoned_sessions_expire_without_new_sessions(upload_dir, monkeypatch):
+    monkeypatch.setattr(request_files, "UPLOAD_SESSION_SWEEP_INTERVAL", 0.01)
+    with TestClient(request_files.app) as client:
+        upload_id = new_session(client)
+        monkeypatch.setattr(request_files, "UPLOAD_SESSION_TTL", 0)
+        for _ in range(100):
+            if upload_id not in request_files.upload_sessions:
+                break
+            time.sleep(0.01)
+        assert upload_id not in request_files.upload_sessions
+        assert not (upload_dir / f"resumable-{upload_id}").exists()
+
+
+def test_sessions_are_deleted_when_the_app_stops(upload_dir):
+    with TestClient(request_files.app) as client:
+        upload_id = new_session(client)
+        assert put_chunk(client, upload_id, 0, b"AAAA").status_code == 204
+    assert request_files.upload_sessions == {}
+    assert list(upload_dir.iterdir()) == []
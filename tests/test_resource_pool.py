@@ -0,0 +1,93 @@
+import asyncio
+import importlib
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+resource_pool = importlib.import_module("fast_api_tutorial.resource_pool")
+
+SETUP = 0.05
+
+
+class SlowConnection:
+    opened = 0
+
+    def __init__(self):
+        time.sleep(SETUP)  # the handshake with the database
+        SlowConnection.opened += 1
+        self.alive = True
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_pooled_dependency_takes_setup_off_the_request_path():
+    pool = resource_pool.ResourcePool(SlowConnection, close=SlowConnection.close, min_size=2, max_size=2)
+    app = FastAPI(on_startup=[pool.start], on_shutdown=[pool.close])
+
+    async def get_connection():
+        async with pool.resource() as connection:
+            yield connection
+
+    @app.get("/")
+    async def read(connection: SlowConnection = Depends(get_connection)):
+        return {"connection": id(connection)}
+
+    SlowConnection.opened = 0
+    with TestClient(app) as client:
+        assert SlowConnection.opened == 2  # pre-warmed on startup
+        connections = {client.get("/").json()["connection"] for _ in range(20)}
+        assert SlowConnection.opened == 2  # none opened on the request path
+    assert len(connections) == 1
+    stats = pool.stats()
+    assert (stats["acquired"], stats["in_use"], stats["size"]) == (20, 0, 0)  # closed on shutdown
+
+
+def test_timeouts_health_checks_and_lifetime():
+    class Clock:
+        now = 0.0
+
+        def __call__(self):
+            return self.now
+
+    clock = Clock()
+
+    async def main():
+        pool = resource_pool.ResourcePool(SlowConnection, close=SlowConnection.close,
+                                          check=lambda connection: connection.alive, min_size=1, max_size=1,
+                                          max_lifetime=60, acquire_timeout=0.05, clock=clock)
+        first = await pool.acquire()
+        with pytest.raises(resource_pool.PoolTimeout):
+            await pool.acquire()
+        waiting = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0.01)
+        await pool.release(first)
+        assert await waiting is first  # handed to the request that was waiting
+        assert pool.stats()["timeouts"] == 1 and pool.stats()["wait_max_ms"] >= 10
+
+        first.alive = False  # the database dropped it while it was idle
+        await pool.release(first)
+        second = await pool.acquire()
+        assert second is not first and first.closed
+        clock.now = 61  # too old: closed on release, replaced to keep min_size
+        await pool.release(second)
+        assert second.closed and pool.stats()["idle"] == 1
+
+    asyncio.run(main())
+
+
+def test_resource_of_a_failed_request_is_discarded():
+    async def main():
+        pool = resource_pool.ResourcePool(SlowConnection, close=SlowConnection.close, min_size=1, max_size=1)
+        with pytest.raises(RuntimeError):
+            async with pool.resource() as broken:
+                raise RuntimeError("the query failed half way")
+        assert broken.closed
+        async with pool.resource() as connection:
+            assert connection is not broken
+        assert pool.stats()["discarded"] == 1 and pool.stats()["size"] == 1
+
+    asyncio.run(main())
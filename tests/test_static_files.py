@@ -0,0 +1,153 @@
+import asyncio
+import gzip
+import importlib
+import logging
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("STATIC_DIR", os.path.dirname(os.path.abspath(__file__)))  # for the module's own mount
+static = importlib.import_module("fast_api_tutorial.30SQLRelationalDatabases.34StaticFiles")
+
+APP_JS = b"console.log('hello static world');\n" * 10
+
+
+@pytest.fixture
+def directory(tmp_path):
+    (tmp_path / "app.js").write_bytes(APP_JS)
+    (tmp_path / "app.js.gz").write_bytes(gzip.compress(APP_JS))
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "site.css").write_bytes(b"body { color: red; }")
+    return tmp_path
+
+
+def client_of(files):
+    """The variants are only sent when a test asks for them (httpx accepts gzip by default)."""
+    return TestClient(files, headers={"Accept-Encoding": "identity"})
+
+
+@pytest.fixture
+def files(directory):
+    return static.ManifestStaticFiles(str(directory), cache=static.HotAssetCache())
+
+
+def test_serves_files_from_the_manifest(files):
+    client = client_of(files)
+    response = client.get("/css/site.css")
+    assert response.status_code == 200
+    assert response.content == b"body { color: red; }"
+    assert response.headers["content-type"] == "text/css; charset=utf-8"
+    assert response.headers["etag"].startswith('"')
+    assert client.get("/missing.css").status_code == 404
+    assert client.post("/css/site.css").status_code == 405
+
+
+def test_precompressed_variant(files):
+    client = client_of(files)
+    plain = client.get("/app.js")
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["vary"] == "Accept-Encoding"
+    compressed = client.get("/app.js", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert compressed.content == APP_JS  # decoded by the client
+    assert compressed.headers["etag"] != plain.headers["etag"]
+
+
+def test_if_none_match(files):
+    client = client_of(files)
+    etag = client.get("/css/site.css").headers["etag"]
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get("/css/site.css", headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304, if_none_match
+        assert response.content == b""
+    assert client.get("/css/site.css", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_ranges(files):
+    client = client_of(files)
+    size = len(APP_JS)
+    response = client.get("/app.js", headers={"Range": "bytes=0-6"})
+    assert (response.status_code, response.content) == (206, APP_JS[:7])
+    assert response.headers["content-range"] == f"bytes 0-6/{size}"
+    assert client.get("/app.js", headers={"Range": "bytes=-5"}).content == APP_JS[-5:]
+    assert client.get("/app.js", headers={"Range": f"bytes={size}-"}).status_code == 416
+    for ignored in ("bytes=5-2", "bytes=0-1,4-5", "items=0-1", "bytes=a-b"):
+        response = client.get("/app.js", headers={"Range": ignored})
+        assert (response.status_code, response.content) == (200, APP_JS), ignored
+    etag = client.get("/app.js").headers["etag"]
+    assert client.get("/app.js", headers={"Range": "bytes=0-1", "If-Range": etag}).status_code == 206
+    assert client.get("/app.js", headers={"Range": "bytes=0-1", "If-Range": '"old"'}).status_code == 200
+
+
+def test_accepted_encodings():
+    assert static.accepted_encodings("gzip, br;q=0.5, deflate;q=0") == {"gzip", "br"}
+
+
+def test_hot_asset_cache(files):
+    cache = files.cache
+    cache.max_bytes = len(APP_JS) + 10
+    client = client_of(files)
+    for _ in range(3):
+        assert client.get("/app.js").content == APP_JS
+    assert (cache.hits, cache.misses) == (2, 1)
+    client.get("/css/site.css")  # doesn't fit next to app.js: app.js, the least recently used, is dropped
+    assert cache.evictions == 1
+    assert list(cache.entries) == [files.manifest["css/site.css"].path]
+
+
+def test_poll_picks_up_changes(files, directory):
+    client = client_of(files)
+    old_etag = client.get("/css/site.css").headers["etag"]
+    (directory / "css" / "site.css").write_bytes(b"body { color: blue; }")
+    (directory / "new.txt").write_bytes(b"new")
+    (directory / "app.js").unlink()
+    (directory / "app.js.gz").unlink()
+    files.apply_changes(files.scan_changes())
+    response = client.get("/css/site.css")
+    assert response.content == b"body { color: blue; }"
+    assert response.headers["etag"] != old_etag
+    assert client.get("/new.txt").content == b"new"
+    assert client.get("/app.js").status_code == 404
+
+
+def test_a_file_that_fails_to_load_is_skipped(files, directory, monkeypatch, caplog):
+    load_asset = static.load_asset
+
+    def failing_load_asset(path, signature=()):
+        if path.endswith("broken.txt"):
+            raise PermissionError("no access")
+        return load_asset(path, signature)
+
+    monkeypatch.setattr(static, "load_asset", failing_load_asset)
+    (directory / "broken.txt").write_bytes(b"broken")
+    (directory / "new.txt").write_bytes(b"new")
+    with caplog.at_level(logging.WARNING):
+        files.apply_changes(files.scan_changes())
+    assert "broken.txt" in caplog.text
+    assert "new.txt" in files.manifest
+    assert "broken.txt" not in files.manifest
+
+
+def test_poll_survives_a_failing_scan(files, monkeypatch):
+    scans = []
+
+    def scan_changes():
+        scans.append(None)
+        if len(scans) == 1:
+            raise FileNotFoundError("the directory is gone")
+        return {}
+
+    monkeypatch.setattr(files, "scan_changes", scan_changes)
+
+    async def main():
+        task = asyncio.create_task(files.poll(interval=0))
+        for _ in range(100):
+            if len(scans) >= 3 or task.done():
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(main())
+    assert len(scans) >= 3
@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+import importlib
+import io
+import json
+import tempfile
+
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+upload_processing = importlib.import_module("fast_api_tutorial.upload_processing")
+request_files = importlib.import_module("fast_api_tutorial.15RequestFiles")
+
+BOUNDARY = "tutorialboundary"
+
+
+@pytest.fixture(autouse=True)
+def temp_dir(tmp_path, monkeypatch):
+    """The uploads are saved here instead of the system's temp directory, to check that they are deleted."""
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def pipeline():
+    pipeline = upload_processing.UploadPipeline(max_workers=1)
+    yield pipeline
+    pipeline.shutdown()
+
+
+def write(directory, name, content: bytes) -> str:
+    path = directory / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_process_file(temp_dir, monkeypatch):
+    monkeypatch.setattr(upload_processing, "READ_SIZE", 16)  # the signature is split across two blocks
+    content = b"x" * 10 + upload_processing.EICAR_SIGNATURE + b"x" * 10
+    assert upload_processing.process_file(write(temp_dir, "a", content), ("size", "sha256", "scan")) == {
+        "size": len(content), "sha256": hashlib.sha256(content).hexdigest(), "infected": True,
+    }
+    assert upload_processing.process_file(write(temp_dir, "b", b"clean"), ("scan",)) == {"infected": False}
+
+
+def test_unknown_step():
+    with pytest.raises(ValueError):
+        upload_processing.UploadPipeline(steps=("size", "nope"))
+
+
+def test_pipeline_results_and_errors(temp_dir, pipeline):
+    files = [("a.txt", write(temp_dir, "a", b"aaa")), ("missing.txt", str(temp_dir / "missing"))]
+
+    async def main():
+        return [result async for result in pipeline.process(files)]
+
+    results = {result["filename"]: result for result in asyncio.run(main())}
+    assert results["a.txt"] == {
+        "filename": "a.txt", "size": 3, "sha256": hashlib.sha256(b"aaa").hexdigest(), "infected": False,
+    }
+    assert "FileNotFoundError" in results["missing.txt"]["error"]
+
+
+class BrokenFile(io.BytesIO):
+    def read(self, *args):
+        raise OSError("connection lost")
+
+
+def test_failed_saves_are_deleted(temp_dir):
+    with pytest.raises(OSError):
+        upload_processing.save_upload(UploadFile(BrokenFile(), filename="a.txt"))
+    assert list(temp_dir.iterdir()) == []
+    uploads = [UploadFile(io.BytesIO(b"a"), filename="a.txt"), UploadFile(BrokenFile(), filename="b.txt")]
+    with pytest.raises(OSError):
+        upload_processing.save_uploads(uploads)
+    assert list(temp_dir.iterdir()) == []
+
+
+@pytest.fixture
+def app_pipeline(monkeypatch, pipeline):
+    monkeypatch.setattr(request_files, "upload_pipeline", pipeline)
+
+
+def test_upload_files_streams_results_and_deletes_the_files(temp_dir, app_pipeline):
+    client = TestClient(request_files.app)
+    response = client.post("/uploadfiles/", files=[("files", ("a.txt", b"aaa")), ("files", ("b.txt", b"bbbb"))])
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted((result["filename"], result["size"]) for result in results) == [("a.txt", 3), ("b.txt", 4)]
+    assert list(temp_dir.iterdir()) == []
+
+
+def test_files_deleted_when_the_client_leaves_before_the_body(temp_dir, app_pipeline):
+    body = (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="files"; filename="a.txt"\r\n\r\n'
+        f"aaa\r\n--{BOUNDARY}--\r\n"
+    ).encode()
+    messages = iter([{"type": "http.request", "body": body, "more_body": False}])
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/uploadfiles/", "raw_path": b"/uploadfiles/", "root_path": "", "query_string": b"",
+        "headers": [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+    sent = []
+
+    async def receive():
+        return next(messages, {"type": "http.disconnect"})  # gone as soon as the request is sent
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(request_files.app(scope, receive, send))
+    assert all(message["type"] != "http.response.body" or not message.get("body") for message in sent)
+    assert list(temp_dir.iterdir()) == []
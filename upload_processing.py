@@ -0,0 +1,148 @@
+"""
+Processing of uploaded files in a process pool
+
+Work done on every uploaded file (hashing, thumbnails, a virus scan...) is CPU bound. Done in the path operation it
+runs one file after another and blocks the event loop, and a threadpool doesn't help much because of the GIL.
+
+UploadPipeline sends every file to a ProcessPoolExecutor, so max_workers files are processed at the same time, and
+yields the result of each file as soon as it is done (not in upload order).
+
+The work itself is a list of steps. A step is a plain function that receives the path of the file on disk and returns
+a JSON compatible dict. Register your own with @processor("name") and pass its name in steps.
+Steps must be defined at module level, the worker processes import them by name.
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import UploadFile
+
+FileProcessor = Callable[[str], dict]
+
+PROCESSORS: Dict[str, FileProcessor] = {}
+READ_SIZE = 1024 * 1024
+
+
+def processor(name: str):
+    def register(func: FileProcessor) -> FileProcessor:
+        PROCESSORS[name] = func
+        return func
+
+    return register
+
+
+@processor("size")
+def file_size(path: str) -> dict:
+    return {"size": os.path.getsize(path)}
+
+
+@processor("sha256")
+def sha256_digest(path: str) -> dict:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(READ_SIZE), b""):
+            digest.update(block)
+    return {"sha256": digest.hexdigest()}
+
+
+# The standard antivirus test signature, a stand-in for a real scanner
+EICAR_SIGNATURE = b"EICAR-STANDARD-ANTIVIRUS-TEST-FILE"
+
+
+@processor("scan")
+def fake_virus_scan(path: str) -> dict:
+    overlap = len(EICAR_SIGNATURE) - 1
+    tail = b""
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(READ_SIZE), b""):
+            if EICAR_SIGNATURE in tail + block:
+                return {"infected": True}
+            tail = (tail + block)[-overlap:]  # blocks can be shorter than the signature
+    return {"infected": False}
+
+
+def process_file(path: str, steps: Sequence[str]) -> dict:
+    """Runs in a worker process."""
+    result: dict = {}
+    for step in steps:
+        result.update(PROCESSORS[step](path))
+    return result
+
+
+class UploadPipeline:
+    def __init__(self, steps: Sequence[str] = ("size", "sha256", "scan"), max_workers: Optional[int] = None):
+        unknown = [step for step in steps if step not in PROCESSORS]
+        if unknown:
+            raise ValueError(f"Unknown processing steps: {unknown}")
+        self.steps = tuple(steps)
+        self.max_workers = max_workers or int(os.environ.get("UPLOAD_WORKERS", 0)) or os.cpu_count()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        # created on first use, so importing the app doesn't start processes
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def process(self, files: Iterable[tuple]) -> AsyncIterator[dict]:
+        """
+        files are (name, path) pairs. Yields {"filename": name, **results} in completion order.
+        A step that raises gives {"filename": name, "error": "..."} for that file only.
+        """
+        loop = asyncio.get_running_loop()
+
+        async def process_one(name: str, path: str) -> dict:
+            try:
+                return {"filename": name, **await loop.run_in_executor(self.executor, process_file, path, self.steps)}
+            except Exception as exc:
+                return {"filename": name, "error": repr(exc)}
+
+        for next_done in asyncio.as_completed([process_one(name, path) for name, path in files]):
+            yield await next_done
+
+
+def save_upload(upload: UploadFile) -> str:
+    """
+    Copy an UploadFile (that may still be in memory) to a file on disk that the worker processes can open.
+    Blocking, call it with run_in_threadpool. The caller deletes the file, a copy that fails is deleted here.
+    """
+    upload.file.seek(0)
+    with tempfile.NamedTemporaryFile(prefix="upload-", delete=False) as file:
+        try:
+            shutil.copyfileobj(upload.file, file, READ_SIZE)
+        except BaseException:
+            file.close()
+            os.unlink(file.name)
+            raise
+    return file.name
+
+
+def save_uploads(uploads: Iterable[UploadFile]) -> List[Tuple[str, str]]:
+    """save_upload for every file: the (filename, path) pairs for UploadPipeline.process. All or nothing."""
+    saved: List[Tuple[str, str]] = []
+    try:
+        for upload in uploads:
+            saved.append((upload.filename, save_upload(upload)))
+    except BaseException:
+        remove_files(saved)
+        raise
+    return saved
+
+
+def remove_files(files: Iterable[Tuple[str, str]]) -> None:
+    """Deletes the files of (name, path) pairs, the ones already gone are skipped."""
+    for _, path in files:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass